@@ -1,75 +1,17 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-from datetime import datetime, date, time, timedelta
-import matplotlib.pyplot as plt
-from io import BytesIO
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
-import socket
-
-# ============================================================================
-# FESTIVOS COLOMBIANOS — cálculo automático por año (sin librerías externas)
-# ============================================================================
-def _pascua(anio):
-    """Algoritmo de Butcher para calcular el Domingo de Pascua."""
-    a = anio % 19
-    b = anio // 100
-    c = anio % 100
-    d = b // 4
-    e = b % 4
-    f = (b + 8) // 25
-    g = (b - f + 1) // 3
-    h = (19*a + b - d - g + 15) % 30
-    i = c // 4
-    k = c % 4
-    l = (32 + 2*e + 2*i - h - k) % 7
-    m = (a + 11*h + 22*l) // 451
-    mes = (h + l - 7*m + 114) // 31
-    dia = ((h + l - 7*m + 114) % 31) + 1
-    return date(anio, mes, dia)
-
-def _siguiente_lunes(d):
-    """Traslada una fecha al siguiente lunes (Ley Emiliani). Si ya es lunes, no cambia."""
-    dias = (7 - d.weekday()) % 7
-    return d if dias == 0 else d + timedelta(days=dias)
-
-def festivos_colombia(anio):
-    """
-    Retorna un set con todas las fechas festivas colombianas para el año dado.
-    18 festivos legales: 6 fijos + 7 Ley Emiliani + 5 religiosos móviles.
-    """
-    p = _pascua(anio)
-    f = set()
-
-    # Fijos (no se trasladan)
-    f.add(date(anio, 1,  1))   # Año Nuevo
-    f.add(date(anio, 5,  1))   # Día del Trabajo
-    f.add(date(anio, 7, 20))   # Independencia de Colombia
-    f.add(date(anio, 8,  7))   # Batalla de Boyacá
-    f.add(date(anio, 12, 8))   # Inmaculada Concepción
-    f.add(date(anio, 12, 25))  # Navidad
-
-    # Ley Emiliani (se trasladan al siguiente lunes)
-    f.add(_siguiente_lunes(date(anio, 1,  6)))   # Reyes Magos
-    f.add(_siguiente_lunes(date(anio, 3, 19)))   # San José
-    f.add(_siguiente_lunes(date(anio, 6, 29)))   # San Pedro y San Pablo
-    f.add(_siguiente_lunes(date(anio, 8, 15)))   # Asunción de la Virgen
-    f.add(_siguiente_lunes(date(anio, 10, 12)))  # Día de la Raza
-    f.add(_siguiente_lunes(date(anio, 11,  1)))  # Todos los Santos
-    f.add(_siguiente_lunes(date(anio, 11, 11)))  # Independencia de Cartagena
-
-    # Religiosos móviles (calculados desde Pascua)
-    f.add(p - timedelta(days=3))                     # Jueves Santo
-    f.add(p - timedelta(days=2))                     # Viernes Santo
-    f.add(_siguiente_lunes(p + timedelta(days=39)))  # Ascensión del Señor
-    f.add(_siguiente_lunes(p + timedelta(days=60)))  # Corpus Christi
-    f.add(_siguiente_lunes(p + timedelta(days=68)))  # Sagrado Corazón de Jesús
-
-    return f
+from datetime import datetime, date
+
+from motor_calculo import (calcular_horas_extras, construir_indice_empleados, huella_archivos, rebanada_cubo,
+                           posiciones_filas, comparar_resultados, tipos_presentacion, ErrorCalculo,
+                           posiciones_tabla, columnas_disponibles, COLUMNAS_BUSQUEDA, VERSION_MOTOR, TIPOS_TOPE,
+                           TOPE_DIARIO_HORAS_EXTRA, TOPE_SEMANAL_HORAS_EXTRA)
+from carga_archivos import leer_archivo, FormatoNoSoportado, FORMATOS_ACEPTADOS, TIPOS_ARCHIVO
+from exportacion import generar_excel_resultados
+from notificaciones import (ConfigSMTP, construir_cuerpo_email, construir_adjunto_resumen, encolar_notificacion,
+                            iniciar_worker)
+from graficos import grafico_png, comparativo_mensual, DPI_PANTALLA, DPI_DESCARGA
+from perfilador import Perfilador
 
 st.set_page_config(
     page_title="Calculadora Horas Extras Fertrac",
@@ -77,105 +19,46 @@ st.set_page_config(
     page_icon="🕒"
 )
 
+# Opciones de filas por página de la tabla de resultados
+FILAS_POR_PAGINA = [50, 100, 250, 500, 1000]
+
 # ============================================================================
 # CONFIGURACIÓN DE ENVÍO DE CORREO
 # ============================================================================
-def enviar_notificacion_email(destinatario, asunto, cuerpo_html, archivo_adjunto=None, nombre_archivo=None):
+def secreto(nombre, defecto):
+    """Valor de st.secrets, o `defecto` si no existe (o no hay archivo de secretos)."""
+    try:
+        return st.secrets.get(nombre, defecto)
+    except FileNotFoundError:
+        return defecto
+
+def config_smtp():
     """
-    Envía un correo de notificación cada vez que se usa la herramienta.
-    Las credenciales SMTP están configuradas directamente aquí.
+    Servidor y credenciales SMTP desde st.secrets: SMTP_USER (remitente),
+    SMTP_PASSWORD y, opcionalmente, SMTP_SERVER, SMTP_PORT, SMTP_STARTTLS y
+    SMTP_SIN_LOGIN (servidor que no pide contraseña).
     """
-    try:
-        # =============================================
-        # CREDENCIALES SMTP - MODIFICA AQUÍ TUS DATOS
-        # =============================================
-        smtp_server = "smtp.gmail.com"          # Servidor SMTP
-        smtp_port = 587                          # Puerto SMTP
-        smtp_user = st.secrets.get("SMTP_USER", "")        # Correo que ENVÍA (remitente)
-        smtp_password = st.secrets.get("SMTP_PASSWORD", "") # Contraseña o App Password
-        
-        if not smtp_user or not smtp_password:
-            return False, "Credenciales SMTP no configuradas en el código"
-        
-        # Crear el mensaje de correo
-        msg = MIMEMultipart("alternative")
-        msg["From"] = smtp_user
-        msg["To"] = destinatario
-        msg["Subject"] = asunto
-        
-        # Agregar el cuerpo del correo en formato HTML
-        msg.attach(MIMEText(cuerpo_html, "html"))
-        
-        # Adjuntar archivo si se proporcionó (opcional)
-        if archivo_adjunto and nombre_archivo:
-            part = MIMEBase("application", "octet-stream")
-            part.set_payload(archivo_adjunto)
-            encoders.encode_base64(part)
-            part.add_header("Content-Disposition", f"attachment; filename={nombre_archivo}")
-            msg.attach(part)
-        
-        # Conectar al servidor SMTP y enviar el correo
-        with smtplib.SMTP(smtp_server, smtp_port, timeout=10) as server:
-            server.starttls()
-            server.login(smtp_user, smtp_password)
-            server.sendmail(smtp_user, destinatario, msg.as_string())
-        
-        return True, "Correo enviado exitosamente"
-    
-    except smtplib.SMTPAuthenticationError:
-        return False, "Error de autenticación SMTP. Verifica usuario y contraseña."
-    except socket.timeout:
-        return False, "Tiempo de espera agotado al conectar con el servidor SMTP."
-    except Exception as e:
-        return False, f"Error al enviar correo: {str(e)}"
+    return ConfigSMTP(
+        servidor=secreto("SMTP_SERVER", "smtp.gmail.com"),
+        puerto=int(secreto("SMTP_PORT", 587)),
+        usuario=secreto("SMTP_USER", ""),
+        password=secreto("SMTP_PASSWORD", ""),
+        starttls=bool(secreto("SMTP_STARTTLS", True)),
+        sin_login=bool(secreto("SMTP_SIN_LOGIN", False)),
+    )
 
-def construir_cuerpo_email(num_registros, num_empleados, areas, fecha_ejecucion, total_valor_extras):
-    """Construye el cuerpo HTML del correo de notificación con el resumen del cálculo."""
-    return f"""
-    <html>
-    <body style="font-family: Arial, sans-serif; color: #333;">
-        <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-            <div style="background-color: #f37021; padding: 15px; border-radius: 8px 8px 0 0;">
-                <h2 style="color: white; margin: 0;">🕒 Notificación - Calculadora Horas Extras Fertrac</h2>
-            </div>
-            <div style="border: 1px solid #ddd; border-top: none; padding: 20px; border-radius: 0 0 8px 8px;">
-                <p>Se ha realizado un nuevo cálculo de horas extras con los siguientes detalles:</p>
-                
-                <table style="width: 100%; border-collapse: collapse; margin: 15px 0;">
-                    <tr style="background-color: #f8f8f8;">
-                        <td style="padding: 10px; border: 1px solid #ddd; font-weight: bold;">Fecha y hora de ejecución</td>
-                        <td style="padding: 10px; border: 1px solid #ddd;">{fecha_ejecucion}</td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 10px; border: 1px solid #ddd; font-weight: bold;">Registros procesados</td>
-                        <td style="padding: 10px; border: 1px solid #ddd;">{num_registros}</td>
-                    </tr>
-                    <tr style="background-color: #f8f8f8;">
-                        <td style="padding: 10px; border: 1px solid #ddd; font-weight: bold;">Empleados únicos</td>
-                        <td style="padding: 10px; border: 1px solid #ddd;">{num_empleados}</td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 10px; border: 1px solid #ddd; font-weight: bold;">Áreas involucradas</td>
-                        <td style="padding: 10px; border: 1px solid #ddd;">{areas}</td>
-                    </tr>
-                    <tr style="background-color: #f8f8f8;">
-                        <td style="padding: 10px; border: 1px solid #ddd; font-weight: bold;">Valor total extras</td>
-                        <td style="padding: 10px; border: 1px solid #ddd; color: #f37021; font-weight: bold;">${total_valor_extras:,.2f}</td>
-                    </tr>
-                </table>
-                
-                <p style="color: #888; font-size: 12px; margin-top: 20px;">
-                    Este es un correo automático generado por la Calculadora de Horas Extras de Fertrac.
-                </p>
-            </div>
-        </div>
-    </body>
-    </html>
+@st.cache_resource
+def worker_notificaciones():
+    """
+    Un único worker de envío de correos por proceso (la página nunca espera al servidor SMTP).
+    NOTIFICACION_VENTANA_SEG > 0 agrupa los avisos de ese lapso en un solo correo de resumen.
     """
+    return iniciar_worker(config_smtp(), ventana_digest=float(secreto("NOTIFICACION_VENTANA_SEG", 0)))
 
-# Inicializar estado para evitar reenvíos de correo en la misma sesión
-if "email_enviado" not in st.session_state:
-    st.session_state.email_enviado = False
+# El worker arranca con la app y no con el primer aviso nuevo: así entrega lo
+# que quedó pendiente o en reintento en la bandeja antes de un reinicio
+if config_smtp().configurado:
+    worker_notificaciones()
 
 st.image("logo_fertrac.png", width=200)
 st.markdown(
@@ -187,567 +70,148 @@ st.markdown(
 col1, col2 = st.columns(2)
 
 with col1:
-    input_file = st.file_uploader("📤 Subir archivo de datos (input_datos.xlsx)", type=["xlsx"], key="input")
-    empleados_file = st.file_uploader("📤 Subir base de empleados", type=["xlsx"], key="empleados")
+    input_file = st.file_uploader("📤 Subir archivo de datos (input_datos)", type=FORMATOS_ACEPTADOS, key="input")
+    empleados_file = st.file_uploader("📤 Subir base de empleados", type=FORMATOS_ACEPTADOS, key="empleados")
 
 with col2:
-    porcentaje_file = st.file_uploader("📤 Subir factores de horas extras (%)", type=["xlsx"], key="porcentaje")
-    turnos_file = st.file_uploader("📤 Subir configuración de turnos", type=["xlsx"], key="turnos")
-
-@st.cache_data
-def cargar_excel(file):
-    """Cachea la lectura de archivos Excel para no re-leer en cada interacción"""
-    return pd.read_excel(file)
+    porcentaje_file = st.file_uploader("📤 Subir factores de horas extras (%)", type=FORMATOS_ACEPTADOS, key="porcentaje")
+    turnos_file = st.file_uploader("📤 Subir configuración de turnos", type=FORMATOS_ACEPTADOS, key="turnos")
+
+# Resultados compartidos entre reruns y sesiones: la clave es la huella del
+# contenido de los cuatro archivos más la versión del motor (los archivos no se
+# hashean de nuevo). Como máximo 8 cálculos, cada uno vigente por 12 horas.
+@st.cache_data(max_entries=8, ttl="12h", show_spinner="Calculando horas extras...")
+def calcular_resultados(huella, version_motor, _archivos, _previo, _perfilador):
+    """
+    Lee los cuatro archivos (Excel, CSV o Parquet) y ejecuta el cálculo completo
+    (ErrorCalculo no se cachea). La base de empleados sale del índice compartido.
+    _previo: resultado anterior de la sesión; las filas sin cambios no se recalculan.
+    _perfilador: registra lectura y etapas del motor (solo cuando no viene de la caché).
+    Con el secreto PROCESOS_CALCULO > 1 los archivos muy grandes se calculan en
+    varios procesos (mismo resultado).
+    """
+    leidos = []
+    for tipo, archivo in zip(TIPOS_ARCHIVO, _archivos):
+        with _perfilador.etapa(f"lectura_{tipo}") as registro:
+            if tipo == "empleados":
+                leidos.append(indice_empleados(huella_archivos(archivo.getvalue()), version_motor, archivo))
+            else:
+                leidos.append(leer_archivo(archivo.getvalue(), archivo.name, tipo))
+            registro.filas = len(leidos[-1].cedulas) if tipo == "empleados" else len(leidos[-1])
+    return calcular_horas_extras(*leidos, previo=_previo, perfilador=_perfilador,
+                                 procesos=int(secreto("PROCESOS_CALCULO", 1)))
+
+# Índice de la base de empleados, uno por proceso y compartido por todas las
+# sesiones: la base cambia cada semana y la asistencia se sube varias veces al
+# día, así que solo se vuelve a leer cuando cambia la huella del archivo.
+@st.cache_resource(max_entries=4, show_spinner=False)
+def indice_empleados(huella, version_motor, _archivo):
+    """IndiceEmpleados de solo lectura; la clave es la huella del archivo (_archivo no se hashea)"""
+    return construir_indice_empleados(leer_archivo(_archivo.getvalue(), _archivo.name, "empleados"), huella)
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def cambios_resultados(huella_anterior, huella_actual, _anterior, _actual, _perfilador):
+    """Filas que cambiaron entre dos cargas; la clave son las huellas de ambos resultados"""
+    with _perfilador.etapa("comparar_cargas", filas=len(_actual.df)):
+        return comparar_resultados(_anterior, _actual)
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def excel_resultados(huella, _df, _incumplimientos, _perfilador):
+    """Genera el .xlsx una sola vez por resultado; la huella es la clave (_df no se hashea)"""
+    with _perfilador.etapa("exportacion_excel", filas=len(_df)):
+        return generar_excel_resultados(_df, _incumplimientos)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def grafico_resultados(tipo, area, mes, huella, dpi, _df, _perfilador):
+    """PNG de un gráfico; la clave es (tipo, filtros, huella, dpi) y _df (ya filtrado) no se hashea"""
+    with _perfilador.etapa(f"grafico_{tipo}_{dpi}dpi", filas=len(_df)):
+        return grafico_png(tipo, _df, dpi=dpi)
+
+def perfilador_sesion(huella_entrada):
+    """
+    Perfil de la sesión para los archivos cargados: se reinicia al cambiar la
+    huella de entrada y acumula lo que se calcula de verdad (lo que sale de la
+    caché no aparece, o aparece con su tiempo de lectura). Con el secreto
+    PERFIL_MEMORIA_DETALLADA también mide el pico de memoria por etapa (más costoso).
+    """
+    perfilador = st.session_state.get("perfilador")
+    if perfilador is None or st.session_state.get("perfilador_huella") != huella_entrada:
+        perfilador = Perfilador(detalle_memoria=bool(secreto("PERFIL_MEMORIA_DETALLADA", False)))
+        st.session_state["perfilador"] = perfilador
+        st.session_state["perfilador_huella"] = huella_entrada
+    return perfilador
+
+def panel_perfil(perfilador):
+    """Panel plegable de la barra lateral con las etapas medidas y la descarga en JSON."""
+    with st.sidebar.expander("⏱️ Perfil de rendimiento", expanded=False):
+        etapas = perfilador.a_dict()["etapas"]
+        if not etapas:
+            st.caption("Sin etapas medidas.")
+            return
+        tabla = pd.DataFrame(etapas)
+        tabla["nombre"] = ["\u2003" * nivel + nombre for nivel, nombre in zip(tabla["nivel"], tabla["nombre"])]
+        columnas = ["nombre", "segundos", "filas", "rss_mb", "rss_pico_mb"]
+        if perfilador.detalle_memoria:
+            columnas.append("pico_mb")
+        st.dataframe(tabla[columnas], hide_index=True, use_container_width=True)
+        st.download_button(
+            label="📥 Descargar perfil (JSON)",
+            data=perfilador.a_json(),
+            file_name=f"perfil_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json",
+            key="download_perfil"
+        )
 
 if input_file and empleados_file and porcentaje_file and turnos_file:
-    df_input = cargar_excel(input_file)
-    df_empleados = cargar_excel(empleados_file)
-    df_porcentaje = cargar_excel(porcentaje_file)
-    df_turnos = cargar_excel(turnos_file)
-
-    # Normalizar columnas
-    df_input.columns = df_input.columns.str.upper().str.strip()
-    df_empleados.columns = df_empleados.columns.str.upper().str.strip()
-    df_porcentaje.columns = df_porcentaje.columns.str.upper().str.strip()
-    df_turnos.columns = df_turnos.columns.str.upper().str.strip()
-
-    # Normalizar nombres de columnas de cédula
-    if "CÉDULA" in df_input.columns:
-        cedula_input = "CÉDULA"
-    elif "CEDULA" in df_input.columns:
-        cedula_input = "CEDULA"
-    else:
-        st.error("⚠️ Error: No se encontró columna de cédula en archivo de datos")
-        st.info("La columna debe llamarse 'CÉDULA' o 'CEDULA'")
-        st.stop()
-    
-    # Buscar columna cédula en empleados (acepta CEDULA, CÉDULA, o cualquier variante normalizada)
-    cedula_empleados = None
-    for col in df_empleados.columns:
-        if col.upper().strip() in ("CEDULA", "CÉDULA", "CEDULA"):
-            cedula_empleados = col
-            break
-    if cedula_empleados is None:
-        st.error("⚠️ Error: No se encontró columna de cédula en base de empleados")
-        st.info("La columna debe llamarse 'CEDULA', 'Cedula' o 'CÉDULA'")
-        st.stop()
-    
-    # Convertir cédulas a string para evitar problemas de tipo
-    df_input[cedula_input] = df_input[cedula_input].astype(str).str.strip()
-    df_empleados[cedula_empleados] = df_empleados[cedula_empleados].astype(str).str.strip()
-    
-    # Merge con empleados
-    df = df_input.merge(df_empleados, left_on=cedula_input, right_on=cedula_empleados, how="left")
-    
-    # Validar que existan las columnas necesarias del archivo de empleados
-    columnas_requeridas = ["NOMBRE", "AREA", "SALARIO BASICO"]
-    columnas_faltantes = [col for col in columnas_requeridas if col not in df.columns]
-    
-    if columnas_faltantes:
-        st.error(f"⚠️ Error: Faltan columnas en el archivo de empleados: {', '.join(columnas_faltantes)}")
-        st.info(f"""
-        El archivo de empleados debe tener las siguientes columnas:
-        - CEDULA o CÉDULA
-        - NOMBRE
-        - AREA
-        - SALARIO BASICO
-        - CARGO (opcional, pero recomendado)
-        """)
-        st.stop()
-    
-    # Verificar si existe CARGO (opcional pero recomendado)
-    if "CARGO" not in df.columns:
-        st.warning("⚠️ Advertencia: No se encontró columna 'CARGO' en el archivo de empleados. Se dejará vacía.")
-        df["CARGO"] = ""
-    
-    # COMISIÓN O BONIFICACIÓN debe venir del archivo input_datos
-    if "COMISIÓN O BONIFICACIÓN" not in df.columns:
-        if "COMISION O BONIFICACION" not in df.columns:
-            st.warning("⚠️ Advertencia: No se encontró columna 'COMISIÓN O BONIFICACIÓN' en el archivo de datos de entrada. Se asumirá valor $0 para todos.")
-            df["COMISIÓN O BONIFICACIÓN"] = 0
-        else:
-            df["COMISIÓN O BONIFICACIÓN"] = df["COMISION O BONIFICACION"]
-    
-    # Agregar columna OBSERVACIONES si no existe en el input
-    if "OBSERVACIONES" not in df.columns and "OBSERVACION" not in df.columns:
-        df["OBSERVACIONES"] = ""
-    elif "OBSERVACION" in df.columns:
-        df["OBSERVACIONES"] = df["OBSERVACION"]
-    
-    # Verificar que se hayan encontrado coincidencias
-    if "NOMBRE" in df.columns:
-        empleados_sin_info = df[df["NOMBRE"].isna()]
-        if len(empleados_sin_info) > 0:
-            st.warning(f"⚠️ Advertencia: {len(empleados_sin_info)} registros no tienen información de empleado")
-            st.warning(f"Cédulas sin coincidencia: {empleados_sin_info[cedula_input].unique().tolist()[:5]}")
-            st.info("Verifica que las cédulas en ambos archivos coincidan exactamente")
-    else:
-        st.error("⚠️ Error: No se encontró la columna NOMBRE en el archivo de empleados")
-        st.info("El archivo de empleados debe tener una columna llamada 'NOMBRE' o 'Nombre'")
-        st.stop()
+    archivos = (input_file, empleados_file, porcentaje_file, turnos_file)
+    huella_entrada = huella_archivos(*[archivo.getvalue() for archivo in archivos])
+    perfilador = perfilador_sesion(huella_entrada)
 
-    # Procesamiento de fechas y horas
     try:
-        df["FECHA"] = pd.to_datetime(df["FECHA"], errors='coerce')
-        
-        if df["FECHA"].isna().any():
-            fechas_problema = df[df["FECHA"].isna()].index.tolist()
-            st.error(f"⚠️ Error: Algunas fechas no tienen el formato correcto en las filas: {fechas_problema[:5]}")
-            st.info("Las fechas deben estar en formato: YYYY-MM-DD (ej: 2025-02-04) o DD/MM/YYYY")
-            st.stop()
-        
-        df["DIA_NUM"] = df["FECHA"].dt.weekday  # 0=Lun, 5=Sáb, 6=Dom
-        
-        dias_espanol = {
-            0: 'Lunes', 1: 'Martes', 2: 'Miércoles', 3: 'Jueves',
-            4: 'Viernes', 5: 'Sábado', 6: 'Domingo'
-        }
-        df["DÍA"] = df["DIA_NUM"].map(dias_espanol)
-
-        # Calcular festivos colombianos para cada año presente en los datos
-        anios_en_datos = df["FECHA"].dt.year.unique()
-        todos_los_festivos = set()
-        for anio in anios_en_datos:
-            todos_los_festivos.update(festivos_colombia(int(anio)))
-
-        # Marcar si cada fecha es festivo
-        df["ES_FESTIVO"] = df["FECHA"].dt.date.apply(lambda d: d in todos_los_festivos)
-    except Exception as e:
-        st.error(f"⚠️ Error al procesar fechas: {str(e)}")
-        st.info("Verifica que la columna FECHA tenga fechas válidas")
+        with perfilador.etapa("calculo"):
+            resultado = calcular_resultados(huella_entrada, VERSION_MOTOR, archivos,
+                                            st.session_state.get("resultado_actual"), perfilador)
+    except ErrorCalculo as e:
+        st.error(f"⚠️ {e.mensaje}")
+        if e.ayuda:
+            st.info(e.ayuda)
+        panel_perfil(perfilador)
         st.stop()
-
-    try:
-        def convertir_a_time(valor):
-            if pd.isna(valor):
-                return None
-            if isinstance(valor, time):
-                return valor
-            if isinstance(valor, datetime):
-                return valor.time()
-            if isinstance(valor, str):
-                try:
-                    parsed = pd.to_datetime(valor, format='%H:%M', errors='coerce')
-                    if pd.isna(parsed):
-                        parsed = pd.to_datetime(valor, format='%H:%M:%SS', errors='coerce')
-                    if not pd.isna(parsed):
-                        return parsed.time()
-                except:
-                    pass
-            return None
-        
-        df["HRA INGRESO"] = df["HRA INGRESO"].apply(convertir_a_time)
-        df["HORA SALIDA"] = df["HORA SALIDA"].apply(convertir_a_time)
-        
-        if df["HRA INGRESO"].isna().any() or df["HORA SALIDA"].isna().any():
-            st.error("⚠️ Error: Algunas horas de entrada o salida no tienen el formato correcto")
-            st.info("Las horas pueden estar en formato Excel (tiempo) o texto HH:MM (ej: 08:00, 14:00, 18:30)")
-            st.stop()
-    except Exception as e:
-        st.error(f"⚠️ Error al procesar horas: {str(e)}")
-        st.info("Verifica el formato de las columnas HRA INGRESO y HORA SALIDA")
+    except FormatoNoSoportado as e:
+        st.error(f"⚠️ {e}")
+        panel_perfil(perfilador)
         st.stop()
 
-    def convertir_a_datetime(fecha, hora):
-        return pd.to_datetime(fecha.astype(str) + ' ' + hora.astype(str))
+    # Se guarda la carga actual y la anterior de la sesión para mostrar los cambios
+    actual = st.session_state.get("resultado_actual")
+    if actual is None or actual.huella != resultado.huella:
+        st.session_state["resultado_anterior"] = actual
+        st.session_state["resultado_actual"] = resultado
+    anterior = st.session_state.get("resultado_anterior")
 
-    df["DT_INGRESO"] = convertir_a_datetime(df["FECHA"], df["HRA INGRESO"])
-    df["DT_SALIDA"] = convertir_a_datetime(df["FECHA"], df["HORA SALIDA"])
+    df = resultado.df
+    turnos_config = resultado.turnos_config
+    factor_map = resultado.factor_map
+    cedula_input = resultado.columna_cedula
+    cubo = resultado.cubo
+
+    iconos_aviso = {"warning": "⚠️", "info": "ℹ️"}
+    for aviso in resultado.avisos:
+        getattr(st, aviso.nivel)(f"{iconos_aviso.get(aviso.nivel, '')} {aviso.mensaje}")
 
-    # Crear diccionario de configuración de turnos
-    turnos_config = {}
-    for _, row in df_turnos.iterrows():
-        turno_nombre = str(row["TURNO"]).upper().strip()
-        
-        try:
-            def a_time(valor):
-                if isinstance(valor, time):
-                    return valor
-                if isinstance(valor, datetime):
-                    return valor.time()
-                if isinstance(valor, str):
-                    parsed = pd.to_datetime(valor, format='%H:%M', errors='coerce')
-                    if pd.isna(parsed):
-                        parsed = pd.to_datetime(valor, format='%H:%M:%S', errors='coerce')
-                    if not pd.isna(parsed):
-                        return parsed.time()
-                return None
-            
-            hora_entrada = a_time(row["HORA ENTRADA"])
-            hora_salida = a_time(row["HORA SALIDA"])
-            
-            if hora_entrada is None or hora_salida is None:
-                st.warning(f"⚠️ Advertencia: Turno '{turno_nombre}' tiene formato de hora inválido, se omitirá")
-                continue
-            
-            turnos_config[turno_nombre] = {
-                "entrada": hora_entrada,
-                "salida": hora_salida
-            }
-        except Exception as e:
-            st.error(f"Error procesando turno {turno_nombre}: {e}")
-            continue
-    
-    if not turnos_config:
-        st.error("⚠️ No se pudo cargar ningún turno del archivo de configuración")
-        st.stop()
-    
     st.success(f"""
     ✅ **Configuración de turnos cargada:**
     {chr(10).join([f"- {turno}: {config['entrada'].strftime('%H:%M')} a {config['salida'].strftime('%H:%M')}" 
                    for turno, config in turnos_config.items()])}
     """)
 
-    def obtener_horarios_turno(row):
-        """Retorna las horas de entrada y salida según la configuración del turno"""
-        turno = row.get("TURNO", "TURNO 1").upper().strip()
-        
-        if turno in turnos_config:
-            hora_entrada = datetime.combine(row["FECHA"], turnos_config[turno]["entrada"])
-            hora_salida = datetime.combine(row["FECHA"], turnos_config[turno]["salida"])
-        else:
-            st.warning(f"⚠️ Turno '{turno}' no encontrado en configuración. Usando TURNO 1 por defecto.")
-            hora_entrada = datetime.combine(row["FECHA"], time(8, 0))
-            hora_salida = datetime.combine(row["FECHA"], time(18, 0))
-        
-        return hora_entrada, hora_salida
-
-    def es_horario_nocturno(hora):
-        """
-        Determina si una hora (objeto time) está en horario nocturno.
-        Horario nocturno: 19:00 (7 PM) a 06:00 (6 AM)
-        """
-        if isinstance(hora, datetime):
-            hora = hora.time()
-        return hora >= time(19, 0) or hora < time(6, 0)
-
-    def calcular_horas_extras_y_recargo(row):
-        """
-        Calcula horas extras diurnas, nocturnas y recargo nocturno de forma precisa.
-        """
-        ingreso_real = row["DT_INGRESO"]
-        salida_real = row["DT_SALIDA"]
-        
-        hora_entrada_esperada, hora_salida_esperada = obtener_horarios_turno(row)
-        
-        horas_extra_diurna = 0
-        horas_extra_nocturna = 0
-        recargo_nocturno = 0
-
-        # ====================================================================
-        # CASO ESPECIAL: Turno 00:00 - 00:00 = "Todo Extra"
-        # El usuario configura este turno para indicar que el empleado no
-        # tenía jornada ordinaria ese día. Todo lo trabajado son horas extra.
-        # Se clasifica minuto a minuto según horario diurno/nocturno,
-        # arrancando desde la hora REAL de ingreso del empleado.
-        # ====================================================================
-        if hora_entrada_esperada.time() == time(0, 0) and hora_salida_esperada.time() == time(0, 0):
-            tiempo_actual = ingreso_real
-            while tiempo_actual < salida_real:
-                hora_actual = tiempo_actual.time()
-                if es_horario_nocturno(hora_actual):
-                    if hora_actual >= time(19, 0):
-                        fin_segmento = datetime.combine(tiempo_actual.date(), time(23, 59, 59))
-                    else:
-                        fin_segmento = datetime.combine(tiempo_actual.date(), time(6, 0))
-                    fin_segmento = min(fin_segmento, salida_real)
-                    horas_extra_nocturna += (fin_segmento - tiempo_actual).total_seconds() / 3600
-                    tiempo_actual = fin_segmento
-                    if fin_segmento.time() == time(23, 59, 59) and tiempo_actual < salida_real:
-                        tiempo_actual += timedelta(seconds=1)
-                else:
-                    fin_segmento = datetime.combine(tiempo_actual.date(), time(19, 0))
-                    fin_segmento = min(fin_segmento, salida_real)
-                    horas_extra_diurna += (fin_segmento - tiempo_actual).total_seconds() / 3600
-                    tiempo_actual = fin_segmento
-                if tiempo_actual >= salida_real:
-                    break
-            return max(horas_extra_diurna, 0), max(horas_extra_nocturna, 0), 0
-
-        hora_ingreso = ingreso_real.time()
-        hora_salida = salida_real.time()
-        hora_entrada_turno = hora_entrada_esperada.time()
-
-        
-        if (hora_ingreso < hora_entrada_turno and hora_salida <= hora_entrada_turno
-            and hora_salida > hora_ingreso
-            and es_horario_nocturno(hora_ingreso) and es_horario_nocturno(hora_salida)):
-            horas_extra_nocturna = (salida_real - ingreso_real).total_seconds() / 3600
-            return max(horas_extra_diurna, 0), max(horas_extra_nocturna, 0), max(recargo_nocturno, 0)
-        
-        # PARTE 1: RECARGO NOCTURNO (horas normales en horario nocturno)
-        inicio_jornada_normal = max(ingreso_real, hora_entrada_esperada)
-        fin_jornada_normal = min(salida_real, hora_salida_esperada)
-        
-        if inicio_jornada_normal < fin_jornada_normal:
-            tiempo_actual = inicio_jornada_normal
-            
-            while tiempo_actual < fin_jornada_normal:
-                hora_actual = tiempo_actual.time()
-                
-                if es_horario_nocturno(hora_actual):
-                    if hora_actual >= time(19, 0):
-                        fin_segmento = datetime.combine(tiempo_actual.date(), time(23, 59, 59))
-                    else:
-                        fin_segmento = datetime.combine(tiempo_actual.date(), time(6, 0))
-                    
-                    fin_segmento = min(fin_segmento, fin_jornada_normal)
-                    horas = (fin_segmento - tiempo_actual).total_seconds() / 3600
-                    recargo_nocturno += horas
-                    tiempo_actual = fin_segmento
-                    
-                    if fin_segmento.time() == time(23, 59, 59) and tiempo_actual < fin_jornada_normal:
-                        tiempo_actual = tiempo_actual + timedelta(seconds=1)
-                else:
-                    fin_segmento = datetime.combine(tiempo_actual.date(), time(19, 0))
-                    fin_segmento = min(fin_segmento, fin_jornada_normal)
-                    tiempo_actual = fin_segmento
-                
-                if tiempo_actual >= fin_jornada_normal:
-                    break
-        
-        # PARTE 2: HORAS EXTRA ANTES DEL TURNO
-        if ingreso_real < hora_entrada_esperada:
-            tiempo_actual = ingreso_real
-            
-            while tiempo_actual < hora_entrada_esperada:
-                hora_actual = tiempo_actual.time()
-                
-                if es_horario_nocturno(hora_actual):
-                    if hora_actual >= time(19, 0):
-                        fin_segmento = datetime.combine(tiempo_actual.date(), time(23, 59, 59))
-                    else:
-                        fin_segmento = datetime.combine(tiempo_actual.date(), time(6, 0))
-                    
-                    fin_segmento = min(fin_segmento, hora_entrada_esperada)
-                    horas = (fin_segmento - tiempo_actual).total_seconds() / 3600
-                    horas_extra_nocturna += horas
-                    tiempo_actual = fin_segmento
-                    
-                    if fin_segmento.time() == time(23, 59, 59) and tiempo_actual < hora_entrada_esperada:
-                        tiempo_actual = tiempo_actual + timedelta(seconds=1)
-                else:
-                    fin_segmento = datetime.combine(tiempo_actual.date(), time(19, 0))
-                    fin_segmento = min(fin_segmento, hora_entrada_esperada)
-                    horas = (fin_segmento - tiempo_actual).total_seconds() / 3600
-                    horas_extra_diurna += horas
-                    tiempo_actual = fin_segmento
-                
-                if tiempo_actual >= hora_entrada_esperada:
-                    break
-        
-        # PARTE 3: HORAS EXTRA DESPUÉS DEL TURNO
-        if salida_real > hora_salida_esperada:
-            tiempo_actual = hora_salida_esperada
-            
-            while tiempo_actual < salida_real:
-                hora_actual = tiempo_actual.time()
-                
-                if es_horario_nocturno(hora_actual):
-                    if hora_actual >= time(19, 0):
-                        fin_segmento = datetime.combine(tiempo_actual.date(), time(23, 59, 59))
-                    else:
-                        fin_segmento = datetime.combine(tiempo_actual.date(), time(6, 0))
-                    
-                    fin_segmento = min(fin_segmento, salida_real)
-                    horas = (fin_segmento - tiempo_actual).total_seconds() / 3600
-                    horas_extra_nocturna += horas
-                    tiempo_actual = fin_segmento
-                    
-                    if fin_segmento.time() == time(23, 59, 59) and tiempo_actual < salida_real:
-                        tiempo_actual = tiempo_actual + timedelta(seconds=1)
-                else:
-                    fin_segmento = datetime.combine(tiempo_actual.date(), time(19, 0))
-                    fin_segmento = min(fin_segmento, salida_real)
-                    horas = (fin_segmento - tiempo_actual).total_seconds() / 3600
-                    horas_extra_diurna += horas
-                    tiempo_actual = fin_segmento
-                
-                if tiempo_actual >= salida_real:
-                    break
-        
-        return max(horas_extra_diurna, 0), max(horas_extra_nocturna, 0), max(recargo_nocturno, 0)
-
-    def obtener_horarios_turno_para_mostrar(row):
-        """Retorna los horarios del turno como strings para mostrar en tabla"""
-        turno = row.get("TURNO", "TURNO 1").upper().strip()
-        
-        if turno in turnos_config:
-            hora_entrada = turnos_config[turno]["entrada"]
-            hora_salida = turnos_config[turno]["salida"]
-        else:
-            hora_entrada = time(8, 0)
-            hora_salida = time(18, 0)
-        
-        return hora_entrada.strftime('%H:%M'), hora_salida.strftime('%H:%M')
-    
-    horarios_turno = df.apply(obtener_horarios_turno_para_mostrar, axis=1)
-    df["TURNO ENTRADA"] = [h[0] for h in horarios_turno]
-    df["TURNO SALIDA"] = [h[1] for h in horarios_turno]
-    
-    total_horas = (df["DT_SALIDA"] - df["DT_INGRESO"]).dt.total_seconds() / 3600
-    
-    hora_ingreso = df["HRA INGRESO"].apply(lambda h: h.hour if h else 0)
-    hora_salida_val = df["HORA SALIDA"].apply(lambda h: h.hour if h else 0)
-    es_franja_madrugada = (hora_ingreso < 6) & (hora_salida_val <= 6)
-    
-    df["HORAS TRABAJADAS"] = np.where(
-        (df["DIA_NUM"] < 5) & (~es_franja_madrugada),
-        total_horas - 1,
-        total_horas
-    )
-    
-    resultados = df.apply(calcular_horas_extras_y_recargo, axis=1)
-    df["HORAS EXTRA DIURNA"] = [r[0] for r in resultados]
-    df["HORAS EXTRA NOCTURNA"] = [r[1] for r in resultados]
-    df["RECARGO NOCTURNO"] = [r[2] for r in resultados]
-    
-    df["TOTAL HORAS EXTRA"] = df["HORAS EXTRA DIURNA"] + df["HORAS EXTRA NOCTURNA"]
-
-    df["TIPO EXTRA"] = df.apply(
-        lambda row: "Recargo Nocturno" if row["RECARGO NOCTURNO"] > 0 else 
-                    ("Extra Nocturna" if row["HORAS EXTRA NOCTURNA"] > 0 else "Extra Diurna"),
-        axis=1
-    )
-
-    # ============================================================================
-    # CALCULAR TOTAL BASE LIQUIDACION
-    # ============================================================================
-    df["TOTAL BASE LIQUIDACION"] = df["SALARIO BASICO"] + df["COMISIÓN O BONIFICACIÓN"]
-    
-    # ============================================================================
-    # MAPEO DE FACTORES - incluye dominicales
-    # ============================================================================
-    factor_map = dict(zip(df_porcentaje["TIPO HORA EXTRA"].str.upper().str.strip(), df_porcentaje["FACTOR"]))
-
-    # Mapear los nombres del archivo a las claves internas que usa el código
-    # El archivo usa: "EXTRA DOMINICAL DIURNO" / "EXTRA DOMINICAL NOCTURNO"
-    # El código busca: "EXTRA DIURNA DOMINICAL" / "EXTRA NOCTURNA DOMINICAL"
-    # Se crean alias para compatibilidad en ambos sentidos
-    alias_dominicales = {
-        "EXTRA DIURNA DOMINICAL":    ["EXTRA DOMINICAL DIURNO",   "EXTRA DIURNA DOMINICAL"],
-        "EXTRA NOCTURNA DOMINICAL":  ["EXTRA DOMINICAL NOCTURNO", "EXTRA NOCTURNA DOMINICAL"],
-        "RECARGO NOCTURNO DOMINICAL":["RECARGO DOMINICAL NOCTURNO","RECARGO NOCTURNO DOMINICAL",
-                                      "RECARGO DOMINICAL DIURNO"],
-    }
-    defaults_dominicales = {
-        "EXTRA DIURNA DOMINICAL": 2.00,
-        "EXTRA NOCTURNA DOMINICAL": 2.50,
-        "RECARGO NOCTURNO DOMINICAL": 1.75,
-    }
-    for clave_interna, posibles_nombres in alias_dominicales.items():
-        if clave_interna not in factor_map:
-            for nombre in posibles_nombres:
-                if nombre in factor_map:
-                    factor_map[clave_interna] = factor_map[nombre]
-                    break
-            else:
-                factor_map[clave_interna] = defaults_dominicales[clave_interna]
-                st.info(f"ℹ️ No se encontró factor dominical '{clave_interna}'. Se usará valor por defecto: {defaults_dominicales[clave_interna]}")
-
-    # ============================================================================
-    # FUNCIÓN PARA OBTENER FACTOR SEGÚN TIPO Y DÍA
-    # ============================================================================
-    def obtener_factor_con_dia(tipo_base, dia_num, es_festivo):
-        """
-        Retorna el factor correcto según el tipo de hora extra y el día.
-        Domingo (dia_num == 6) O festivo → aplica tarifa dominical/festiva.
-        En Colombia, los festivos tienen el mismo recargo que los domingos.
-        """
-        if dia_num == 6 or es_festivo:
-            tipo_dominical = tipo_base + " DOMINICAL"
-            return factor_map.get(tipo_dominical, factor_map.get(tipo_base, 1.25))
-        return factor_map.get(tipo_base, 1.25)
-
-    # ============================================================================
-    # CALCULAR VALORES MONETARIOS CON FACTOR CORRECTO POR DÍA
-    # ============================================================================
-    df["IMPORTE HORA"] = df["TOTAL BASE LIQUIDACION"] / 220
-
-    df["VALOR EXTRA DIURNA"] = df.apply(
-        lambda row: row["HORAS EXTRA DIURNA"] * row["IMPORTE HORA"] *
-                    obtener_factor_con_dia("EXTRA DIURNA", row["DIA_NUM"], row["ES_FESTIVO"]),
-        axis=1
-    )
-
-    df["VALOR EXTRA NOCTURNA"] = df.apply(
-        lambda row: row["HORAS EXTRA NOCTURNA"] * row["IMPORTE HORA"] *
-                    obtener_factor_con_dia("EXTRA NOCTURNA", row["DIA_NUM"], row["ES_FESTIVO"]),
-        axis=1
-    )
-
-    df["VALOR RECARGO NOCTURNO"] = df.apply(
-        lambda row: row["RECARGO NOCTURNO"] * row["IMPORTE HORA"] *
-                    obtener_factor_con_dia("RECARGO NOCTURNO", row["DIA_NUM"], row["ES_FESTIVO"]),
-        axis=1
-    )
-
-    df["VALOR TOTAL EXTRAS"] = df["VALOR EXTRA DIURNA"] + df["VALOR EXTRA NOCTURNA"] + df["VALOR RECARGO NOCTURNO"]
-
-    # ============================================================================
-    # COLUMNA DE AUDITORÍA: indica qué tarifa se aplicó
-    # ============================================================================
-    def tipo_tarifa(row):
-        if row["DIA_NUM"] == 6 and row["ES_FESTIVO"]:
-            return "DOMINGO FESTIVO"
-        elif row["DIA_NUM"] == 6:
-            return "DOMINGO"
-        elif row["ES_FESTIVO"]:
-            return "FESTIVO"
-        else:
-            return "NORMAL"
-
-    df["TIPO TARIFA"] = df.apply(tipo_tarifa, axis=1)
-
-    # ============================================================================
-    # COLUMNAS SEPARADAS PARA DÍAS NORMALES VS DOMINGO/FESTIVO
-    # Las horas son las mismas, solo se separan según el tipo de día.
-    # La lógica de cálculo no cambia.
-    # ============================================================================
-    es_dom_fest = (df["DIA_NUM"] == 6) | df["ES_FESTIVO"]
-
-    # Horas y valores días normales (L-S no festivo)
-    df["HORAS EXTRA DIURNA NORMAL"]      = df["HORAS EXTRA DIURNA"].where(~es_dom_fest, 0)
-    df["VALOR EXTRA DIURNA NORMAL"]      = df["VALOR EXTRA DIURNA"].where(~es_dom_fest, 0)
-    df["HORAS EXTRA NOCTURNA NORMAL"]    = df["HORAS EXTRA NOCTURNA"].where(~es_dom_fest, 0)
-    df["VALOR EXTRA NOCTURNA NORMAL"]    = df["VALOR EXTRA NOCTURNA"].where(~es_dom_fest, 0)
-    df["RECARGO NOCTURNO NORMAL"]        = df["RECARGO NOCTURNO"].where(~es_dom_fest, 0)
-    df["VALOR RECARGO NOCTURNO NORMAL"]  = df["VALOR RECARGO NOCTURNO"].where(~es_dom_fest, 0)
-
-    # Horas y valores domingo/festivo
-    df["HORAS EXTRA DIURNA DOM/FEST"]    = df["HORAS EXTRA DIURNA"].where(es_dom_fest, 0)
-    df["VALOR EXTRA DIURNA DOM/FEST"]    = df["VALOR EXTRA DIURNA"].where(es_dom_fest, 0)
-    df["HORAS EXTRA NOCTURNA DOM/FEST"]  = df["HORAS EXTRA NOCTURNA"].where(es_dom_fest, 0)
-    df["VALOR EXTRA NOCTURNA DOM/FEST"]  = df["VALOR EXTRA NOCTURNA"].where(es_dom_fest, 0)
-    df["RECARGO NOCTURNO DOM/FEST"]      = df["RECARGO NOCTURNO"].where(es_dom_fest, 0)
-    df["VALOR RECARGO NOCTURNO DOM/FEST"]= df["VALOR RECARGO NOCTURNO"].where(es_dom_fest, 0)
-
-    # Redondear valores monetarios
-    df["IMPORTE HORA"] = df["IMPORTE HORA"].round(2)
-    df["VALOR EXTRA DIURNA"] = df["VALOR EXTRA DIURNA"].round(2)
-    df["VALOR EXTRA NOCTURNA"] = df["VALOR EXTRA NOCTURNA"].round(2)
-    df["VALOR RECARGO NOCTURNO"] = df["VALOR RECARGO NOCTURNO"].round(2)
-    df["VALOR TOTAL EXTRAS"] = df["VALOR TOTAL EXTRAS"].round(2)
-    df["TOTAL BASE LIQUIDACION"] = df["TOTAL BASE LIQUIDACION"].round(2)
-    
-    # Columnas de display (redondeadas para visualización)
-    df["HORAS TRABAJADAS_DISPLAY"] = df["HORAS TRABAJADAS"].round(2)
-    df["HORAS EXTRA DIURNA_DISPLAY"] = df["HORAS EXTRA DIURNA"].round(2)
-    df["HORAS EXTRA NOCTURNA_DISPLAY"] = df["HORAS EXTRA NOCTURNA"].round(2)
-    df["RECARGO NOCTURNO_DISPLAY"] = df["RECARGO NOCTURNO"].round(2)
-    df["TOTAL HORAS EXTRA_DISPLAY"] = df["TOTAL HORAS EXTRA"].round(2)
-
-    # Display columns para DOM/FEST
-    df["HORAS EXTRA DIURNA NORMAL_DISPLAY"]     = df["HORAS EXTRA DIURNA NORMAL"].round(2)
-    df["HORAS EXTRA NOCTURNA NORMAL_DISPLAY"]   = df["HORAS EXTRA NOCTURNA NORMAL"].round(2)
-    df["RECARGO NOCTURNO NORMAL_DISPLAY"]       = df["RECARGO NOCTURNO NORMAL"].round(2)
-    df["HORAS EXTRA DIURNA DOM/FEST_DISPLAY"]   = df["HORAS EXTRA DIURNA DOM/FEST"].round(2)
-    df["HORAS EXTRA NOCTURNA DOM/FEST_DISPLAY"] = df["HORAS EXTRA NOCTURNA DOM/FEST"].round(2)
-    df["RECARGO NOCTURNO DOM/FEST_DISPLAY"]     = df["RECARGO NOCTURNO DOM/FEST"].round(2)
-
     num_festivos_en_datos = int(df["ES_FESTIVO"].sum())
-    festivos_encontrados = sorted(df[df["ES_FESTIVO"]]["FECHA"].dt.date.unique())
-    festivos_str = ", ".join(f.strftime("%d/%m/%Y") for f in festivos_encontrados) if festivos_encontrados else "Ninguno en el período"
+    festivos_encontrados = (df.loc[df["ES_FESTIVO"], ["FECHA", "FESTIVO"]]
+                            .drop_duplicates("FECHA").sort_values("FECHA"))
+    festivos_str = ", ".join(
+        f"{fecha.strftime('%d/%m/%Y')} ({nombre})"
+        for fecha, nombre in festivos_encontrados.itertuples(index=False)
+    ) if len(festivos_encontrados) else "Ninguno en el período"
 
     st.info(f"""
     ✅ **Configuración aplicada:**
@@ -768,9 +232,15 @@ if input_file and empleados_file and porcentaje_file and turnos_file:
     # ============================================================================
     # ENVÍO AUTOMÁTICO DE CORREO DE NOTIFICACIÓN
     # ============================================================================
-    data_hash = f"{len(df)}_{df[cedula_input].nunique()}_{df['VALOR TOTAL EXTRAS'].sum():.2f}"
-    
-    if not st.session_state.get(f"email_enviado_{data_hash}", False):
+    # El aviso se encola en la bandeja de salida y lo envía el worker de fondo.
+    # La clave es la huella del resultado: otra sesión con los mismos datos no reenvía.
+    config_correo = config_smtp()
+    clave_correo = f"calculo_{resultado.huella}"
+    
+    if config_correo.usuario and not config_correo.configurado:
+        st.warning("⚠️ Notificación por correo desactivada: falta SMTP_PASSWORD para el servidor "
+                   f"{config_correo.servidor} (usa SMTP_SIN_LOGIN = true si no pide contraseña).")
+    elif config_correo.configurado and not st.session_state.get(f"email_encolado_{clave_correo}", False):
         num_registros = len(df)
         num_empleados = df[cedula_input].nunique()
         areas = ", ".join(df["AREA"].dropna().unique().tolist())
@@ -781,54 +251,64 @@ if input_file and empleados_file and porcentaje_file and turnos_file:
             num_registros, num_empleados, areas, fecha_ejecucion, total_valor_extras
         )
         
-        exito, mensaje = enviar_notificacion_email(
+        # Adjunto opcional: agregados por área × mes × empleado (CSV comprimido, con tope de tamaño)
+        adjunto = None
+        if secreto("NOTIFICACION_ADJUNTAR_RESUMEN", False):
+            adjunto = construir_adjunto_resumen(resultado.cubo, f"resumen_horas_extras_{date.today().isoformat()}")
+        
+        if encolar_notificacion(
+            clave_correo,
             destinatario="data_science@fertrac.com",
             asunto=f"📊 Cálculo de Horas Extras - {fecha_ejecucion} - {num_empleados} empleados",
-            cuerpo_html=cuerpo
-        )
-        
-        if exito:
-            st.session_state[f"email_enviado_{data_hash}"] = True
+            cuerpo_html=cuerpo,
+            resumen={
+                "fecha_ejecucion": fecha_ejecucion,
+                "num_registros": num_registros,
+                "num_empleados": int(num_empleados),
+                "areas": areas,
+                "total_valor_extras": float(total_valor_extras),
+            },
+            adjunto=adjunto
+        ):
+            worker_notificaciones().despertar()
+        st.session_state[f"email_encolado_{clave_correo}"] = True
 
-    # Agregar columna de mes y año para análisis temporal
-    df["MES"] = df["FECHA"].dt.to_period('M')
-    
-    meses_espanol = {
-        'January': 'Enero', 'February': 'Febrero', 'March': 'Marzo',
-        'April': 'Abril', 'May': 'Mayo', 'June': 'Junio',
-        'July': 'Julio', 'August': 'Agosto', 'September': 'Septiembre',
-        'October': 'Octubre', 'November': 'Noviembre', 'December': 'Diciembre'
-    }
-    
-    # Incluir el año en MES_NOMBRE para ordenar correctamente cuando hay datos de múltiples años
-    df["MES_NOMBRE_TEMP"] = df["FECHA"].dt.strftime('%B %Y')
-    
-    def traducir_mes(mes_nombre):
-        for ingles, espanol in meses_espanol.items():
-            if ingles in mes_nombre:
-                return mes_nombre.replace(ingles, espanol)
-        return mes_nombre
-    
-    df["MES_NOMBRE"] = df["MES_NOMBRE_TEMP"].apply(traducir_mes)
-    df = df.drop("MES_NOMBRE_TEMP", axis=1)
+    # ============================================================================
+    # CAMBIOS RESPECTO A LA CARGA ANTERIOR
+    # ============================================================================
+    if anterior is not None:
+        cambios = cambios_resultados(anterior.huella, resultado.huella, anterior, resultado, perfilador)
+        conteo = cambios["ESTADO"].value_counts()
+        with st.expander(
+            f"🔄 Cambios respecto a la carga anterior: {conteo.get('Modificado', 0)} modificados, "
+            f"{conteo.get('Nuevo', 0)} nuevos, {conteo.get('Eliminado', 0)} eliminados",
+            expanded=not cambios.empty
+        ):
+            st.caption(f"Se recalcularon {resultado.filas_recalculadas} de {len(df)} registros; "
+                       "el resto se reutilizó de la carga anterior.")
+            if cambios.empty:
+                st.info("Los resultados por registro no cambiaron.")
+            else:
+                st.metric("Diferencia en valor total extras ($)", f"${cambios['DIFERENCIA VALOR'].sum():,.2f}")
+                st.dataframe(cambios, use_container_width=True, hide_index=True)
 
     # FILTRO POR ÁREA
     st.subheader("🔍 Filtros de visualización")
     col_filtro1, col_filtro2 = st.columns(2)
     
     with col_filtro1:
-        areas_disponibles = ["Todas las áreas"] + sorted(df["AREA"].unique().tolist())
+        areas_disponibles = ["Todas las áreas"] + sorted(cubo["AREA"].unique().tolist())
         area_seleccionada = st.selectbox("Seleccionar área:", areas_disponibles)
     
     with col_filtro2:
-        meses_disponibles = ["Todos los meses"] + sorted(df["MES_NOMBRE"].unique().tolist())
+        meses_disponibles = ["Todos los meses"] + sorted(cubo["MES_NOMBRE"].unique().tolist())
         mes_seleccionado = st.selectbox("Seleccionar mes:", meses_disponibles)
     
-    df_filtrado = df.copy()
-    if area_seleccionada != "Todas las áreas":
-        df_filtrado = df_filtrado[df_filtrado["AREA"] == area_seleccionada]
-    if mes_seleccionado != "Todos los meses":
-        df_filtrado = df_filtrado[df_filtrado["MES_NOMBRE"] == mes_seleccionado]
+    # Métricas y gráficos leen la rebanada del cubo; el detalle solo toma las filas del filtro
+    filtro_area = None if area_seleccionada == "Todas las áreas" else area_seleccionada
+    filtro_mes = None if mes_seleccionado == "Todos los meses" else mes_seleccionado
+    cubo_filtrado = rebanada_cubo(cubo, filtro_area, filtro_mes)
+    posiciones = posiciones_filas(resultado.filas_area_mes, filtro_area, filtro_mes)
 
     st.subheader("📊 Resultados del cálculo")
     
@@ -848,12 +328,15 @@ if input_file and empleados_file and porcentaje_file and turnos_file:
         "VALOR TOTAL EXTRAS",
         "COMISIÓN O BONIFICACIÓN"
     ]
-    
-    columnas_disponibles = [col for col in columnas_mostrar if col in df_filtrado.columns]
-    
-    df_display = df_filtrado[columnas_disponibles].copy()
+    # La cédula va con el encabezado del archivo (CÉDULA o CEDULA); las columnas
+    # que el archivo no trae no se muestran ni se ofrecen para ordenar
+    columnas_mostrar = columnas_disponibles(
+        df, [resultado.columna_cedula if col == "CÉDULA" else col for col in columnas_mostrar]
+    )
+    columnas_busqueda = [resultado.columna_cedula if col == "CÉDULA" else col for col in COLUMNAS_BUSQUEDA]
     
     renombrar = {
+        resultado.columna_cedula:               "CÉDULA",
         "HORAS TRABAJADAS_DISPLAY":             "HORAS TRABAJADAS",
         "HORAS EXTRA DIURNA NORMAL_DISPLAY":    "Cant. H. Extra Diurna",
         "HORAS EXTRA DIURNA DOM/FEST_DISPLAY":  "Cant. H. Extra Diurna Dom/Fest",
@@ -863,7 +346,6 @@ if input_file and empleados_file and porcentaje_file and turnos_file:
         "RECARGO NOCTURNO DOM/FEST_DISPLAY":    "Cant. Recargo Nocturno Dom/Fest",
         "TOTAL HORAS EXTRA_DISPLAY":            "TOTAL HORAS EXTRA"
     }
-    df_display = df_display.rename(columns=renombrar)
     
     columnas_dinero = [
         "VALOR EXTRA DIURNA NORMAL", "VALOR EXTRA DIURNA DOM/FEST",
@@ -872,195 +354,186 @@ if input_file and empleados_file and porcentaje_file and turnos_file:
         "VALOR TOTAL EXTRAS", "COMISIÓN O BONIFICACIÓN"
     ]
     
-    for col in columnas_dinero:
-        if col in df_display.columns:
-            df_display[col] = df_display[col].apply(lambda x: f"${x:,.2f}" if pd.notna(x) else "$0.00")
+    # Los valores siguen siendo números (se ordenan como números en la tabla);
+    # el formato de moneda y de horas se declara por columna
+    formato_tabla = {
+        "FECHA": st.column_config.DateColumn(format="YYYY-MM-DD"),
+        "HRA INGRESO": st.column_config.TimeColumn(format="HH:mm"),
+        "HORA SALIDA": st.column_config.TimeColumn(format="HH:mm"),
+        **{col: st.column_config.NumberColumn(format="dollar") for col in columnas_dinero},
+        **{nombre: st.column_config.NumberColumn(format="%.2f") for nombre in renombrar.values()},
+    }
+    
+    # Búsqueda, orden y páginas se resuelven en el servidor: al navegador solo
+    # llega la página visible
+    col_tabla1, col_tabla2, col_tabla3, col_tabla4 = st.columns([3, 3, 2, 2])
+    with col_tabla1:
+        busqueda = st.text_input("Buscar (nombre, cédula, cargo, área, turno o actividad):",
+                                 key="busqueda_resultados")
+    with col_tabla2:
+        # Un orden elegido con otro archivo que ya no tiene esa columna vuelve al original
+        if st.session_state.get("orden_resultados") not in [None] + columnas_mostrar:
+            st.session_state["orden_resultados"] = None
+        orden_tabla = st.selectbox("Ordenar por:", [None] + columnas_mostrar, key="orden_resultados",
+                                   format_func=lambda col: "Orden original" if col is None else renombrar.get(col, col))
+    with col_tabla3:
+        descendente = st.radio("Sentido:", ["Ascendente", "Descendente"], horizontal=True,
+                               key="sentido_resultados") == "Descendente"
+    with col_tabla4:
+        filas_pagina = st.selectbox("Filas por página:", FILAS_POR_PAGINA, index=1, key="filas_pagina_resultados")
+    
+    posiciones_tabla_resultados = posiciones_tabla(df, posiciones, busqueda, orden_tabla, descendente,
+                                                   columnas_busqueda)
+    total_tabla = len(posiciones_tabla_resultados)
+    paginas = max(1, -(-total_tabla // filas_pagina))
+    # Otro filtro, búsqueda u orden vuelve a la primera página
+    consulta_tabla = (resultado.huella, area_seleccionada, mes_seleccionado, busqueda, orden_tabla, descendente,
+                      filas_pagina)
+    if st.session_state.get("consulta_tabla_resultados") != consulta_tabla:
+        st.session_state["consulta_tabla_resultados"] = consulta_tabla
+        st.session_state["pagina_resultados"] = 1
+    pagina = st.number_input(f"Página (de {paginas}):", min_value=1, max_value=paginas, step=1,
+                             key="pagina_resultados")
+    inicio_pagina = (pagina - 1) * filas_pagina
+    
+    # Solo las filas y columnas de la página pasan a tipos de presentación
+    with perfilador.etapa("tabla_resultados") as registro:
+        df_display = tipos_presentacion(
+            df, columnas_mostrar, posiciones_tabla_resultados[inicio_pagina:inicio_pagina + filas_pagina]
+        )
+        registro.filas = len(df_display)
+    
+    df_display = df_display.rename(columns=renombrar)
     
-    st.dataframe(df_display, use_container_width=True)
+    st.dataframe(df_display, use_container_width=True, column_config=formato_tabla)
+    st.caption(f"Mostrando {inicio_pagina + 1 if total_tabla else 0}–{inicio_pagina + len(df_display)} "
+               f"de {total_tabla} registros")
 
     # Visualizaciones
+    # Los PNG se cachean por (tipo, filtros, huella de datos): volver a un filtro
+    # anterior no re-dibuja, y la versión de 300 dpi solo se genera al descargar.
+    huella = resultado.huella
+    hoy = date.today().isoformat()
+
+    def mostrar_grafico(tipo, area, mes, df_grafico, label, nombre_archivo, key=None):
+        png = grafico_resultados(tipo, area, mes, huella, DPI_PANTALLA, df_grafico, perfilador)
+        if png is None:
+            st.info("No hay datos para mostrar con los filtros seleccionados")
+            return
+        st.image(png, width="stretch")
+        st.download_button(
+            label=label,
+            data=lambda: grafico_resultados(tipo, area, mes, huella, DPI_DESCARGA, df_grafico, perfilador),
+            file_name=f"{nombre_archivo}_{hoy}.png",
+            mime="image/png",
+            key=key
+        )
+
     col_viz1, col_viz2 = st.columns(2)
     
     with col_viz1:
         st.subheader("👤 Horas extra por empleado")
-        fig1, ax1 = plt.subplots(figsize=(10, 6))
-        empleado_stats = df_filtrado.groupby("NOMBRE").agg({
-            "HORAS EXTRA DIURNA_DISPLAY": "sum",
-            "HORAS EXTRA NOCTURNA_DISPLAY": "sum",
-            "RECARGO NOCTURNO_DISPLAY": "sum"
-        })
-        if not empleado_stats.empty:
-            empleado_stats.plot(kind='bar', ax=ax1, color=['#f37021', '#ff6600', '#ff9966'], stacked=True)
-            ax1.set_ylabel("Horas")
-            ax1.set_xlabel("Empleado")
-            ax1.legend(["Extra Diurna", "Extra Nocturna", "Recargo Nocturno"])
-            plt.xticks(rotation=45, ha='right')
-            plt.tight_layout()
-            st.pyplot(fig1)
-            
-            buf1 = BytesIO()
-            fig1.savefig(buf1, format='png', dpi=300, bbox_inches='tight')
-            buf1.seek(0)
-            st.download_button(
-                label="📊 Descargar gráfico empleados",
-                data=buf1,
-                file_name=f"grafico_empleados_{date.today().isoformat()}.png",
-                mime="image/png",
-                key="download_empleados"
-            )
-        else:
-            st.info("No hay datos para mostrar con los filtros seleccionados")
+        mostrar_grafico("empleados", area_seleccionada, mes_seleccionado, cubo_filtrado,
+                        "📊 Descargar gráfico empleados", "grafico_empleados", key="download_empleados")
 
     with col_viz2:
         st.subheader("🏢 Horas extra por área")
-        fig2, ax2 = plt.subplots(figsize=(10, 6))
-        area_stats = df_filtrado.groupby("AREA").agg({
-            "HORAS EXTRA DIURNA_DISPLAY": "sum",
-            "HORAS EXTRA NOCTURNA_DISPLAY": "sum",
-            "RECARGO NOCTURNO_DISPLAY": "sum"
-        })
-        if not area_stats.empty:
-            area_stats.plot(kind='barh', ax=ax2, color=['#f37021', '#ff6600', '#ff9966'], stacked=True)
-            ax2.set_xlabel("Horas")
-            ax2.set_ylabel("Área")
-            ax2.legend(["Extra Diurna", "Extra Nocturna", "Recargo Nocturno"])
-            plt.tight_layout()
-            st.pyplot(fig2)
-            
-            buf2 = BytesIO()
-            fig2.savefig(buf2, format='png', dpi=300, bbox_inches='tight')
-            buf2.seek(0)
-            st.download_button(
-                label="📊 Descargar gráfico áreas",
-                data=buf2,
-                file_name=f"grafico_areas_{date.today().isoformat()}.png",
-                mime="image/png",
-                key="download_areas"
-            )
-        else:
-            st.info("No hay datos para mostrar con los filtros seleccionados")
+        mostrar_grafico("areas", area_seleccionada, mes_seleccionado, cubo_filtrado,
+                        "📊 Descargar gráfico áreas", "grafico_areas", key="download_areas")
 
-    # COMPARATIVO MENSUAL
+    # COMPARATIVO MENSUAL (siempre sobre todos los datos, sin filtros)
     st.subheader("📅 Comparativo mensual")
     
-    comparativo_mensual = df.groupby("MES_NOMBRE").agg({
-        "HORAS EXTRA DIURNA_DISPLAY": "sum",
-        "HORAS EXTRA NOCTURNA_DISPLAY": "sum",
-        "RECARGO NOCTURNO_DISPLAY": "sum",
-        "VALOR TOTAL EXTRAS": "sum"
-    }).reset_index()
-    
-    def extraer_fecha(mes_nombre):
-        partes = mes_nombre.split()
-        if len(partes) == 2:
-            mes_texto, anio = partes
-            meses = {
-                'Enero': 1, 'Febrero': 2, 'Marzo': 3, 'Abril': 4,
-                'Mayo': 5, 'Junio': 6, 'Julio': 7, 'Agosto': 8,
-                'Septiembre': 9, 'Octubre': 10, 'Noviembre': 11, 'Diciembre': 12
-            }
-            mes_num = meses.get(mes_texto, 1)
-            return datetime(int(anio), mes_num, 1)
-        return datetime(2025, 1, 1)
-    
-    comparativo_mensual["ORDEN"] = comparativo_mensual["MES_NOMBRE"].apply(extraer_fecha)
-    comparativo_mensual = comparativo_mensual.sort_values("ORDEN")
+    comparativo_mes = comparativo_mensual(cubo)
     
     col_comp1, col_comp2 = st.columns(2)
     
     with col_comp1:
         st.markdown("#### Horas por mes")
-        fig3, ax3 = plt.subplots(figsize=(10, 6))
-        x = range(len(comparativo_mensual))
-        width = 0.25
-        
-        ax3.bar([i - width for i in x], comparativo_mensual["HORAS EXTRA DIURNA_DISPLAY"], 
-                width, label='Extra Diurna', color='#f37021')
-        ax3.bar(x, comparativo_mensual["HORAS EXTRA NOCTURNA_DISPLAY"], 
-                width, label='Extra Nocturna', color='#ff6600')
-        ax3.bar([i + width for i in x], comparativo_mensual["RECARGO NOCTURNO_DISPLAY"], 
-                width, label='Recargo Nocturno', color='#ff9966')
-        
-        ax3.set_xlabel('Mes')
-        ax3.set_ylabel('Horas')
-        ax3.set_xticks(list(x))
-        ax3.set_xticklabels(comparativo_mensual["MES_NOMBRE"].tolist(), rotation=45, ha='right')
-        ax3.legend()
-        plt.tight_layout()
-        st.pyplot(fig3)
-        
-        buf3 = BytesIO()
-        fig3.savefig(buf3, format='png', dpi=300, bbox_inches='tight')
-        buf3.seek(0)
-        st.download_button(
-            label="📊 Descargar gráfico de horas",
-            data=buf3,
-            file_name=f"grafico_horas_mensual_{date.today().isoformat()}.png",
-            mime="image/png"
-        )
+        mostrar_grafico("horas_mensual", None, None, cubo,
+                        "📊 Descargar gráfico de horas", "grafico_horas_mensual")
     
     with col_comp2:
         st.markdown("#### Costos por mes")
-        fig4, ax4 = plt.subplots(figsize=(10, 6))
-        
-        x = range(len(comparativo_mensual))
-        
-        ax4.bar(x, comparativo_mensual["VALOR TOTAL EXTRAS"], 
-                color='#f37021', label='Valor Total Extras')
-        
-        ax4.set_xlabel('Mes')
-        ax4.set_ylabel('Valor ($)')
-        ax4.set_xticks(list(x))
-        ax4.set_xticklabels(comparativo_mensual["MES_NOMBRE"].tolist(), rotation=45, ha='right')
-        ax4.legend()
-        plt.grid(True, alpha=0.3, axis='y')
-        plt.tight_layout()
-        st.pyplot(fig4)
-        
-        buf4 = BytesIO()
-        fig4.savefig(buf4, format='png', dpi=300, bbox_inches='tight')
-        buf4.seek(0)
-        st.download_button(
-            label="📊 Descargar gráfico de costos",
-            data=buf4,
-            file_name=f"grafico_costos_mensual_{date.today().isoformat()}.png",
-            mime="image/png"
-        )
+        mostrar_grafico("costos_mensual", None, None, cubo,
+                        "📊 Descargar gráfico de costos", "grafico_costos_mensual")
     
     st.markdown("#### Tabla comparativa mensual")
-    tabla_comparativa = comparativo_mensual[["MES_NOMBRE", "HORAS EXTRA DIURNA_DISPLAY", "HORAS EXTRA NOCTURNA_DISPLAY",
+    tabla_comparativa = comparativo_mes[["MES_NOMBRE", "HORAS EXTRA DIURNA_DISPLAY", "HORAS EXTRA NOCTURNA_DISPLAY",
                                              "RECARGO NOCTURNO_DISPLAY", "VALOR TOTAL EXTRAS"]].copy()
     tabla_comparativa.columns = ["Mes", "H. Extra Diurna", "H. Extra Nocturna", "H. Recargo Nocturno",
                                   "Valor Total Extras ($)"]
     
-    tabla_comparativa["Valor Total Extras ($)"] = tabla_comparativa["Valor Total Extras ($)"].apply(lambda x: f"${x:,.2f}")
-    tabla_comparativa["H. Extra Diurna"] = tabla_comparativa["H. Extra Diurna"].apply(lambda x: f"{x:.2f}")
-    tabla_comparativa["H. Extra Nocturna"] = tabla_comparativa["H. Extra Nocturna"].apply(lambda x: f"{x:.2f}")
-    tabla_comparativa["H. Recargo Nocturno"] = tabla_comparativa["H. Recargo Nocturno"].apply(lambda x: f"{x:.2f}")
-    
-    st.dataframe(tabla_comparativa, use_container_width=True, hide_index=True)
+    st.dataframe(
+        tabla_comparativa, use_container_width=True, hide_index=True,
+        column_config={
+            "H. Extra Diurna": st.column_config.NumberColumn(format="%.2f"),
+            "H. Extra Nocturna": st.column_config.NumberColumn(format="%.2f"),
+            "H. Recargo Nocturno": st.column_config.NumberColumn(format="%.2f"),
+            "Valor Total Extras ($)": st.column_config.NumberColumn(format="dollar"),
+        },
+    )
 
     # Resumen estadístico
     st.subheader("📈 Resumen general")
     col_stat1, col_stat2, col_stat3, col_stat4, col_stat5, col_stat6 = st.columns(6)
     
     with col_stat1:
-        st.metric("H. Extra Diurnas", f"{df_filtrado['HORAS EXTRA DIURNA_DISPLAY'].sum():.2f}")
+        st.metric("H. Extra Diurnas", f"{cubo_filtrado['HORAS EXTRA DIURNA_DISPLAY'].sum():.2f}")
     
     with col_stat2:
-        st.metric("H. Extra Nocturnas", f"{df_filtrado['HORAS EXTRA NOCTURNA_DISPLAY'].sum():.2f}")
+        st.metric("H. Extra Nocturnas", f"{cubo_filtrado['HORAS EXTRA NOCTURNA_DISPLAY'].sum():.2f}")
     
     with col_stat3:
-        st.metric("H. Recargo Nocturno", f"{df_filtrado['RECARGO NOCTURNO_DISPLAY'].sum():.2f}")
+        st.metric("H. Recargo Nocturno", f"{cubo_filtrado['RECARGO NOCTURNO_DISPLAY'].sum():.2f}")
     
     with col_stat4:
-        st.metric("Total Extras ($)", f"${df_filtrado['VALOR TOTAL EXTRAS'].sum():,.2f}")
+        st.metric("Total Extras ($)", f"${cubo_filtrado['VALOR TOTAL EXTRAS'].sum():,.2f}")
     
     with col_stat5:
-        st.metric("Total Bonificaciones ($)", f"${df_filtrado['COMISIÓN O BONIFICACIÓN'].sum():,.2f}")
+        st.metric("Total Bonificaciones ($)", f"${cubo_filtrado['COMISIÓN O BONIFICACIÓN'].sum():,.2f}")
     
     with col_stat6:
-        st.metric("Total General ($)", f"${df_filtrado['VALOR TOTAL EXTRAS'].sum():,.2f}")
+        st.metric("Total General ($)", f"${cubo_filtrado['VALOR TOTAL EXTRAS'].sum():,.2f}")
+
+    # TOPES LEGALES: 2 horas extra diarias y 12 semanales por empleado
+    st.subheader("⚖️ Topes legales de horas extra")
+    incumplimientos = resultado.topes.incumplimientos
+    if filtro_area is not None:
+        incumplimientos = incumplimientos[(incumplimientos["AREA"] == filtro_area).to_numpy()]
+
+    if incumplimientos.empty:
+        st.success(f"✅ Ningún empleado supera {TOPE_DIARIO_HORAS_EXTRA:g} horas extra diarias "
+                   f"ni {TOPE_SEMANAL_HORAS_EXTRA:g} semanales en el período.")
+    else:
+        conteo_topes = incumplimientos["TOPE"].value_counts()
+        col_tope1, col_tope2, col_tope3, col_tope4 = st.columns(4)
+        col_tope1.metric("Empleados con excesos", incumplimientos["CÉDULA"].nunique())
+        col_tope2.metric(f"Días > {TOPE_DIARIO_HORAS_EXTRA:g} h", int(conteo_topes.get("Diario", 0)))
+        col_tope3.metric(f"Semanas > {TOPE_SEMANAL_HORAS_EXTRA:g} h", int(conteo_topes.get("Semanal", 0)))
+        col_tope4.metric("Ventanas de 7 días", int(conteo_topes.get("7 días móviles", 0)))
+
+        col_filtro_tope1, col_filtro_tope2 = st.columns(2)
+        with col_filtro_tope1:
+            tipos_tope = st.multiselect("Tipo de tope:", TIPOS_TOPE, default=TIPOS_TOPE)
+        with col_filtro_tope2:
+            busqueda_tope = st.text_input("Buscar empleado o cédula:", key="busqueda_topes").strip()
+
+        mascara = incumplimientos["TOPE"].isin(tipos_tope)
+        if busqueda_tope:
+            mascara &= (incumplimientos["NOMBRE"].astype(str).str.contains(busqueda_tope, case=False, regex=False)
+                        | incumplimientos["CÉDULA"].astype(str).str.contains(busqueda_tope, regex=False))
+        st.dataframe(
+            incumplimientos[mascara.to_numpy()], use_container_width=True, hide_index=True,
+            column_config={
+                "DESDE": st.column_config.DateColumn(format="YYYY-MM-DD"),
+                "HASTA": st.column_config.DateColumn(format="YYYY-MM-DD"),
+                "HORAS EXTRA": st.column_config.NumberColumn(format="%.2f"),
+                "LÍMITE": st.column_config.NumberColumn(format="%.2f"),
+                "EXCESO": st.column_config.NumberColumn(format="%.2f"),
+            },
+        )
+        st.caption("El detalle completo queda en la hoja \"Topes legales\" del Excel descargable.")
 
     # Descarga de resultados
     st.subheader("💾 Descargar resultados")
@@ -1071,189 +544,13 @@ if input_file and empleados_file and porcentaje_file and turnos_file:
         st.markdown("### 📥 Descargar datos completos en Excel")
         st.markdown("Incluye todos los cálculos y resultados detallados")
         
-        from openpyxl import Workbook
-        from openpyxl.styles import Font, Alignment, Border, Side
-        
-        hoy = date.today().isoformat()
         output_filename = f"resultado_pagos_{hoy}.xlsx"
         
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Resultados"
-        
-        headers = [
-            "CÉDULA", "NOMBRE", "CARGO", "AREA", "SALARIO BASICO", "COMISIÓN O BONIFICACIÓN",
-            "TOTAL BASE LIQUIDACION", "Valor Ordinario Hora", "FECHA", "DÍA",
-            "TIPO TARIFA", "TURNO", "TURNO ENTRADA", "TURNO SALIDA",
-            "HORA REAL INGRESO", "HORA REAL SALIDA", "ACTIVIDAD DESARROLLADA",
-            "HORAS TRABAJADAS",
-            "Cant. HORAS EXTRA DIURNA",          "VALOR EXTRA DIURNA",
-            "Cant. HORAS EXTRA DIURNA DOM/FEST",  "VALOR EXTRA DIURNA DOM/FEST",
-            "Cant. HORAS EXTRA NOCTURNA",         "VALOR EXTRA NOCTURNA",
-            "Cant. HORAS EXTRA NOCTURNA DOM/FEST","VALOR EXTRA NOCTURNA DOM/FEST",
-            "Cant. RECARGO NOCTURNO",             "VALOR RECARGO NOCTURNO",
-            "Cant. RECARGO NOCTURNO DOM/FEST",    "VALOR RECARGO NOCTURNO DOM/FEST",
-            "TOTAL HORAS EXTRA", "VALOR TOTAL EXTRAS",
-            "MES", "MES_NOMBRE", "Observacion"
-        ]
-        
-        ws.append(headers)
-        
-        header_font = Font(bold=True, size=11)
-        border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-        
-        for cell in ws[1]:
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-            cell.border = border
-        
-        column_mapping = {
-            "CÉDULA": "CÉDULA",
-            "NOMBRE": "NOMBRE",
-            "CARGO": "CARGO",
-            "AREA": "AREA",
-            "SALARIO BASICO": "SALARIO BASICO",
-            "COMISIÓN O BONIFICACIÓN": "COMISIÓN O BONIFICACIÓN",
-            "TOTAL BASE LIQUIDACION": "TOTAL BASE LIQUIDACION",
-            "Valor Ordinario Hora": "IMPORTE HORA",
-            "FECHA": "FECHA",
-            "DÍA": "DÍA",
-            "TIPO TARIFA": "TIPO TARIFA",
-            "TURNO": "TURNO",
-            "TURNO ENTRADA": "TURNO ENTRADA",
-            "TURNO SALIDA": "TURNO SALIDA",
-            "HORA REAL INGRESO": "HRA INGRESO",
-            "HORA REAL SALIDA": "HORA SALIDA",
-            "ACTIVIDAD DESARROLLADA": "ACTIVIDAD DESARROLLADA",
-            "HORAS TRABAJADAS": "HORAS TRABAJADAS",
-            "Cant. HORAS EXTRA DIURNA":           "HORAS EXTRA DIURNA NORMAL",
-            "VALOR EXTRA DIURNA":                 "VALOR EXTRA DIURNA NORMAL",
-            "Cant. HORAS EXTRA DIURNA DOM/FEST":  "HORAS EXTRA DIURNA DOM/FEST",
-            "VALOR EXTRA DIURNA DOM/FEST":        "VALOR EXTRA DIURNA DOM/FEST",
-            "Cant. HORAS EXTRA NOCTURNA":         "HORAS EXTRA NOCTURNA NORMAL",
-            "VALOR EXTRA NOCTURNA":               "VALOR EXTRA NOCTURNA NORMAL",
-            "Cant. HORAS EXTRA NOCTURNA DOM/FEST":"HORAS EXTRA NOCTURNA DOM/FEST",
-            "VALOR EXTRA NOCTURNA DOM/FEST":      "VALOR EXTRA NOCTURNA DOM/FEST",
-            "Cant. RECARGO NOCTURNO":             "RECARGO NOCTURNO NORMAL",
-            "VALOR RECARGO NOCTURNO":             "VALOR RECARGO NOCTURNO NORMAL",
-            "Cant. RECARGO NOCTURNO DOM/FEST":    "RECARGO NOCTURNO DOM/FEST",
-            "VALOR RECARGO NOCTURNO DOM/FEST":    "VALOR RECARGO NOCTURNO DOM/FEST",
-            "TOTAL HORAS EXTRA": "TOTAL HORAS EXTRA",
-            "VALOR TOTAL EXTRAS": "VALOR TOTAL EXTRAS",
-            "MES": "MES",
-            "MES_NOMBRE": "MES_NOMBRE",
-            "Observacion": "OBSERVACIONES"
-        }
-        
-        for idx, row in df.iterrows():
-            row_data = []
-            for header in headers:
-                df_col = column_mapping.get(header, header)
-                
-                if df_col in df.columns:
-                    value = row[df_col]
-                    
-                    if pd.isna(value):
-                        row_data.append("")
-                    elif isinstance(value, (time, datetime)):
-                        if isinstance(value, datetime):
-                            row_data.append(value.strftime('%Y-%m-%d %H:%M'))
-                        else:
-                            row_data.append(value.strftime('%H:%M'))
-                    elif isinstance(value, (np.int64, np.int32, np.int16, np.int8)):
-                        row_data.append(int(value))
-                    elif isinstance(value, (np.float64, np.float32, np.float16)):
-                        row_data.append(float(value))
-                    elif isinstance(value, (pd.Period,)):
-                        row_data.append(str(value))
-                    elif hasattr(value, 'item'):
-                        row_data.append(value.item())
-                    else:
-                        try:
-                            if isinstance(value, (int, float, str, bool)):
-                                row_data.append(value)
-                            else:
-                                row_data.append(str(value))
-                        except:
-                            row_data.append(str(value))
-                else:
-                    row_data.append("")
-            
-            ws.append(row_data)
-        
-        center_alignment = Alignment(horizontal="center", vertical="center")
-        col_formats = {}
-        for col_idx, header_name in enumerate(headers, 1):
-            if "VALOR" in header_name or "SALARIO" in header_name or "TOTAL BASE" in header_name or "Valor Ordinario" in header_name:
-                col_formats[col_idx] = '#,##0.00'
-            elif "Cant." in header_name or "HORAS" in header_name:
-                col_formats[col_idx] = '0.00'
-            else:
-                col_formats[col_idx] = None
-        
-        for row_idx in range(2, ws.max_row + 1):
-            for col_idx in range(1, len(headers) + 1):
-                cell = ws.cell(row=row_idx, column=col_idx)
-                cell.border = border
-                cell.alignment = center_alignment
-                
-                fmt = col_formats[col_idx]
-                if fmt and isinstance(cell.value, (int, float)):
-                    cell.number_format = fmt
-        
-        column_widths = {
-            'A': 12,  # CÉDULA
-            'B': 25,  # NOMBRE
-            'C': 20,  # CARGO
-            'D': 15,  # AREA
-            'E': 15,  # SALARIO BASICO
-            'F': 18,  # COMISIÓN
-            'G': 18,  # TOTAL BASE
-            'H': 15,  # Valor Hora
-            'I': 12,  # FECHA
-            'J': 12,  # DÍA
-            'K': 16,  # TIPO TARIFA
-            'L': 22,  # TURNO
-            'M': 12,  # TURNO ENTRADA
-            'N': 12,  # TURNO SALIDA
-            'O': 14,  # HORA REAL INGRESO
-            'P': 14,  # HORA REAL SALIDA
-            'Q': 30,  # ACTIVIDAD
-            'R': 12,  # HORAS TRABAJADAS
-            'S': 12,  # Cant Extra Diurna
-            'T': 15,  # Valor Extra Diurna
-            'U': 18,  # Cant Extra Diurna Dom/Fest
-            'V': 20,  # Valor Extra Diurna Dom/Fest
-            'W': 12,  # Cant Extra Nocturna
-            'X': 15,  # Valor Extra Nocturna
-            'Y': 18,  # Cant Extra Nocturna Dom/Fest
-            'Z': 20,  # Valor Extra Nocturna Dom/Fest
-            'AA': 12, # Cant Recargo Nocturno
-            'AB': 15, # Valor Recargo Nocturno
-            'AC': 18, # Cant Recargo Nocturno Dom/Fest
-            'AD': 20, # Valor Recargo Nocturno Dom/Fest
-            'AE': 12, # Total Horas Extra
-            'AF': 18, # Valor Total Extras
-            'AG': 10, # MES
-            'AH': 15, # MES_NOMBRE
-            'AI': 30, # Observacion
-        }
-        
-        for col, width in column_widths.items():
-            ws.column_dimensions[col].width = width
-        
-        excel_buffer = BytesIO()
-        wb.save(excel_buffer)
-        excel_buffer.seek(0)
+        # El libro se genera al hacer clic (no en cada rerun de filtros)
         
         st.download_button(
             label="📥 DESCARGAR EXCEL (.XLSX) ⬇️",
-            data=excel_buffer,
+            data=lambda: excel_resultados(huella, df, resultado.topes.incumplimientos, perfilador),
             file_name=output_filename,
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             key="download_excel",
@@ -1287,3 +584,6 @@ if input_file and empleados_file and porcentaje_file and turnos_file:
         - Gráfico de horas mensuales
         - Gráfico de costos mensuales
         """)
+
+    # Al final, para incluir lo medido en esta ejecución
+    panel_perfil(perfilador)
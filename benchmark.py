@@ -0,0 +1,230 @@
+"""
+Pruebas de rendimiento del cálculo por etapas, sobre datos sintéticos
+(datos_sinteticos.py) y sin dependencia de Streamlit.
+
+Cada escenario genera los cuatro archivos de entrada y mide la carga de
+archivos, el cálculo completo y la exportación a Excel. Las etapas internas
+del cálculo (cruce con empleados, fechas y horas, turnos, horas extra y
+valoración, agregación...) no se reimplementan aquí: salen del Perfilador
+que recibe calcular_horas_extras, así que se mide exactamente el camino de
+producción. Los tiempos se comparan contra una línea base guardada en JSON;
+una etapa más lenta que la base por encima de la tolerancia se reporta como
+regresión y el script termina con código 1:
+
+    python benchmark.py                                   # 1k, 10k y 100k filas
+    python benchmark.py --escenarios 1k 10k              # solo algunos
+    python benchmark.py --escenarios 1M                  # 1M filas, a pedido
+    python benchmark.py --escenarios 1k 10k --guardar-linea-base --repeticiones 5
+
+La línea base depende de la máquina: se guarda y se compara en el mismo equipo.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from carga_archivos import MOTOR_EXCEL, leer_archivo
+from datos_sinteticos import NOMBRES_ARCHIVO, archivo_bytes, generar_datos
+from exportacion import generar_excel_resultados
+from motor_calculo import calcular_horas_extras
+from perfilador import Perfilador
+
+# Escenario → (empleados, días); filas = empleados × días
+ESCENARIOS = {
+    "1k": (50, 20),
+    "10k": (250, 40),
+    "100k": (1_000, 100),
+    "1M": (2_500, 400),
+}
+
+# El escenario de 1M filas tarda minutos y no tiene línea base incluida: se
+# corre solo a pedido (--escenarios 1M), sin entrar en la comparación por defecto.
+ESCENARIOS_POR_DEFECTO = ["1k", "10k", "100k"]
+
+# Etapas medidas directamente, en orden de ejecución. Las etapas del motor (las
+# secciones que calcular_horas_extras marca en el Perfilador) se reportan entre
+# la carga y el cálculo completo, con el nombre que les da el motor.
+ETAPAS = ["carga", "calculo_completo", "exportacion"]
+
+LINEA_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_linea_base.json")
+# Una etapa es regresión si tarda más de (1 + TOLERANCIA) × base y al menos
+# MARGEN_SEGUNDOS más que la base (los tiempos muy cortos son ruido). La carga
+# y la exportación dependen sobre todo del disco y de openpyxl, y en la misma
+# máquina varían más que el cálculo: usan TOLERANCIA_ETAPA.
+TOLERANCIA = 0.25
+TOLERANCIA_ETAPA = {"carga": 0.5, "exportacion": 0.5}
+MARGEN_SEGUNDOS = 0.05
+
+# ============================================================================
+# ETAPAS
+# ============================================================================
+# Cada etapa recibe el estado del escenario y agrega lo que producen; solo se
+# mide la llamada a la etapa, no la preparación de sus entradas.
+def _etapa_carga(estado):
+    estado["leidos"] = {
+        tipo: leer_archivo(contenido, f"{NOMBRES_ARCHIVO[tipo]}.{estado['formato']}", tipo, directorio_cache=None)
+        for tipo, contenido in estado["archivos"].items()
+    }
+
+def _etapa_calculo_completo(estado):
+    leidos = estado["leidos"]
+    perfilador = Perfilador()
+    estado["resultado"] = calcular_horas_extras(leidos["input"], leidos["empleados"],
+                                                leidos["porcentaje"], leidos["turnos"],
+                                                perfilador=perfilador, procesos=estado["procesos"])
+    estado["etapas_motor"] = {registro.nombre: registro.segundos
+                              for registro in perfilador.etapas if registro.nivel == 0}
+
+def _etapa_exportacion(estado):
+    resultado = estado["resultado"]
+    estado["excel_bytes"] = len(generar_excel_resultados(resultado.df, resultado.topes.incumplimientos))
+
+FUNCIONES_ETAPA = {
+    "carga": _etapa_carga,
+    "calculo_completo": _etapa_calculo_completo,
+    "exportacion": _etapa_exportacion,
+}
+
+# ============================================================================
+# EJECUCIÓN
+# ============================================================================
+def medir_escenario(escenario, formato="xlsx", repeticiones=3, etapas=None, procesos=1):
+    """
+    Genera los datos del escenario y mide las etapas pedidas (None = todas):
+    "carga", "calculo_completo", "exportacion" o una etapa del motor, que se
+    mide con el cálculo completo. Las que son requisito de otra se ejecutan
+    igual, una vez y sin reportarse. Retorna {"filas": n, "etapas": {etapa:
+    segundos}} con el mínimo de las repeticiones de cada etapa. procesos se
+    usa en el cálculo completo (ver calcular_horas_extras).
+    """
+    n_empleados, n_dias = ESCENARIOS[escenario]
+    archivos = generar_datos(n_empleados, n_dias)
+    estado = {
+        "formato": formato,
+        "procesos": procesos,
+        "archivos": {tipo: archivo_bytes(df, formato) for tipo, df in archivos.items()},
+    }
+    del archivos
+
+    def pedida(etapa):
+        return etapas is None or etapa in etapas
+
+    calculo_pedido = etapas is None or any(etapa not in ("carga", "exportacion") for etapa in etapas)
+    ejecutar = ["carga"]
+    if calculo_pedido or pedida("exportacion"):
+        ejecutar.append("calculo_completo")
+    if pedida("exportacion"):
+        ejecutar.append("exportacion")
+
+    tiempos, tiempos_motor = {}, {}
+    for etapa in ejecutar:
+        medida = calculo_pedido if etapa == "calculo_completo" else pedida(etapa)
+        for _ in range(repeticiones if medida else 1):
+            gc.collect()
+            inicio = time.perf_counter()
+            FUNCIONES_ETAPA[etapa](estado)
+            segundos = time.perf_counter() - inicio
+            tiempos[etapa] = min(tiempos.get(etapa, float("inf")), segundos)
+            if etapa == "calculo_completo":
+                for nombre, segundos_motor in estado["etapas_motor"].items():
+                    tiempos_motor[nombre] = min(tiempos_motor.get(nombre, float("inf")), segundos_motor)
+
+    orden = ["carga", *tiempos_motor, "calculo_completo", "exportacion"]
+    todos = {**tiempos, **tiempos_motor}
+    return {"filas": n_empleados * n_dias,
+            "etapas": {etapa: round(todos[etapa], 4) for etapa in orden if etapa in todos and pedida(etapa)}}
+
+def entorno():
+    """Versiones y máquina con las que se midió (para leer una línea base)."""
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "motor_excel": MOTOR_EXCEL,
+    }
+
+def comparar_con_linea_base(resultados, linea_base, tolerancia=TOLERANCIA, margen=MARGEN_SEGUNDOS,
+                            tolerancia_etapa=TOLERANCIA_ETAPA):
+    """
+    Compara los tiempos con la línea base. Retorna una lista de
+    (escenario, etapa, segundos_base, segundos_actuales) de las regresiones;
+    los escenarios o etapas sin línea base, o medidos con otro formato de
+    archivo u otro número de procesos, no se comparan. tolerancia_etapa:
+    etapa → tolerancia, para las etapas con más variación que el resto.
+    """
+    regresiones = []
+    for escenario, medido in resultados.items():
+        base_escenario = linea_base.get("escenarios", {}).get(escenario, {})
+        if (base_escenario.get("formato"), base_escenario.get("procesos", 1)) != \
+                (medido.get("formato"), medido.get("procesos", 1)):
+            continue
+        base = base_escenario.get("etapas", {})
+        for etapa, segundos in medido["etapas"].items():
+            if etapa not in base:
+                continue
+            tolerancia_aplicada = max(tolerancia, tolerancia_etapa.get(etapa, tolerancia))
+            if segundos > base[etapa] * (1 + tolerancia_aplicada) and segundos - base[etapa] > margen:
+                regresiones.append((escenario, etapa, base[etapa], segundos))
+    return regresiones
+
+def _imprimir(resultados, linea_base):
+    base = linea_base.get("escenarios", {})
+    print(f"{'escenario':<10} {'etapa':<19} {'filas':>10} {'segundos':>10} {'base':>10} {'cambio':>8}")
+    for escenario, medido in resultados.items():
+        for etapa, segundos in medido["etapas"].items():
+            anterior = base.get(escenario, {}).get("etapas", {}).get(etapa)
+            cambio = f"{(segundos / anterior - 1) * 100:+.0f}%" if anterior else ""
+            print(f"{escenario:<10} {etapa:<19} {medido['filas']:>10,} {segundos:>10.3f} "
+                  f"{anterior if anterior is not None else '':>10} {cambio:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide el rendimiento del cálculo por etapas.")
+    parser.add_argument("--escenarios", nargs="+", choices=list(ESCENARIOS), default=ESCENARIOS_POR_DEFECTO,
+                        help=f"por defecto {', '.join(ESCENARIOS_POR_DEFECTO)}; 1M solo a pedido")
+    parser.add_argument("--etapas", nargs="+", default=None,
+                        help=f"etapas a medir: {', '.join(ETAPAS)} o etapas del motor (por defecto todas)")
+    parser.add_argument("--formato", choices=["xlsx", "csv", "parquet"], default="xlsx")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--procesos", type=int, default=1, help="procesos del cálculo completo")
+    parser.add_argument("--linea-base", default=LINEA_BASE)
+    parser.add_argument("--guardar-linea-base", action="store_true",
+                        help="guarda los tiempos medidos como nueva línea base (por escenario)")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+    args = parser.parse_args()
+
+    linea_base = {}
+    if os.path.exists(args.linea_base):
+        with open(args.linea_base, encoding="utf-8") as archivo:
+            linea_base = json.load(archivo)
+
+    resultados = {}
+    for escenario in args.escenarios:
+        resultados[escenario] = medir_escenario(escenario, args.formato, args.repeticiones, args.etapas,
+                                                args.procesos)
+        resultados[escenario]["formato"] = args.formato
+        resultados[escenario]["procesos"] = args.procesos
+    _imprimir(resultados, linea_base)
+
+    if args.guardar_linea_base:
+        linea_base.setdefault("escenarios", {}).update(resultados)
+        linea_base["entorno"] = entorno()
+        with open(args.linea_base, "w", encoding="utf-8") as archivo:
+            json.dump(linea_base, archivo, indent=2, ensure_ascii=False)
+        print(f"Línea base guardada en {args.linea_base}")
+        return 0
+
+    regresiones = comparar_con_linea_base(resultados, linea_base, args.tolerancia)
+    for escenario, etapa, base, segundos in regresiones:
+        print(f"REGRESIÓN {escenario}/{etapa}: {segundos:.3f} s (base {base:.3f} s)")
+    return 1 if regresiones else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
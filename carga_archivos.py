@@ -0,0 +1,311 @@
+"""
+Lectura de los archivos de entrada (Excel, CSV o Parquet) sin dependencia de Streamlit.
+
+Todos los formatos producen el mismo esquema: FECHA como datetime64[us] y las
+columnas de hora del día como objetos time. Así el motor recibe los mismos
+tipos sin importar cómo se exportó el archivo. De cada archivo se leen solo
+las columnas que usa el cálculo (COLUMNAS_ARCHIVO), resueltas a partir de la
+fila de encabezados, con las cédulas y demás textos como str. Cada Excel
+leído se guarda una vez como Parquet en una caché direccionada por contenido,
+y volver a abrir el mismo archivo se lee en formato columnar:
+
+    from carga_archivos import leer_archivo
+    df_empleados = leer_archivo(contenido_en_bytes, "base_empleados.xlsx", "empleados")
+"""
+import csv
+import hashlib
+import importlib.util
+import os
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.cell import ERROR_CODES
+from pandas.io.parsers import TextParser
+
+from motor_calculo import a_time
+
+# Extensiones aceptadas por los cargadores de la app
+FORMATOS_ACEPTADOS = ["xlsx", "csv", "parquet"]
+
+# Caché de Excel convertidos a Parquet (configurable con la variable de entorno FERTRAC_CACHE_DIR)
+DIRECTORIO_CACHE = os.environ.get(
+    "FERTRAC_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache_parquet")
+)
+MAX_ARCHIVOS_CACHE = 64
+# Versión del esquema normalizado; cambiarla invalida los Parquet ya guardados
+VERSION_ESQUEMA = "2"
+
+# Motor de lectura de Excel: calamine (solo lectura, mucho más rápido; en
+# requirements.txt) o, si no está instalado, openpyxl con _leer_excel_columnas
+# (el motor "calamine" de read_excel existe desde pandas 2.2)
+_PANDAS_CON_CALAMINE = tuple(int(parte) for parte in pd.__version__.split(".")[:2]) >= (2, 2)
+MOTOR_EXCEL = "calamine" if _PANDAS_CON_CALAMINE and importlib.util.find_spec("python_calamine") else "openpyxl"
+
+# Columnas con tipo fijo (nombres ya en mayúsculas y sin espacios a los lados)
+COLUMNAS_FECHA = ("FECHA",)
+COLUMNAS_HORA = ("HRA INGRESO", "HORA SALIDA", "HORA ENTRADA")
+
+# Columnas que usa el cálculo de cada archivo: nombre normalizado → tipo al leer
+# (None = se infiere). Se listan todas las variantes de encabezado aceptadas;
+# el resto de columnas del archivo no se lee.
+TIPOS_ARCHIVO = ("input", "empleados", "porcentaje", "turnos")
+COLUMNAS_ARCHIVO = {
+    "input": {
+        "CÉDULA": str, "CEDULA": str,
+        "FECHA": None,
+        "TURNO": str,
+        "HRA INGRESO": None,
+        "HORA SALIDA": None,
+        "ACTIVIDAD DESARROLLADA": str,
+        "COMISIÓN O BONIFICACIÓN": None, "COMISION O BONIFICACION": None,
+        "OBSERVACIONES": str, "OBSERVACION": str,
+    },
+    "empleados": {
+        "CÉDULA": str, "CEDULA": str,
+        "NOMBRE": str,
+        "AREA": str,
+        "SALARIO BASICO": None,
+        "CARGO": str,
+    },
+    "porcentaje": {
+        "TIPO HORA EXTRA": str,
+        "FACTOR": None,
+    },
+    "turnos": {
+        "TURNO": str,
+        "HORA ENTRADA": None,
+        "HORA SALIDA": None,
+    },
+}
+
+class FormatoNoSoportado(ValueError):
+    """La extensión del archivo no es xlsx, csv ni parquet."""
+
+def formato_archivo(nombre):
+    """Formato según la extensión del nombre de archivo ("xlsx", "csv" o "parquet")."""
+    extension = os.path.splitext(nombre or "")[1].lower().lstrip(".")
+    if extension not in FORMATOS_ACEPTADOS:
+        raise FormatoNoSoportado(
+            f"Formato no soportado: '{extension or nombre}'. Usa {', '.join(FORMATOS_ACEPTADOS)}"
+        )
+    return extension
+
+# ============================================================================
+# ESQUEMA NORMALIZADO
+# ============================================================================
+def _horas_a_time(serie):
+    """Convierte el texto HH:MM o HH:MM:SS a time (una vez por valor distinto); el resto no cambia."""
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+    if not any(isinstance(valor, str) for valor in unicos):
+        return serie
+    convertidos = [a_time(valor) if isinstance(valor, str) else valor for valor in unicos]
+    convertidos = [valor if nuevo is None else nuevo for valor, nuevo in zip(unicos, convertidos)]
+    valores = pd.Series(convertidos + [None], dtype=object).to_numpy()[codigos]
+    return pd.Series(valores, index=serie.index, name=serie.name, dtype=object)
+
+def normalizar_tipos(df):
+    """
+    Lleva las columnas de fecha y de hora del día a un tipo único, venga el
+    archivo de Excel, CSV o Parquet. Fechas inválidas quedan como NaT y horas
+    que no se pueden interpretar se dejan tal cual (el motor las reporta).
+    """
+    nombres = df.columns.str.upper().str.strip()
+    for columna, nombre in zip(df.columns, nombres):
+        if nombre in COLUMNAS_FECHA and not pd.api.types.is_datetime64_any_dtype(df[columna]):
+            df[columna] = pd.to_datetime(df[columna], errors="coerce")
+        if nombre in COLUMNAS_FECHA:
+            df[columna] = df[columna].astype("datetime64[us]")
+        elif nombre in COLUMNAS_HORA:
+            df[columna] = _horas_a_time(df[columna].astype(object))
+    return df
+
+def _como_texto(serie):
+    """
+    Columna como texto, con los mismos valores que read_excel(dtype=str) da
+    para un Excel: números enteros sin ".0" (una columna numérica con celdas
+    vacías llega como float de Parquet, o como "10000000.0" en un CSV
+    exportado desde pandas) y las celdas vacías como NA.
+    """
+    texto = serie.astype(str).where(serie.notna())
+    if pd.api.types.is_float_dtype(serie):
+        enteros = serie.notna() & (serie % 1 == 0)
+        texto[enteros] = serie[enteros].astype(np.int64).astype(str)
+    else:
+        validos = texto.dropna()
+        if len(validos) and validos.str.fullmatch(r"-?\d+\.0+").all():
+            texto = texto.str.replace(r"\.0+$", "", regex=True)
+    return texto.where(texto != "")
+
+def aplicar_tipos(df, dtype):
+    """
+    Lleva a str las columnas de texto de `dtype` (el de seleccionar_columnas)
+    en un DataFrame leído de CSV o Parquet, para que tengan el mismo esquema
+    que el mismo archivo leído de Excel.
+    """
+    for columna, tipo in (dtype or {}).items():
+        if tipo is str and columna in df.columns:
+            df[columna] = _como_texto(df[columna])
+    return df
+
+# ============================================================================
+# SELECCIÓN DE COLUMNAS
+# ============================================================================
+def seleccionar_columnas(encabezados, tipo):
+    """
+    Resuelve, solo con la fila de encabezados, qué columnas del archivo `tipo`
+    se leen y con qué tipo. Retorna (usecols, dtype) con los nombres tal como
+    vienen en el archivo; con tipo=None se leen todas las columnas.
+    """
+    if tipo is None:
+        return None, None
+    columnas = COLUMNAS_ARCHIVO[tipo]
+    usecols, dtype = [], {}
+    for encabezado in encabezados:
+        nombre = str(encabezado).upper().strip()
+        if nombre in columnas:
+            usecols.append(encabezado)
+            if columnas[nombre] is not None:
+                dtype[encabezado] = columnas[nombre]
+    return usecols, dtype
+
+# ============================================================================
+# LECTURA DE EXCEL POR COLUMNAS
+# ============================================================================
+# pd.read_excel con openpyxl arma una lista con todas las celdas de la hoja y
+# solo después aplica usecols. Aquí las filas se recorren con la API pública
+# de solo lectura de openpyxl (iter_rows con values_only) y de cada fila se
+# guardan solo los valores de las columnas que se leen.
+def _valor_celda(valor):
+    """Mismo valor que pandas obtiene de una celda de openpyxl (vacía → "", error → NaN, enteros como int)."""
+    if valor is None:
+        return ""
+    if isinstance(valor, str):
+        return np.nan if valor in ERROR_CODES else valor
+    if isinstance(valor, float):
+        entero = int(valor)
+        return entero if entero == valor else valor
+    return valor
+
+def _leer_excel_columnas(contenido, tipo):
+    """
+    Primera hoja del libro con solo las columnas del archivo `tipo`. Las filas
+    se arman como lo hace pd.read_excel y el DataFrame sale del mismo TextParser,
+    así los tipos inferidos son los mismos que con read_excel(usecols=..., dtype=...).
+    """
+    libro = load_workbook(BytesIO(contenido), read_only=True, data_only=True, keep_links=False)
+    try:
+        hoja = libro.worksheets[0]
+        hoja.reset_dimensions()  # las dimensiones declaradas en el archivo pueden estar mal
+        filas = hoja.iter_rows(values_only=True)
+        encabezados = [_valor_celda(valor) for valor in next(filas, ())]
+        usecols, dtype = seleccionar_columnas(encabezados, tipo)
+        indices = [i for i, valor in enumerate(encabezados) if valor in usecols]
+        if not indices:
+            return pd.DataFrame()
+        datos, ultima_con_datos = [[encabezados[i] for i in indices]], 0
+        for fila in filas:
+            # Como en read_excel, las filas finales vacías en todas las columnas se descartan
+            if any(valor is not None and valor != "" for valor in fila):
+                ultima_con_datos = len(datos)
+            ancho = len(fila)
+            datos.append([_valor_celda(fila[i]) if i < ancho else "" for i in indices])
+    finally:
+        libro.close()
+
+    return TextParser(datos[:ultima_con_datos + 1], header=0, dtype=dtype, skip_blank_lines=False).read()
+
+# ============================================================================
+# LECTURA POR FORMATO
+# ============================================================================
+def _leer_excel(contenido, tipo):
+    """Primera hoja del libro, leyendo solo las columnas que usa el archivo `tipo`."""
+    if tipo is not None and MOTOR_EXCEL == "openpyxl":
+        return _leer_excel_columnas(contenido, tipo)
+    encabezados = pd.read_excel(BytesIO(contenido), nrows=0, engine=MOTOR_EXCEL).columns
+    usecols, dtype = seleccionar_columnas(encabezados, tipo)
+    if usecols == []:
+        return pd.DataFrame()
+    return pd.read_excel(BytesIO(contenido), usecols=usecols, dtype=dtype, engine=MOTOR_EXCEL)
+
+def _leer_csv(contenido, tipo):
+    """CSV con separador detectado (, ; tab |) y codificación UTF-8 o Latin-1."""
+    try:
+        texto = contenido.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        texto = contenido.decode("latin-1")
+    try:
+        separador = csv.Sniffer().sniff(texto[:65536], delimiters=",;\t|").delimiter
+    except csv.Error:
+        separador = ","
+    datos = texto.encode("utf-8")
+    encabezados = pd.read_csv(BytesIO(datos), sep=separador, encoding="utf-8", nrows=0).columns
+    usecols, dtype = seleccionar_columnas(encabezados, tipo)
+    df = pd.read_csv(BytesIO(datos), sep=separador, encoding="utf-8", usecols=usecols, dtype=dtype)
+    return aplicar_tipos(df, dtype)
+
+def _leer_parquet(contenido, tipo):
+    """Parquet leyendo solo las columnas que usa el archivo `tipo`, con los textos como str."""
+    import pyarrow.parquet as pq
+
+    encabezados = pq.read_schema(BytesIO(contenido)).names
+    usecols, dtype = seleccionar_columnas(encabezados, tipo)
+    return aplicar_tipos(pd.read_parquet(BytesIO(contenido), columns=usecols), dtype)
+
+def _podar_cache(directorio, max_archivos=MAX_ARCHIVOS_CACHE):
+    """Deja solo los max_archivos Parquet usados más recientemente."""
+    archivos = [os.path.join(directorio, nombre) for nombre in os.listdir(directorio) if nombre.endswith(".parquet")]
+    if len(archivos) <= max_archivos:
+        return
+    archivos.sort(key=os.path.getmtime, reverse=True)
+    for ruta in archivos[max_archivos:]:
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+
+def _leer_excel_con_cache(contenido, tipo, directorio_cache):
+    """
+    Lee un Excel desde su Parquet en caché (clave = hash del contenido y tipo
+    de archivo) o, si no existe, lo lee, normaliza los tipos y guarda el Parquet.
+    Si las columnas no se pueden guardar en Parquet (tipos mezclados), no se cachea.
+    """
+    clave = hashlib.blake2b(contenido, digest_size=16).hexdigest()
+    ruta = os.path.join(directorio_cache, f"{clave}_{tipo or 'todas'}_v{VERSION_ESQUEMA}.parquet")
+    if os.path.exists(ruta):
+        try:
+            df = pd.read_parquet(ruta)
+            os.utime(ruta)
+            return normalizar_tipos(df)
+        except Exception:
+            pass  # Parquet dañado o incompleto: se vuelve a leer el Excel
+
+    df = normalizar_tipos(_leer_excel(contenido, tipo))
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(directorio_cache, exist_ok=True)
+        df.to_parquet(temporal, index=False)
+        os.replace(temporal, ruta)
+        _podar_cache(directorio_cache)
+    except Exception:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    return df
+
+def leer_archivo(contenido, nombre, tipo=None, directorio_cache=DIRECTORIO_CACHE):
+    """
+    Lee un archivo de entrada (bytes) según la extensión de `nombre` y retorna
+    un DataFrame con el esquema normalizado. `tipo` ("input", "empleados",
+    "porcentaje" o "turnos") limita la lectura a las columnas que usa el
+    cálculo; con tipo=None se leen todas. Con directorio_cache=None los Excel
+    no se guardan como Parquet.
+    """
+    formato = formato_archivo(nombre)
+    if formato == "xlsx":
+        if directorio_cache is None:
+            return normalizar_tipos(_leer_excel(contenido, tipo))
+        return _leer_excel_con_cache(contenido, tipo, directorio_cache)
+    if formato == "csv":
+        return normalizar_tipos(_leer_csv(contenido, tipo))
+    return normalizar_tipos(_leer_parquet(contenido, tipo))
@@ -0,0 +1,265 @@
+"""
+Datos sintéticos de asistencia para pruebas de rendimiento, sin dependencia
+de Streamlit ni de archivos reales de nómina.
+
+Genera los cuatro archivos de entrada (input, empleados, porcentaje y turnos)
+para N empleados × M días consecutivos, con filas de todas las ramas de
+`calcular_horas_extras_y_recargo`: llegadas tempranas, salidas tardías,
+turno 00:00–00:00 (todo extra), franja de madrugada, domingos, festivos de
+`festivos_colombia` y turnos que no están en la configuración:
+
+    from datos_sinteticos import generar_datos, escribir_archivos
+    archivos = generar_datos(n_empleados=100, n_dias=30)        # {"input": df, ...}
+    rutas = escribir_archivos(archivos, "datos_prueba", "xlsx")  # {"input": ruta, ...}
+
+También se ejecuta como script:
+
+    python datos_sinteticos.py --empleados 100 --dias 30 --formato xlsx --salida datos_prueba
+"""
+import argparse
+import os
+from datetime import date
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from motor_calculo import festivos_colombia, parsear_hora_del_dia, segundos_a_time
+
+# ============================================================================
+# CONFIGURACIÓN DE LOS DATOS GENERADOS
+# ============================================================================
+# El rango por defecto empieza el 1 de enero: cualquier número de días incluye
+# festivos (Año Nuevo, Reyes Magos) y domingos.
+FECHA_INICIO = date(2025, 1, 1)
+
+# Turno → (entrada, salida) en segundos desde medianoche. Los nombres van en
+# distintas mayúsculas para ejercitar la normalización del motor.
+TURNOS = {
+    "TURNO 1": (8 * 3600, 18 * 3600),
+    "Turno 2": (6 * 3600, 14 * 3600),
+    "turno 3": (14 * 3600, 22 * 3600),
+    "TODO EXTRA": (0, 0),
+}
+TURNOS_DIURNOS = ["TURNO 1", "Turno 2", "turno 3"]
+# Turnos que aparecen en el archivo de datos pero no en la configuración
+TURNOS_DESCONOCIDOS = ["TURNO 9", "TURNNO 1"]
+
+FACTORES = {
+    "EXTRA DIURNA": 1.25,
+    "EXTRA NOCTURNA": 1.75,
+    "RECARGO NOCTURNO": 1.35,
+    "EXTRA DOMINICAL DIURNO": 2.00,
+    "EXTRA DOMINICAL NOCTURNO": 2.50,
+    "RECARGO DOMINICAL NOCTURNO": 1.75,
+}
+
+AREAS = ["Bodega", "Ventas", "Producción", "Logística", "Administración"]
+CARGOS = ["AUXILIAR DE BODEGA", "ASISTENTE DE BODEGA", "ASESOR COMERCIAL", "OPERARIO", "CONDUCTOR"]
+ACTIVIDADES = ["Alistamiento y cargue", "Apoyo en bodega", "Inventario", "Despacho", "Atención a clientes"]
+
+# Caso de cada fila → proporción de filas
+PROPORCION_CASOS = {
+    "normal": 0.55,
+    "llegada_temprana": 0.12,
+    "salida_tardia": 0.15,
+    "llegada_y_salida": 0.03,
+    "todo_extra": 0.06,
+    "madrugada": 0.06,
+    "turno_desconocido": 0.03,
+}
+
+# Nombre de archivo (sin extensión) de cada tipo, como en el README
+NOMBRES_ARCHIVO = {
+    "input": "input_datos",
+    "empleados": "base_empleados",
+    "porcentaje": "factores_horas_extras",
+    "turnos": "configuracion_turnos",
+}
+
+ULTIMO_MINUTO_DEL_DIA = 23 * 3600 + 59 * 60
+
+# ============================================================================
+# GENERACIÓN
+# ============================================================================
+def _minutos(rng, minimo, maximo, n):
+    """n desplazamientos aleatorios en segundos, en minutos enteros entre minimo y maximo."""
+    return rng.integers(minimo, maximo + 1, n) * 60
+
+def _horas_reales(rng, casos, entrada_turno, salida_turno):
+    """Ingreso y salida reales (segundos desde medianoche) de cada fila según su caso."""
+    n = len(casos)
+    ingreso = entrada_turno + _minutos(rng, -10, 10, n)
+    salida = salida_turno + _minutos(rng, -5, 15, n)
+
+    temprana = np.isin(casos, ["llegada_temprana", "llegada_y_salida"])
+    ingreso = np.where(temprana, entrada_turno - _minutos(rng, 30, 150, n), ingreso)
+    tardia = np.isin(casos, ["salida_tardia", "llegada_y_salida"])
+    salida = np.where(tardia, salida_turno + _minutos(rng, 30, 240, n), salida)
+
+    # Todo extra: cualquier jornada entre las 05:00 y la noche
+    todo_extra = casos == "todo_extra"
+    inicio_libre = _minutos(rng, 5 * 60, 16 * 60, n)
+    ingreso = np.where(todo_extra, inicio_libre, ingreso)
+    salida = np.where(todo_extra, inicio_libre + _minutos(rng, 2 * 60, 10 * 60, n), salida)
+
+    # Madrugada: entrada y salida antes de las 06:00 y antes del turno
+    madrugada = casos == "madrugada"
+    ingreso = np.where(madrugada, _minutos(rng, 60, 180, n), ingreso)
+    salida = np.where(madrugada, _minutos(rng, 210, 345, n), salida)
+
+    ingreso = np.clip(ingreso, 0, ULTIMO_MINUTO_DEL_DIA - 60)
+    salida = np.clip(salida, ingreso + 60, ULTIMO_MINUTO_DEL_DIA)
+    return ingreso, salida
+
+def generar_datos(n_empleados, n_dias, fecha_inicio=FECHA_INICIO, semilla=0):
+    """
+    Genera los cuatro archivos de entrada como DataFrames (una fila de
+    asistencia por empleado y día: n_empleados × n_dias filas). Las horas van
+    como objetos time y las fechas como datetime, igual que al leer un Excel.
+    El resultado solo depende de los argumentos (misma semilla, mismos datos).
+    """
+    rng = np.random.default_rng(semilla)
+
+    cedulas = np.arange(10_000_000, 10_000_000 + n_empleados)
+    df_empleados = pd.DataFrame({
+        "CEDULA": cedulas,
+        "NOMBRE": [f"EMPLEADO {i:06d}" for i in range(1, n_empleados + 1)],
+        "AREA": rng.choice(AREAS, n_empleados),
+        "CARGO": rng.choice(CARGOS, n_empleados),
+        "SALARIO BASICO": rng.integers(1_424, 6_000, n_empleados) * 1000,
+    })
+
+    nombres_turno = list(TURNOS)
+    df_turnos = pd.DataFrame({
+        "TURNO": nombres_turno,
+        "HORA ENTRADA": segundos_a_time(np.array([TURNOS[t][0] for t in nombres_turno])),
+        "HORA SALIDA": segundos_a_time(np.array([TURNOS[t][1] for t in nombres_turno])),
+    })
+
+    df_porcentaje = pd.DataFrame({"TIPO HORA EXTRA": list(FACTORES), "FACTOR": list(FACTORES.values())})
+
+    # Asistencia: empleado × día, con un caso por fila
+    fechas = pd.date_range(fecha_inicio, periods=n_dias, freq="D")
+    n = n_empleados * n_dias
+    casos = rng.choice(list(PROPORCION_CASOS), n, p=list(PROPORCION_CASOS.values()))
+
+    turno = rng.choice(TURNOS_DIURNOS, n).astype(object)
+    turno[casos == "todo_extra"] = "TODO EXTRA"
+    desconocido = casos == "turno_desconocido"
+    turno[desconocido] = rng.choice(TURNOS_DESCONOCIDOS, int(desconocido.sum()))
+    # La madrugada necesita un turno que empiece después de la salida (08:00)
+    turno[casos == "madrugada"] = "TURNO 1"
+
+    # Un turno desconocido se calcula con el horario por defecto (08:00–18:00)
+    horario = {nombre: TURNOS.get(nombre, TURNOS["TURNO 1"]) for nombre in set(turno)}
+    entrada_turno = np.array([horario[t][0] for t in turno])
+    salida_turno = np.array([horario[t][1] for t in turno])
+    ingreso, salida = _horas_reales(rng, casos, entrada_turno, salida_turno)
+
+    comision = np.where(rng.random(n) < 0.1, rng.integers(1, 21, n) * 10_000, 0)
+    df_input = pd.DataFrame({
+        "CÉDULA": np.repeat(cedulas, n_dias),
+        "FECHA": np.tile(fechas.to_numpy(), n_empleados),
+        "HRA INGRESO": segundos_a_time(ingreso),
+        "HORA SALIDA": segundos_a_time(salida),
+        "TURNO": turno,
+        "ACTIVIDAD DESARROLLADA": rng.choice(ACTIVIDADES, n),
+        "COMISIÓN O BONIFICACIÓN": comision,
+        "OBSERVACIONES": np.where(casos == "normal", "", "Sintético: " + casos.astype(object)),
+    })
+
+    return {"input": df_input, "empleados": df_empleados, "porcentaje": df_porcentaje, "turnos": df_turnos}
+
+def resumen_casos(archivos):
+    """
+    Cuenta las filas generadas de cada caso que distingue el motor, a partir
+    de los datos (no de la semilla): sirve para confirmar que un conjunto
+    cubre todas las ramas.
+    """
+    df_input = archivos["input"]
+    df_turnos = archivos["turnos"]
+    nombres = df_turnos["TURNO"].astype(str).str.upper().str.strip()
+    turno_fila = df_input["TURNO"].astype(str).str.upper().str.strip()
+    conocido = turno_fila.isin(nombres).to_numpy()
+    entrada = turno_fila.map(dict(zip(nombres, parsear_hora_del_dia(df_turnos["HORA ENTRADA"])[0]))).to_numpy()
+    salida = turno_fila.map(dict(zip(nombres, parsear_hora_del_dia(df_turnos["HORA SALIDA"])[0]))).to_numpy()
+    ingreso_real = parsear_hora_del_dia(df_input["HRA INGRESO"])[0]
+    salida_real = parsear_hora_del_dia(df_input["HORA SALIDA"])[0]
+
+    todo_extra = conocido & (entrada == 0) & (salida == 0)
+    madrugada = conocido & ~todo_extra & (salida_real <= entrada) & (salida_real < 6 * 3600)
+    en_turno = conocido & ~todo_extra & ~madrugada
+
+    fechas = df_input["FECHA"]
+    festivos = set()
+    for anio in range(fechas.min().year, fechas.max().year + 1):
+        festivos |= festivos_colombia(anio)
+
+    return {
+        "filas": len(df_input),
+        "empleados": len(archivos["empleados"]),
+        "domingos": int((fechas.dt.weekday == 6).sum()),
+        "festivos": int(fechas.dt.date.isin(festivos).sum()),
+        "llegadas_tempranas": int((en_turno & (ingreso_real < entrada)).sum()),
+        "salidas_tardias": int((en_turno & (salida_real > salida)).sum()),
+        "todo_extra": int(todo_extra.sum()),
+        "madrugada": int(madrugada.sum()),
+        "turnos_desconocidos": int((~conocido).sum()),
+    }
+
+# ============================================================================
+# ESCRITURA DE ARCHIVOS
+# ============================================================================
+def _valores_excel(serie):
+    """Columna como lista de valores que openpyxl escribe como celda nativa (fecha, hora o número)."""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return list(serie.dt.to_pydatetime())
+    return serie.astype(object).tolist()
+
+def archivo_bytes(df, formato):
+    """Contenido de un archivo de entrada en el formato dado ("xlsx", "csv" o "parquet")."""
+    buffer = BytesIO()
+    if formato == "xlsx":
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Hoja1")
+        ws.append(list(df.columns))
+        for fila in zip(*(_valores_excel(df[columna]) for columna in df.columns)):
+            ws.append(fila)
+        wb.save(buffer)
+    elif formato == "csv":
+        df.to_csv(buffer, index=False)
+    elif formato == "parquet":
+        df.to_parquet(buffer, index=False)
+    else:
+        raise ValueError(f"Formato no soportado: '{formato}'")
+    return buffer.getvalue()
+
+def escribir_archivos(archivos, directorio, formato="xlsx"):
+    """Escribe los cuatro archivos en `directorio` y retorna {tipo: ruta}."""
+    os.makedirs(directorio, exist_ok=True)
+    rutas = {}
+    for tipo, df in archivos.items():
+        rutas[tipo] = os.path.join(directorio, f"{NOMBRES_ARCHIVO[tipo]}.{formato}")
+        with open(rutas[tipo], "wb") as archivo:
+            archivo.write(archivo_bytes(df, formato))
+    return rutas
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera archivos de entrada sintéticos para la calculadora.")
+    parser.add_argument("--empleados", type=int, default=100)
+    parser.add_argument("--dias", type=int, default=30)
+    parser.add_argument("--formato", choices=["xlsx", "csv", "parquet"], default="xlsx")
+    parser.add_argument("--salida", default="datos_prueba")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    archivos = generar_datos(args.empleados, args.dias, semilla=args.semilla)
+    for tipo, ruta in escribir_archivos(archivos, args.salida, args.formato).items():
+        print(f"{tipo:<11} {ruta}")
+    for caso, filas in resumen_casos(archivos).items():
+        print(f"{caso:<20} {filas:>10,}")
+
+if __name__ == "__main__":
+    main()
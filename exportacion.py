@@ -0,0 +1,264 @@
+"""
+Exportación de resultados a Excel (.xlsx) sin dependencia de Streamlit.
+
+El libro se escribe en modo streaming (write-only de openpyxl) por bloques de
+FILAS_POR_BLOQUE filas: en cada bloque las columnas se convierten en bloque a
+valores de Excel y el formato de cada columna se declara una vez, por lo que
+la memoria de la conversión no crece con el número de filas.
+
+    from exportacion import generar_excel_resultados
+    contenido = generar_excel_resultados(resultado.df)   # bytes del .xlsx
+    contenido = generar_excel_resultados(resultado.df, resultado.topes.incumplimientos)   # + "Topes legales"
+"""
+from copy import copy
+from datetime import datetime, time
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, Border, Side, NamedStyle
+from openpyxl.styles.fonts import DEFAULT_FONT
+
+from motor_calculo import COLUMNAS_INCUMPLIMIENTOS, tipos_presentacion
+
+# ============================================================================
+# ESTRUCTURA DE LA HOJA "Resultados"
+# ============================================================================
+# Encabezado del Excel → columna del DataFrame calculado
+MAPEO_COLUMNAS_EXCEL = {
+    "CÉDULA": "CÉDULA",
+    "NOMBRE": "NOMBRE",
+    "CARGO": "CARGO",
+    "AREA": "AREA",
+    "SALARIO BASICO": "SALARIO BASICO",
+    "COMISIÓN O BONIFICACIÓN": "COMISIÓN O BONIFICACIÓN",
+    "TOTAL BASE LIQUIDACION": "TOTAL BASE LIQUIDACION",
+    "Valor Ordinario Hora": "IMPORTE HORA",
+    "FECHA": "FECHA",
+    "DÍA": "DÍA",
+    "TIPO TARIFA": "TIPO TARIFA",
+    "TURNO": "TURNO",
+    "TURNO ENTRADA": "TURNO ENTRADA",
+    "TURNO SALIDA": "TURNO SALIDA",
+    "HORA REAL INGRESO": "HRA INGRESO",
+    "HORA REAL SALIDA": "HORA SALIDA",
+    "ACTIVIDAD DESARROLLADA": "ACTIVIDAD DESARROLLADA",
+    "HORAS TRABAJADAS": "HORAS TRABAJADAS",
+    "Cant. HORAS EXTRA DIURNA":           "HORAS EXTRA DIURNA NORMAL",
+    "VALOR EXTRA DIURNA":                 "VALOR EXTRA DIURNA NORMAL",
+    "Cant. HORAS EXTRA DIURNA DOM/FEST":  "HORAS EXTRA DIURNA DOM/FEST",
+    "VALOR EXTRA DIURNA DOM/FEST":        "VALOR EXTRA DIURNA DOM/FEST",
+    "Cant. HORAS EXTRA NOCTURNA":         "HORAS EXTRA NOCTURNA NORMAL",
+    "VALOR EXTRA NOCTURNA":               "VALOR EXTRA NOCTURNA NORMAL",
+    "Cant. HORAS EXTRA NOCTURNA DOM/FEST":"HORAS EXTRA NOCTURNA DOM/FEST",
+    "VALOR EXTRA NOCTURNA DOM/FEST":      "VALOR EXTRA NOCTURNA DOM/FEST",
+    "Cant. RECARGO NOCTURNO":             "RECARGO NOCTURNO NORMAL",
+    "VALOR RECARGO NOCTURNO":             "VALOR RECARGO NOCTURNO NORMAL",
+    "Cant. RECARGO NOCTURNO DOM/FEST":    "RECARGO NOCTURNO DOM/FEST",
+    "VALOR RECARGO NOCTURNO DOM/FEST":    "VALOR RECARGO NOCTURNO DOM/FEST",
+    "TOTAL HORAS EXTRA": "TOTAL HORAS EXTRA",
+    "VALOR TOTAL EXTRAS": "VALOR TOTAL EXTRAS",
+    "MES": "MES",
+    "MES_NOMBRE": "MES_NOMBRE",
+    "Observacion": "OBSERVACIONES"
+}
+
+ENCABEZADOS_EXCEL = list(MAPEO_COLUMNAS_EXCEL)
+
+ANCHOS_COLUMNAS_EXCEL = {
+    'A': 12,  # CÉDULA
+    'B': 25,  # NOMBRE
+    'C': 20,  # CARGO
+    'D': 15,  # AREA
+    'E': 15,  # SALARIO BASICO
+    'F': 18,  # COMISIÓN
+    'G': 18,  # TOTAL BASE
+    'H': 15,  # Valor Hora
+    'I': 12,  # FECHA
+    'J': 12,  # DÍA
+    'K': 16,  # TIPO TARIFA
+    'L': 22,  # TURNO
+    'M': 12,  # TURNO ENTRADA
+    'N': 12,  # TURNO SALIDA
+    'O': 14,  # HORA REAL INGRESO
+    'P': 14,  # HORA REAL SALIDA
+    'Q': 30,  # ACTIVIDAD
+    'R': 12,  # HORAS TRABAJADAS
+    'S': 12,  # Cant Extra Diurna
+    'T': 15,  # Valor Extra Diurna
+    'U': 18,  # Cant Extra Diurna Dom/Fest
+    'V': 20,  # Valor Extra Diurna Dom/Fest
+    'W': 12,  # Cant Extra Nocturna
+    'X': 15,  # Valor Extra Nocturna
+    'Y': 18,  # Cant Extra Nocturna Dom/Fest
+    'Z': 20,  # Valor Extra Nocturna Dom/Fest
+    'AA': 12, # Cant Recargo Nocturno
+    'AB': 15, # Valor Recargo Nocturno
+    'AC': 18, # Cant Recargo Nocturno Dom/Fest
+    'AD': 20, # Valor Recargo Nocturno Dom/Fest
+    'AE': 12, # Total Horas Extra
+    'AF': 18, # Valor Total Extras
+    'AG': 10, # MES
+    'AH': 15, # MES_NOMBRE
+    'AI': 30, # Observacion
+}
+
+FORMATO_DINERO = '#,##0.00'
+FORMATO_HORAS = '0.00'
+
+def formato_columna(encabezado):
+    """Formato numérico de Excel para una columna según su encabezado (None = sin formato)."""
+    if ("VALOR" in encabezado or "SALARIO" in encabezado or "TOTAL BASE" in encabezado
+            or "Valor Ordinario" in encabezado):
+        return FORMATO_DINERO
+    if "Cant." in encabezado or "HORAS" in encabezado:
+        return FORMATO_HORAS
+    return None
+
+# Filas que se convierten a valores de Excel a la vez (acota la memoria de la exportación)
+FILAS_POR_BLOQUE = 10_000
+
+# Hoja "Topes legales": incumplimientos de los topes de horas extra (analizar_topes)
+FORMATOS_TOPES = {"HORAS EXTRA": FORMATO_HORAS, "LÍMITE": FORMATO_HORAS, "EXCESO": FORMATO_HORAS}
+ANCHOS_TOPES = {'A': 12, 'B': 25, 'C': 15, 'D': 16, 'E': 24, 'F': 12, 'G': 12, 'H': 12, 'I': 10, 'J': 10}
+
+# ============================================================================
+# CONVERSIÓN DE COLUMNAS A VALORES DE EXCEL
+# ============================================================================
+def _valor_para_excel(valor):
+    """Convierte un valor suelto (time, datetime, Period, numpy...) a un tipo que openpyxl escribe."""
+    if pd.isna(valor):
+        return ""
+    if isinstance(valor, datetime):
+        return valor.strftime('%Y-%m-%d %H:%M')
+    if isinstance(valor, time):
+        return valor.strftime('%H:%M')
+    if isinstance(valor, pd.Period):
+        return str(valor)
+    if hasattr(valor, 'item'):
+        return valor.item()
+    if isinstance(valor, (int, float, str, bool)):
+        return valor
+    return str(valor)
+
+def columna_para_excel(serie):
+    """
+    Convierte una columna (o un bloque de filas de ella) a una lista de valores de Excel.
+    Fechas, periodos y números se convierten en bloque; las columnas de
+    objetos se convierten una vez por valor distinto.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.dt.strftime('%Y-%m-%d %H:%M').fillna("").tolist()
+    if isinstance(serie.dtype, pd.PeriodDtype):
+        return serie.astype(str).where(serie.notna(), "").tolist()
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype(object).where(serie.notna(), "").tolist()
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+    convertidos = np.array([_valor_para_excel(v) for v in unicos] + [""], dtype=object)
+    return convertidos[codigos].tolist()
+
+# ============================================================================
+# GENERACIÓN DEL LIBRO
+# ============================================================================
+def _estilos_resultados():
+    """Estilos con nombre de la hoja: encabezado y celdas de datos por formato."""
+    borde = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    centrado = Alignment(horizontal="center", vertical="center")
+    return {
+        "encabezado": NamedStyle(name="fertrac_encabezado", font=Font(bold=True, size=11), border=borde,
+                                 alignment=Alignment(horizontal="center", vertical="center", wrap_text=True)),
+        None: NamedStyle(name="fertrac_texto", font=copy(DEFAULT_FONT), border=borde, alignment=centrado),
+        FORMATO_DINERO: NamedStyle(name="fertrac_dinero", font=copy(DEFAULT_FONT), border=borde,
+                                   alignment=centrado, number_format=FORMATO_DINERO),
+        FORMATO_HORAS: NamedStyle(name="fertrac_horas", font=copy(DEFAULT_FONT), border=borde,
+                                  alignment=centrado, number_format=FORMATO_HORAS),
+    }
+
+def escribir_hoja(wb, titulo, df, encabezados, mapeo_columnas=None, formatos=None, anchos=None,
+                  filas_por_bloque=FILAS_POR_BLOQUE):
+    """
+    Agrega a un libro write-only una hoja con encabezado y filas del DataFrame.
+    mapeo_columnas: encabezado → columna del DataFrame (columnas ausentes quedan vacías).
+    formatos: encabezado → formato numérico; anchos: letra de columna → ancho.
+    Las filas se convierten y escriben de a filas_por_bloque.
+    """
+    mapeo_columnas = mapeo_columnas or {}
+    formatos = formatos or {}
+    estilos = {}
+    for nombre, estilo in _estilos_resultados().items():
+        if estilo.name not in wb.named_styles:
+            wb.add_named_style(estilo)
+        estilos[nombre] = estilo.name
+
+    ws = wb.create_sheet(titulo)
+    for letra, ancho in (anchos or {}).items():
+        ws.column_dimensions[letra].width = ancho
+
+    fila_encabezado = []
+    for encabezado in encabezados:
+        celda = WriteOnlyCell(ws, value=encabezado)
+        celda.style = estilos["encabezado"]
+        fila_encabezado.append(celda)
+    ws.append(fila_encabezado)
+
+    series = []
+    for encabezado in encabezados:
+        columna_df = mapeo_columnas.get(encabezado, encabezado)
+        series.append(df[columna_df] if columna_df in df.columns else None)
+    # Una celda con estilo por columna (numérica y de texto) que se reutiliza en
+    # cada fila: en modo write-only la fila se serializa al hacer append, así
+    # que solo cambia el valor. El formato numérico solo aplica a celdas
+    # numéricas, igual que en la hoja original.
+    celdas_numero = []
+    celdas_texto = []
+    for encabezado in encabezados:
+        celda_numero = WriteOnlyCell(ws)
+        celda_numero.style = estilos[formatos.get(encabezado)]
+        celdas_numero.append(celda_numero)
+        celda_texto = WriteOnlyCell(ws)
+        celda_texto.style = estilos[None]
+        celdas_texto.append(celda_texto)
+    celdas_columna = list(zip(celdas_numero, celdas_texto))
+
+    for inicio in range(0, len(df), filas_por_bloque):
+        fin = min(inicio + filas_por_bloque, len(df))
+        columnas = [
+            columna_para_excel(serie.iloc[inicio:fin]) if serie is not None else [""] * (fin - inicio)
+            for serie in series
+        ]
+        for valores in zip(*columnas):
+            fila = []
+            for valor, (celda_numero, celda_texto) in zip(valores, celdas_columna):
+                celda = celda_numero if isinstance(valor, (int, float)) else celda_texto
+                celda.value = valor
+                fila.append(celda)
+            ws.append(fila)
+    return ws
+
+def generar_excel_resultados(df, incumplimientos=None):
+    """
+    Genera el .xlsx de resultados (hoja "Resultados") y retorna su contenido en
+    bytes. Con `incumplimientos` (AnalisisTopes.incumplimientos) agrega la hoja
+    "Topes legales".
+    """
+    wb = Workbook(write_only=True)
+    escribir_hoja(
+        wb, "Resultados", tipos_presentacion(df, list(MAPEO_COLUMNAS_EXCEL.values())), ENCABEZADOS_EXCEL,
+        mapeo_columnas=MAPEO_COLUMNAS_EXCEL,
+        formatos={encabezado: formato_columna(encabezado) for encabezado in ENCABEZADOS_EXCEL},
+        anchos=ANCHOS_COLUMNAS_EXCEL,
+    )
+    if incumplimientos is not None:
+        fechas = {col: incumplimientos[col].dt.strftime('%Y-%m-%d') for col in ("DESDE", "HASTA")}
+        escribir_hoja(wb, "Topes legales", incumplimientos.assign(**fechas), COLUMNAS_INCUMPLIMIENTOS,
+                      formatos=FORMATOS_TOPES, anchos=ANCHOS_TOPES)
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
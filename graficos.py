@@ -0,0 +1,121 @@
+"""
+Gráficos de resultados (horas extra por empleado, por área y comparativo
+mensual) sin dependencia de Streamlit.
+
+Las figuras se crean con `matplotlib.figure.Figure` (sin pasar por el estado
+global de pyplot) y se liberan apenas se codifican a PNG, así la memoria del
+proceso no crece con cada interacción:
+
+    from graficos import grafico_png
+    png = grafico_png("empleados", cubo_filtrado, dpi=300)   # bytes o None si no hay datos
+
+Los gráficos agrupan por NOMBRE, AREA y MES_CLAVE/MES_NOMBRE, así que aceptan
+tanto el detalle calculado como el cubo de agregados (`resultado.cubo`).
+"""
+from io import BytesIO
+
+from matplotlib.figure import Figure
+
+COLUMNAS_HORAS = ["HORAS EXTRA DIURNA_DISPLAY", "HORAS EXTRA NOCTURNA_DISPLAY", "RECARGO NOCTURNO_DISPLAY"]
+ETIQUETAS_HORAS = ["Extra Diurna", "Extra Nocturna", "Recargo Nocturno"]
+COLORES_HORAS = ['#f37021', '#ff6600', '#ff9966']
+
+# Resolución de las imágenes: en pantalla (la misma que usa st.pyplot) y en descarga
+DPI_PANTALLA = 200
+DPI_DESCARGA = 300
+
+def comparativo_mensual(df):
+    """Horas y valor de extras por mes; MES_CLAVE (AAAAMM) ordena los meses cronológicamente."""
+    return df.groupby(["MES_CLAVE", "MES_NOMBRE"], observed=True).agg({
+        "HORAS EXTRA DIURNA_DISPLAY": "sum",
+        "HORAS EXTRA NOCTURNA_DISPLAY": "sum",
+        "RECARGO NOCTURNO_DISPLAY": "sum",
+        "VALOR TOTAL EXTRAS": "sum"
+    }).reset_index()
+
+# ============================================================================
+# CONSTRUCCIÓN DE FIGURAS
+# ============================================================================
+def _figura_empleados(df):
+    empleado_stats = df.groupby("NOMBRE", observed=True)[COLUMNAS_HORAS].sum()
+    if empleado_stats.empty:
+        return None
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    empleado_stats.plot(kind='bar', ax=ax, color=COLORES_HORAS, stacked=True)
+    ax.set_ylabel("Horas")
+    ax.set_xlabel("Empleado")
+    ax.legend(ETIQUETAS_HORAS)
+    for etiqueta in ax.get_xticklabels():
+        etiqueta.set(rotation=45, ha='right')
+    fig.tight_layout()
+    return fig
+
+def _figura_areas(df):
+    area_stats = df.groupby("AREA", observed=True)[COLUMNAS_HORAS].sum()
+    if area_stats.empty:
+        return None
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    area_stats.plot(kind='barh', ax=ax, color=COLORES_HORAS, stacked=True)
+    ax.set_xlabel("Horas")
+    ax.set_ylabel("Área")
+    ax.legend(ETIQUETAS_HORAS)
+    fig.tight_layout()
+    return fig
+
+def _figura_horas_mensual(df):
+    comparativo = comparativo_mensual(df)
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    x = range(len(comparativo))
+    width = 0.25
+
+    for desplazamiento, columna, etiqueta, color in zip((-width, 0, width), COLUMNAS_HORAS,
+                                                         ETIQUETAS_HORAS, COLORES_HORAS):
+        ax.bar([i + desplazamiento for i in x], comparativo[columna], width, label=etiqueta, color=color)
+
+    ax.set_xlabel('Mes')
+    ax.set_ylabel('Horas')
+    ax.set_xticks(list(x))
+    ax.set_xticklabels(comparativo["MES_NOMBRE"].tolist(), rotation=45, ha='right')
+    ax.legend()
+    fig.tight_layout()
+    return fig
+
+def _figura_costos_mensual(df):
+    comparativo = comparativo_mensual(df)
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    x = range(len(comparativo))
+
+    ax.bar(x, comparativo["VALOR TOTAL EXTRAS"], color='#f37021', label='Valor Total Extras')
+
+    ax.set_xlabel('Mes')
+    ax.set_ylabel('Valor ($)')
+    ax.set_xticks(list(x))
+    ax.set_xticklabels(comparativo["MES_NOMBRE"].tolist(), rotation=45, ha='right')
+    ax.legend()
+    ax.grid(True, alpha=0.3, axis='y')
+    fig.tight_layout()
+    return fig
+
+# Tipo de gráfico → función que construye la figura (None si no hay datos)
+GRAFICOS = {
+    "empleados": _figura_empleados,
+    "areas": _figura_areas,
+    "horas_mensual": _figura_horas_mensual,
+    "costos_mensual": _figura_costos_mensual,
+}
+
+def grafico_png(tipo, df, dpi=DPI_PANTALLA):
+    """Construye el gráfico `tipo` a partir de df y lo retorna como PNG (bytes); None si no hay datos."""
+    fig = GRAFICOS[tipo](df)
+    if fig is None:
+        return None
+    buffer = BytesIO()
+    try:
+        fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+    finally:
+        fig.clear()
+    return buffer.getvalue()
@@ -0,0 +1,1451 @@
+"""
+Motor de cálculo de horas extras Fertrac.
+
+Contiene todo el procesamiento (merge con empleados, fechas y horas, turnos,
+horas extra, recargo nocturno y valoración) sin depender de Streamlit, para
+poder usarlo desde la app, trabajos por lotes o pruebas de rendimiento:
+
+    from motor_calculo import calcular_horas_extras
+    resultado = calcular_horas_extras(df_input, df_empleados, df_porcentaje, df_turnos)
+    resultado.df       # DataFrame calculado
+    resultado.avisos   # lista de Aviso
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, date, time, timedelta
+from functools import lru_cache
+import hashlib
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+
+from perfilador import Perfilador
+
+# Versión de las reglas de cálculo. Se incluye en las claves de caché de los
+# resultados: cambiarla al modificar el motor invalida lo calculado antes.
+VERSION_MOTOR = "1.0"
+
+# ============================================================================
+# FESTIVOS COLOMBIANOS — cálculo automático por año (sin librerías externas)
+# ============================================================================
+def _pascua(anio):
+    """Algoritmo de Butcher para calcular el Domingo de Pascua."""
+    a = anio % 19
+    b = anio // 100
+    c = anio % 100
+    d = b // 4
+    e = b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19*a + b - d - g + 15) % 30
+    i = c // 4
+    k = c % 4
+    l = (32 + 2*e + 2*i - h - k) % 7
+    m = (a + 11*h + 22*l) // 451
+    mes = (h + l - 7*m + 114) // 31
+    dia = ((h + l - 7*m + 114) % 31) + 1
+    return date(anio, mes, dia)
+
+def _siguiente_lunes(d):
+    """Traslada una fecha al siguiente lunes (Ley Emiliani). Si ya es lunes, no cambia."""
+    dias = (7 - d.weekday()) % 7
+    return d if dias == 0 else d + timedelta(days=dias)
+
+def festivos_colombia_con_nombre(anio):
+    """
+    Retorna un dict {fecha: nombre} con los festivos colombianos del año dado.
+    18 festivos legales: 6 fijos + 7 Ley Emiliani + 5 religiosos móviles.
+    """
+    p = _pascua(anio)
+    f = {}
+
+    # Fijos (no se trasladan)
+    f[date(anio, 1,  1)] = "Año Nuevo"
+    f[date(anio, 5,  1)] = "Día del Trabajo"
+    f[date(anio, 7, 20)] = "Independencia de Colombia"
+    f[date(anio, 8,  7)] = "Batalla de Boyacá"
+    f[date(anio, 12, 8)] = "Inmaculada Concepción"
+    f[date(anio, 12, 25)] = "Navidad"
+
+    # Ley Emiliani (se trasladan al siguiente lunes)
+    f[_siguiente_lunes(date(anio, 1,  6))] = "Reyes Magos"
+    f[_siguiente_lunes(date(anio, 3, 19))] = "San José"
+    f[_siguiente_lunes(date(anio, 6, 29))] = "San Pedro y San Pablo"
+    f[_siguiente_lunes(date(anio, 8, 15))] = "Asunción de la Virgen"
+    f[_siguiente_lunes(date(anio, 10, 12))] = "Día de la Raza"
+    f[_siguiente_lunes(date(anio, 11,  1))] = "Todos los Santos"
+    f[_siguiente_lunes(date(anio, 11, 11))] = "Independencia de Cartagena"
+
+    # Religiosos móviles (calculados desde Pascua)
+    f[p - timedelta(days=3)] = "Jueves Santo"
+    f[p - timedelta(days=2)] = "Viernes Santo"
+    f[_siguiente_lunes(p + timedelta(days=39))] = "Ascensión del Señor"
+    f[_siguiente_lunes(p + timedelta(days=60))] = "Corpus Christi"
+    f[_siguiente_lunes(p + timedelta(days=68))] = "Sagrado Corazón de Jesús"
+
+    return f
+
+def festivos_colombia(anio):
+    """Retorna un set con todas las fechas festivas colombianas para el año dado."""
+    return set(festivos_colombia_con_nombre(anio))
+
+# ============================================================================
+# CALENDARIO — dimensión de fechas precalculada por rango de años
+# ============================================================================
+DIAS_ESPANOL = {
+    0: 'Lunes', 1: 'Martes', 2: 'Miércoles', 3: 'Jueves',
+    4: 'Viernes', 5: 'Sábado', 6: 'Domingo'
+}
+
+MESES_ESPANOL = [
+    'Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio', 'Julio',
+    'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre'
+]
+
+@lru_cache(maxsize=8)
+def construir_calendario(anio_inicio, anio_fin):
+    """
+    Retorna un DataFrame con un registro por día entre el 1 de enero de
+    anio_inicio y el 31 de diciembre de anio_fin, indexado por fecha, con:
+    DIA_NUM (0=Lun, 6=Dom), DÍA, FESTIVO (nombre o ""), ES_FESTIVO, ES_DOM_FEST,
+    SEMANA_ISO, MES (periodo), MES_CLAVE (AAAAMM, ordenable) y MES_NOMBRE.
+    Se cachea por rango de años; no debe modificarse.
+    """
+    dias = pd.date_range(date(anio_inicio, 1, 1), date(anio_fin, 12, 31), freq="D")
+
+    festivos = {}
+    for anio in range(anio_inicio, anio_fin + 1):
+        festivos.update(festivos_colombia_con_nombre(anio))
+    nombre_festivo = pd.Series(list(festivos.values()), index=pd.DatetimeIndex(list(festivos.keys())))
+    nombre_festivo = nombre_festivo.reindex(dias)
+
+    dia_num = dias.weekday
+    es_festivo = nombre_festivo.notna().to_numpy()
+    return pd.DataFrame({
+        "DIA_NUM": dia_num,
+        "DÍA": np.array([DIAS_ESPANOL[d] for d in range(7)], dtype=object)[dia_num],
+        "FESTIVO": nombre_festivo.fillna("").to_numpy(dtype=object),
+        "ES_FESTIVO": es_festivo,
+        "ES_DOM_FEST": (dia_num == 6) | es_festivo,
+        "SEMANA_ISO": dias.isocalendar().week.to_numpy(dtype=np.int32),
+        "MES": dias.to_period("M"),
+        "MES_CLAVE": dias.year * 100 + dias.month,
+        "MES_NOMBRE": np.array(MESES_ESPANOL, dtype=object)[dias.month - 1] + " " + dias.year.astype(str),
+    }, index=dias)
+
+def unir_calendario(df):
+    """
+    Agrega al DataFrame las columnas del calendario según su FECHA con una
+    sola búsqueda posicional (la fecha determina la fila del calendario).
+    """
+    fechas = df["FECHA"].dt.normalize()
+    calendario = construir_calendario(int(fechas.dt.year.min()), int(fechas.dt.year.max()))
+    posiciones = ((fechas - calendario.index[0]) // pd.Timedelta(days=1)).to_numpy()
+    for columna in calendario.columns:
+        df[columna] = calendario[columna].array.take(posiciones)
+    return df
+
+# ============================================================================
+# MOTOR DE CÁLCULO VECTORIZADO — solape de intervalos con franjas horarias
+# ============================================================================
+# Todos los instantes se expresan en segundos desde la medianoche de FECHA.
+# Horario nocturno: 19:00 (7 PM) a 06:00 (6 AM). El último segundo del día
+# (23:59:59 a 00:00) no suma horas, igual que el recorrido por segmentos
+# original que saltaba de 23:59:59 al día siguiente.
+SEG_INICIO_DIURNO = 6 * 3600
+SEG_INICIO_NOCTURNO = 19 * 3600
+SEG_FIN_NOCTURNO = 23 * 3600 + 59 * 60 + 59
+
+def _solape(inicio, fin, franja_inicio, franja_fin):
+    """Segundos del intervalo [inicio, fin) que caen dentro de [franja_inicio, franja_fin)."""
+    return np.clip(np.minimum(fin, franja_fin) - np.maximum(inicio, franja_inicio), 0, None)
+
+def _acumular_franjas(inicio, fin, diurna, nocturna):
+    """
+    Suma a `diurna` y `nocturna` las horas de [inicio, fin) según la franja.
+    Se acumula en orden cronológico (madrugada, día, noche) para conservar
+    exactamente la misma suma de punto flotante que el recorrido por segmentos.
+    """
+    nocturna = nocturna + _solape(inicio, fin, 0, SEG_INICIO_DIURNO) / 3600
+    diurna = diurna + _solape(inicio, fin, SEG_INICIO_DIURNO, SEG_INICIO_NOCTURNO) / 3600
+    nocturna = nocturna + _solape(inicio, fin, SEG_INICIO_NOCTURNO, SEG_FIN_NOCTURNO) / 3600
+    return diurna, nocturna
+
+def _es_nocturno_seg(segundos):
+    """Indica si cada instante (segundos desde medianoche) cae en horario nocturno."""
+    return (segundos >= SEG_INICIO_NOCTURNO) | (segundos < SEG_INICIO_DIURNO)
+
+def calcular_horas_extras_y_recargo(ingreso, salida, entrada_turno, salida_turno):
+    """
+    Calcula horas extras diurnas, nocturnas y recargo nocturno para todas las filas a la vez.
+
+    Recibe arreglos de segundos desde medianoche (ingreso/salida reales y
+    entrada/salida del turno) y retorna tres arreglos de horas:
+    (horas_extra_diurna, horas_extra_nocturna, recargo_nocturno).
+    """
+    ingreso = np.asarray(ingreso, dtype=float)
+    salida = np.asarray(salida, dtype=float)
+    entrada_turno = np.asarray(entrada_turno, dtype=float)
+    salida_turno = np.asarray(salida_turno, dtype=float)
+    cero = np.zeros(len(ingreso))
+
+    # PARTE 1: RECARGO NOCTURNO (horas normales en horario nocturno)
+    _, recargo_nocturno = _acumular_franjas(
+        np.maximum(ingreso, entrada_turno), np.minimum(salida, salida_turno), cero, cero
+    )
+
+    # PARTE 2: HORAS EXTRA ANTES DEL TURNO
+    horas_extra_diurna, horas_extra_nocturna = _acumular_franjas(ingreso, entrada_turno, cero, cero)
+
+    # PARTE 3: HORAS EXTRA DESPUÉS DEL TURNO
+    horas_extra_diurna, horas_extra_nocturna = _acumular_franjas(
+        salida_turno, salida, horas_extra_diurna, horas_extra_nocturna
+    )
+
+    # Franja de madrugada: entrada y salida nocturnas, ambas antes del turno.
+    # Todo el intervalo cuenta como extra nocturna sin partir por franjas.
+    es_madrugada = (
+        (ingreso < entrada_turno) & (salida <= entrada_turno) & (salida > ingreso)
+        & _es_nocturno_seg(ingreso) & _es_nocturno_seg(salida)
+    )
+
+    # CASO ESPECIAL: Turno 00:00 - 00:00 = "Todo Extra"
+    # Todo lo trabajado son horas extra, clasificadas por franja desde la
+    # hora REAL de ingreso. Tiene prioridad sobre la franja de madrugada.
+    es_todo_extra = (entrada_turno == 0) & (salida_turno == 0)
+    todo_diurna, todo_nocturna = _acumular_franjas(ingreso, salida, cero, cero)
+
+    horas_extra_diurna = np.where(es_todo_extra, todo_diurna,
+                                  np.where(es_madrugada, 0.0, horas_extra_diurna))
+    horas_extra_nocturna = np.where(es_todo_extra, todo_nocturna,
+                                    np.where(es_madrugada, (salida - ingreso) / 3600, horas_extra_nocturna))
+    recargo_nocturno = np.where(es_todo_extra | es_madrugada, 0.0, recargo_nocturno)
+
+    return horas_extra_diurna, horas_extra_nocturna, recargo_nocturno
+
+# ============================================================================
+# RESULTADO Y AVISOS DEL CÁLCULO
+# ============================================================================
+class ErrorCalculo(Exception):
+    """
+    Error que impide completar el cálculo (archivo con estructura o formato inválido).
+    `mensaje` describe el problema, `ayuda` indica cómo corregirlo y `datos`
+    trae el detalle estructurado (por ejemplo, las filas con problemas).
+    """
+    def __init__(self, mensaje, ayuda="", datos=None):
+        super().__init__(mensaje)
+        self.mensaje = mensaje
+        self.ayuda = ayuda
+        self.datos = datos or {}
+
+@dataclass
+class Aviso:
+    """
+    Advertencia o nota generada durante el cálculo.
+    nivel: "warning" o "info". datos: detalle estructurado para consumo externo.
+    """
+    codigo: str
+    nivel: str
+    mensaje: str
+    datos: dict = field(default_factory=dict)
+
+@dataclass
+class ResultadoCalculo:
+    """Salida de calcular_horas_extras: DataFrame calculado, avisos y configuración aplicada."""
+    df: pd.DataFrame
+    avisos: list
+    turnos_config: dict
+    factor_map: dict
+    columna_cedula: str
+    huella: str = ""
+    cubo: pd.DataFrame = None
+    filas_area_mes: dict = field(default_factory=dict)
+    topes: "AnalisisTopes" = None
+    huellas_filas: np.ndarray = None
+    huella_config: str = ""
+    filas_recalculadas: int = 0
+    tabla_turnos: "TablaTurnos" = None
+
+def huella_resultados(df, factor_map):
+    """
+    Huella (hash hexadecimal) del DataFrame calculado y de los factores aplicados.
+    Sirve como clave de caché para artefactos derivados (Excel, gráficos).
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr(list(df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    h.update(repr(sorted(factor_map.items())).encode())
+    return h.hexdigest()
+
+def huella_archivos(*contenidos):
+    """Huella (hash hexadecimal) del contenido en bytes de los archivos de entrada, en orden."""
+    h = hashlib.blake2b(digest_size=16)
+    for contenido in contenidos:
+        h.update(len(contenido).to_bytes(8, "little"))
+        h.update(contenido)
+    return h.hexdigest()
+
+# ============================================================================
+# CARGA DE CONFIGURACIÓN (TURNOS Y FACTORES)
+# ============================================================================
+# Mapear los nombres del archivo a las claves internas que usa el código
+# El archivo usa: "EXTRA DOMINICAL DIURNO" / "EXTRA DOMINICAL NOCTURNO"
+# El código busca: "EXTRA DIURNA DOMINICAL" / "EXTRA NOCTURNA DOMINICAL"
+# Se crean alias para compatibilidad en ambos sentidos
+ALIAS_DOMINICALES = {
+    "EXTRA DIURNA DOMINICAL":    ["EXTRA DOMINICAL DIURNO",   "EXTRA DIURNA DOMINICAL"],
+    "EXTRA NOCTURNA DOMINICAL":  ["EXTRA DOMINICAL NOCTURNO", "EXTRA NOCTURNA DOMINICAL"],
+    "RECARGO NOCTURNO DOMINICAL":["RECARGO DOMINICAL NOCTURNO","RECARGO NOCTURNO DOMINICAL",
+                                  "RECARGO DOMINICAL DIURNO"],
+}
+DEFAULTS_DOMINICALES = {
+    "EXTRA DIURNA DOMINICAL": 2.00,
+    "EXTRA NOCTURNA DOMINICAL": 2.50,
+    "RECARGO NOCTURNO DOMINICAL": 1.75,
+}
+
+def _normalizar_columnas(df):
+    """Retorna una copia del DataFrame con nombres de columna en mayúsculas y sin espacios."""
+    df = df.copy()
+    df.columns = df.columns.str.upper().str.strip()
+    return df
+
+def a_time(valor):
+    """Convierte un valor de celda (time, datetime o texto HH:MM) a time; None si no es válido."""
+    if isinstance(valor, time):
+        return valor
+    if isinstance(valor, datetime):
+        return valor.time()
+    if isinstance(valor, str):
+        for formato in FORMATOS_HORA_TEXTO:
+            parsed = pd.to_datetime(valor, format=formato, errors='coerce')
+            if not pd.isna(parsed):
+                return parsed.time()
+    return None
+
+# ============================================================================
+# CONVERSIÓN VECTORIZADA DE HORAS DEL DÍA
+# ============================================================================
+FORMATOS_HORA_TEXTO = ('%H:%M', '%H:%M:%S')
+SEGUNDOS_POR_DIA = 24 * 3600
+
+def parsear_hora_del_dia(serie):
+    """
+    Convierte una columna de horas a segundos desde medianoche (int64).
+
+    Acepta celdas de tiempo de Excel (time), fecha-hora (datetime), fracción de
+    día de Excel (número entre 0 y 1, o serial de fecha con parte decimal) y
+    texto HH:MM o HH:MM:SS. Cada valor distinto se
+    clasifica una sola vez y cada clase se convierte en bloque; el resultado se
+    expande a todas las filas. Se redondea al segundo más cercano.
+    Retorna (segundos, invalidos), donde invalidos marca las celdas vacías o
+    que no se pudieron interpretar (con segundos = 0).
+    """
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+    unicos = np.asarray(unicos, dtype=object)
+    segundos_unicos = np.full(len(unicos), np.nan)
+
+    es_time = np.array([isinstance(v, time) for v in unicos], dtype=bool)
+    es_datetime = np.array([isinstance(v, datetime) for v in unicos], dtype=bool)
+    es_numero = np.array([isinstance(v, (int, float, np.number)) and not isinstance(v, (bool, np.bool_))
+                          for v in unicos], dtype=bool)
+    es_texto = np.array([isinstance(v, str) for v in unicos], dtype=bool)
+
+    if es_time.any():
+        segundos_unicos[es_time] = [
+            v.hour * 3600 + v.minute * 60 + v.second + v.microsecond / 1e6 for v in unicos[es_time]
+        ]
+
+    if es_datetime.any():
+        fechas_hora = pd.DatetimeIndex(list(unicos[es_datetime]))
+        segundos_unicos[es_datetime] = (fechas_hora - fechas_hora.normalize()).total_seconds()
+
+    if es_numero.any():
+        # Fracción de día de Excel (0.5 = 12:00) o serial de fecha y hora (se
+        # ignora la parte entera). Un entero de 1 en adelante (8, 14.0) no es
+        # una hora del día sino un número mal digitado: se marca inválido.
+        numeros = unicos[es_numero].astype(float)
+        fraccion = numeros % 1
+        es_hora = (numeros >= 0) & ((numeros < 1) | (fraccion != 0))
+        segundos_unicos[es_numero] = np.where(es_hora, fraccion * SEGUNDOS_POR_DIA, np.nan)
+
+    if es_texto.any():
+        textos = pd.Series(list(unicos[es_texto]), dtype=object).str.strip()
+        parseado = pd.Series(pd.NaT, index=textos.index, dtype="datetime64[ns]")
+        for formato in FORMATOS_HORA_TEXTO:
+            pendientes = parseado.isna()
+            if not pendientes.any():
+                break
+            parseado[pendientes] = pd.to_datetime(textos[pendientes], format=formato, errors='coerce')
+        segundos_unicos[es_texto] = (parseado - parseado.dt.normalize()).dt.total_seconds().to_numpy()
+
+    segundos_unicos = np.minimum(np.round(segundos_unicos), SEGUNDOS_POR_DIA - 1)
+    invalidos_unicos = np.isnan(segundos_unicos)
+
+    invalidos = (codigos < 0) | invalidos_unicos[codigos]
+    segundos = np.where(invalidos, 0, np.nan_to_num(segundos_unicos)[codigos]).astype(np.int64)
+    return segundos, invalidos
+
+def segundos_a_time(segundos):
+    """Convierte segundos desde medianoche a objetos time (uno por valor distinto)."""
+    unicos, inversos = np.unique(segundos, return_inverse=True)
+    horas = np.array([time(s // 3600, s % 3600 // 60, s % 60) for s in unicos.tolist()], dtype=object)
+    return horas[inversos.reshape(-1)]
+
+def construir_turnos_config(df_turnos, avisos):
+    """Crea el diccionario {TURNO: {"entrada": time, "salida": time}} desde el archivo de turnos."""
+    turnos_config = {}
+    for _, row in df_turnos.iterrows():
+        turno_nombre = str(row["TURNO"]).upper().strip()
+
+        try:
+            hora_entrada = a_time(row["HORA ENTRADA"])
+            hora_salida = a_time(row["HORA SALIDA"])
+        except Exception as e:
+            avisos.append(Aviso("turno_error", "warning",
+                                f"Error procesando turno {turno_nombre}: {e}",
+                                {"turno": turno_nombre}))
+            continue
+
+        if hora_entrada is None or hora_salida is None:
+            avisos.append(Aviso("turno_invalido", "warning",
+                                f"Advertencia: Turno '{turno_nombre}' tiene formato de hora inválido, se omitirá",
+                                {"turno": turno_nombre}))
+            continue
+
+        turnos_config[turno_nombre] = {
+            "entrada": hora_entrada,
+            "salida": hora_salida
+        }
+
+    if not turnos_config:
+        raise ErrorCalculo("No se pudo cargar ningún turno del archivo de configuración")
+
+    return turnos_config
+
+# Horario que toman las filas cuyo turno no está en la configuración
+HORARIO_POR_DEFECTO = (time(8, 0), time(18, 0))
+
+def segundos_del_dia(hora):
+    """Segundos desde medianoche de un objeto time."""
+    return hora.hour * 3600 + hora.minute * 60 + hora.second + hora.microsecond / 1e6
+
+@dataclass(frozen=True)
+class TablaTurnos:
+    """
+    Configuración de turnos compilada una sola vez por cálculo. La posición i
+    de cada arreglo corresponde al turno codigos[i]; la posición final
+    (len(codigos)) es el horario por defecto de los turnos desconocidos.
+    entrada_seg / salida_seg: segundos desde medianoche
+    todo_extra: turno 00:00–00:00 (todo lo trabajado es extra)
+    cruza_medianoche: la salida es anterior a la entrada (p. ej. 22:00–06:00)
+    entrada_texto / salida_texto: horario "HH:MM" para mostrar
+    """
+    codigos: pd.Index
+    entrada_seg: np.ndarray
+    salida_seg: np.ndarray
+    todo_extra: np.ndarray
+    cruza_medianoche: np.ndarray
+    entrada_texto: np.ndarray
+    salida_texto: np.ndarray
+
+    @property
+    def posicion_por_defecto(self):
+        return len(self.codigos)
+
+    def posiciones(self, turnos):
+        """Posición en la tabla de cada turno normalizado (los desconocidos van al horario por defecto)."""
+        posiciones = self.codigos.get_indexer(turnos)
+        return np.where(posiciones < 0, self.posicion_por_defecto, posiciones)
+
+    def texto_para_mostrar(self, textos, posiciones):
+        """Categórico con el horario "HH:MM" de cada fila, sin formatear nada por fila."""
+        categorias, codigos = np.unique(textos, return_inverse=True)
+        return pd.Categorical.from_codes(codigos[posiciones], categories=pd.Index(categorias).astype(str))
+
+def compilar_turnos(turnos_config):
+    """Compila {TURNO: {"entrada", "salida"}} (construir_turnos_config) en una TablaTurnos."""
+    horarios = [(config["entrada"], config["salida"]) for config in turnos_config.values()]
+    horarios.append(HORARIO_POR_DEFECTO)
+    entrada = np.array([segundos_del_dia(h_entrada) for h_entrada, _ in horarios])
+    salida = np.array([segundos_del_dia(h_salida) for _, h_salida in horarios])
+    return TablaTurnos(
+        codigos=pd.Index(list(turnos_config), dtype=object),
+        entrada_seg=entrada,
+        salida_seg=salida,
+        todo_extra=(entrada == 0) & (salida == 0),
+        cruza_medianoche=salida < entrada,
+        entrada_texto=np.array([h_entrada.strftime('%H:%M') for h_entrada, _ in horarios], dtype=object),
+        salida_texto=np.array([h_salida.strftime('%H:%M') for _, h_salida in horarios], dtype=object),
+    )
+
+def factorizar_turnos(turnos):
+    """
+    (codigos, nombres): los nombres de turno distintos normalizados (mayúsculas,
+    sin espacios a los lados) y el código de cada fila en ellos. Cada nombre se
+    normaliza una sola vez, no una vez por fila.
+    """
+    codigos, nombres = pd.factorize(turnos, use_na_sentinel=False)
+    return codigos, pd.Index(nombres, dtype=object).astype(str).str.upper().str.strip()
+
+def avisos_turnos(tabla_turnos, turnos, filas_por_turno, avisos, max_listados=10):
+    """
+    Reporta una sola vez los turnos sin configuración y los que cruzan la
+    medianoche, cada uno con sus filas. turnos: nombres normalizados distintos;
+    filas_por_turno: filas de cada uno, alineado con turnos.
+    """
+    conteo = pd.Series(filas_por_turno, index=turnos).groupby(level=0, sort=False, dropna=False).sum()
+    posiciones = tabla_turnos.posiciones(conteo.index)
+
+    def listado(filas):
+        filas = filas.sort_values(ascending=False, kind="stable")
+        texto = ", ".join(f"'{turno}' ({n} registros)" for turno, n in filas.head(max_listados).items())
+        if len(filas) > max_listados:
+            texto += f" y {len(filas) - max_listados} más"
+        return texto
+
+    desconocidos = conteo[posiciones == tabla_turnos.posicion_por_defecto]
+    desconocidos = desconocidos[desconocidos > 0]
+    if len(desconocidos):
+        entrada, salida = (h.strftime('%H:%M') for h in HORARIO_POR_DEFECTO)
+        avisos.append(Aviso(
+            "turno_desconocido", "warning",
+            f"Advertencia: {len(desconocidos)} turno(s) no encontrado(s) en configuración; "
+            f"sus {int(desconocidos.sum())} registros usan el horario por defecto {entrada} a {salida}: "
+            f"{listado(desconocidos)}",
+            {"turnos": {str(turno): int(n) for turno, n in desconocidos.items()}}
+        ))
+
+    cruzan = tabla_turnos.cruza_medianoche[posiciones]
+    nocturnos = conteo[cruzan & (conteo.to_numpy() > 0)]
+    if len(nocturnos):
+        avisos.append(Aviso(
+            "turno_cruza_medianoche", "warning",
+            f"Advertencia: {len(nocturnos)} turno(s) terminan después de medianoche y el cálculo "
+            f"compara cada horario dentro del mismo día; revise sus {int(nocturnos.sum())} registros: "
+            f"{listado(nocturnos)}",
+            {"turnos": {str(turno): int(n) for turno, n in nocturnos.items()}}
+        ))
+
+def construir_factor_map(df_porcentaje, avisos):
+    """Crea el mapa TIPO HORA EXTRA → FACTOR, completando los factores dominicales."""
+    factor_map = dict(zip(df_porcentaje["TIPO HORA EXTRA"].str.upper().str.strip(), df_porcentaje["FACTOR"]))
+
+    for clave_interna, posibles_nombres in ALIAS_DOMINICALES.items():
+        if clave_interna not in factor_map:
+            for nombre in posibles_nombres:
+                if nombre in factor_map:
+                    factor_map[clave_interna] = factor_map[nombre]
+                    break
+            else:
+                factor_map[clave_interna] = DEFAULTS_DOMINICALES[clave_interna]
+                avisos.append(Aviso(
+                    "factor_por_defecto", "info",
+                    f"No se encontró factor dominical '{clave_interna}'. "
+                    f"Se usará valor por defecto: {DEFAULTS_DOMINICALES[clave_interna]}",
+                    {"tipo": clave_interna, "factor": DEFAULTS_DOMINICALES[clave_interna]}
+                ))
+    return factor_map
+
+# ============================================================================
+# ÍNDICE DE EMPLEADOS
+# ============================================================================
+COLUMNAS_EMPLEADOS_REQUERIDAS = ["NOMBRE", "AREA", "SALARIO BASICO"]
+
+def normalizar_cedulas(serie):
+    """Cédulas como texto sin espacios a los lados (la clave de cruce entre archivos)."""
+    return serie.astype(str).str.strip()
+
+@dataclass(frozen=True)
+class IndiceEmpleados:
+    """
+    Base de empleados indexada por cédula normalizada (una fila por cédula).
+    Es de solo lectura, así la app la comparte entre cálculos y sesiones y solo
+    la reconstruye cuando cambia la huella del archivo de empleados.
+    columnas: nombre → arreglo alineado con `cedulas`, en el orden del archivo.
+    """
+    huella: str
+    columna_cedula: str
+    cedulas: pd.Index
+    columnas: dict
+    cedulas_duplicadas: list
+
+    def buscar(self, cedulas):
+        """Posición de cada cédula en el índice (-1 si no está), en una sola pasada vectorizada."""
+        return self.cedulas.get_indexer(cedulas)
+
+def construir_indice_empleados(df_empleados, huella=""):
+    """
+    Valida la base de empleados y la indexa por cédula. Si una cédula aparece
+    más de una vez se usa su primera fila (las repetidas quedan en
+    `cedulas_duplicadas`). Lanza ErrorCalculo si faltan columnas.
+    """
+    df_empleados = _normalizar_columnas(df_empleados)
+
+    # Buscar columna cédula en empleados (acepta CEDULA, CÉDULA, o cualquier variante normalizada)
+    cedula_empleados = None
+    for col in df_empleados.columns:
+        if col.upper().strip() in ("CEDULA", "CÉDULA"):
+            cedula_empleados = col
+            break
+    if cedula_empleados is None:
+        raise ErrorCalculo("Error: No se encontró columna de cédula en base de empleados",
+                           "La columna debe llamarse 'CEDULA', 'Cedula' o 'CÉDULA'")
+
+    # Validar que existan las columnas necesarias del archivo de empleados
+    columnas_faltantes = [col for col in COLUMNAS_EMPLEADOS_REQUERIDAS if col not in df_empleados.columns]
+    if columnas_faltantes:
+        raise ErrorCalculo(
+            f"Error: Faltan columnas en el archivo de empleados: {', '.join(columnas_faltantes)}",
+            """
+        El archivo de empleados debe tener las siguientes columnas:
+        - CEDULA o CÉDULA
+        - NOMBRE
+        - AREA
+        - SALARIO BASICO
+        - CARGO (opcional, pero recomendado)
+        """
+        )
+
+    df_empleados[cedula_empleados] = normalizar_cedulas(df_empleados[cedula_empleados])
+    duplicadas = df_empleados[cedula_empleados].duplicated().to_numpy()
+    unicos = df_empleados[~duplicadas]
+    return IndiceEmpleados(
+        huella=huella,
+        columna_cedula=cedula_empleados,
+        cedulas=pd.Index(unicos[cedula_empleados]),
+        columnas={col: unicos[col].array for col in unicos.columns},
+        cedulas_duplicadas=pd.unique(df_empleados.loc[duplicadas, cedula_empleados]).tolist(),
+    )
+
+# ============================================================================
+# VALORACIÓN POR TABLA DE FACTORES
+# ============================================================================
+# Orden de las filas de la tabla de factores y columnas de horas/valor asociadas
+TIPOS_HORA = ("EXTRA DIURNA", "EXTRA NOCTURNA", "RECARGO NOCTURNO")
+COLUMNAS_VALORACION = (
+    ("HORAS EXTRA DIURNA", "VALOR EXTRA DIURNA"),
+    ("HORAS EXTRA NOCTURNA", "VALOR EXTRA NOCTURNA"),
+    ("RECARGO NOCTURNO", "VALOR RECARGO NOCTURNO"),
+)
+
+def construir_tabla_factores(factor_map):
+    """
+    Convierte factor_map en una tabla de 3×2: fila = tipo de hora (TIPOS_HORA),
+    columna 0 = día normal, columna 1 = domingo o festivo.
+    En Colombia, los festivos tienen el mismo recargo que los domingos. Si falta
+    el factor dominical se usa el normal, y si falta el normal se usa 1.25.
+    """
+    tabla = np.empty((len(TIPOS_HORA), 2))
+    for i, tipo_base in enumerate(TIPOS_HORA):
+        factor_normal = factor_map.get(tipo_base, 1.25)
+        tabla[i, 0] = factor_normal
+        tabla[i, 1] = factor_map.get(tipo_base + " DOMINICAL", factor_normal)
+    return tabla
+
+def valorar_horas(df, factor_map):
+    """
+    Agrega al DataFrame los valores monetarios y las columnas de clasificación
+    (VALOR EXTRA DIURNA/NOCTURNA, VALOR RECARGO NOCTURNO, VALOR TOTAL EXTRAS,
+    TIPO EXTRA y TIPO TARIFA) en una sola pasada vectorizada.
+    Requiere las columnas de horas, IMPORTE HORA, DIA_NUM y ES_FESTIVO.
+    """
+    tabla_factores = construir_tabla_factores(factor_map)
+    es_domingo = (df["DIA_NUM"] == 6).to_numpy()
+    es_festivo = df["ES_FESTIVO"].to_numpy(dtype=bool)
+    columna_dia = (es_domingo | es_festivo).astype(np.intp)
+    importe_hora = df["IMPORTE HORA"].to_numpy(dtype=float)
+
+    for i, (columna_horas, columna_valor) in enumerate(COLUMNAS_VALORACION):
+        df[columna_valor] = df[columna_horas].to_numpy(dtype=float) * importe_hora * tabla_factores[i, columna_dia]
+
+    df["VALOR TOTAL EXTRAS"] = df["VALOR EXTRA DIURNA"] + df["VALOR EXTRA NOCTURNA"] + df["VALOR RECARGO NOCTURNO"]
+
+    df["TIPO EXTRA"] = np.select(
+        [df["RECARGO NOCTURNO"].to_numpy() > 0, df["HORAS EXTRA NOCTURNA"].to_numpy() > 0],
+        ["Recargo Nocturno", "Extra Nocturna"],
+        default="Extra Diurna"
+    )
+
+    # Columna de auditoría: indica qué tarifa se aplicó
+    df["TIPO TARIFA"] = np.select(
+        [es_domingo & es_festivo, es_domingo, es_festivo],
+        ["DOMINGO FESTIVO", "DOMINGO", "FESTIVO"],
+        default="NORMAL"
+    )
+    return df
+
+# ============================================================================
+# DETECCIÓN DE CAMBIOS POR FILA — reutilizar etapas de una carga anterior
+# ============================================================================
+# Salidas de las etapas de horas y valoración que se guardan por huella de fila
+# (sin redondear), para no recalcularlas si la fila no cambió en la nueva carga.
+COLUMNAS_ETAPA_HORAS = ["HORAS EXTRA DIURNA", "HORAS EXTRA NOCTURNA", "RECARGO NOCTURNO"]
+COLUMNAS_ETAPA_VALORACION = [
+    "VALOR EXTRA DIURNA", "VALOR EXTRA NOCTURNA", "VALOR RECARGO NOCTURNO",
+    "VALOR TOTAL EXTRAS", "TIPO EXTRA", "TIPO TARIFA",
+]
+
+def huella_filas(df, columna_cedula, turno_fila, entrada_turno_seg, salida_turno_seg):
+    """
+    Huella (uint64) de cada fila sobre su clave de negocio (cédula, FECHA,
+    TURNO, hora de ingreso y salida, comisión) más lo que leen las etapas de
+    horas y valoración: horario del turno resuelto y salario básico.
+    """
+    clave = pd.DataFrame({
+        "cedula": df[columna_cedula].astype(str).to_numpy(),
+        "fecha": df["FECHA"].to_numpy().astype("datetime64[s]").astype(np.int64),
+        "turno": turno_fila.to_numpy(),
+        "ingreso": df["SEG_INGRESO"].to_numpy(),
+        "salida": df["SEG_SALIDA"].to_numpy(),
+        "comision": pd.to_numeric(df["COMISIÓN O BONIFICACIÓN"], errors="coerce").to_numpy(dtype=float),
+        "salario": pd.to_numeric(df["SALARIO BASICO"], errors="coerce").to_numpy(dtype=float),
+        "entrada_turno": np.asarray(entrada_turno_seg, dtype=float),
+        "salida_turno": np.asarray(salida_turno_seg, dtype=float),
+    })
+    return pd.util.hash_pandas_object(clave, index=False).to_numpy()
+
+def huella_configuracion(factor_map):
+    """Huella de lo que afecta a todas las filas por igual: versión del motor y factores."""
+    return hashlib.blake2b(f"{VERSION_MOTOR}|{sorted(factor_map.items())!r}".encode(), digest_size=16).hexdigest()
+
+def posiciones_previas(previo, huellas, huella_config):
+    """
+    Para cada huella, la posición en previo.df de la primera fila con esa
+    huella; -1 si la fila es nueva o cambió (o si no hay resultado previo
+    compatible) y debe recalcularse.
+    """
+    if previo is None or previo.huellas_filas is None or previo.huella_config != huella_config:
+        return np.full(len(huellas), -1, dtype=np.intp)
+    unicas, primeras = np.unique(previo.huellas_filas, return_index=True)
+    encontradas = pd.Index(unicas).get_indexer(huellas)
+    return np.where(encontradas >= 0, primeras[encontradas], -1)
+
+def combinar_etapa(calculado, memoria, previas, columnas):
+    """
+    Arma las columnas de una etapa en el orden de las filas: las filas
+    recalculadas (previas == -1) salen de `calculado`, en orden; el resto, de
+    las filas `previas` de `memoria` (el df del resultado anterior).
+    """
+    recalcular = previas < 0
+    if recalcular.all():
+        return {columna: np.asarray(calculado[columna]) for columna in columnas}
+    combinado = {}
+    for columna in columnas:
+        valores = memoria[columna].to_numpy()[np.where(recalcular, 0, previas)]
+        valores[recalcular] = np.asarray(calculado[columna])
+        combinado[columna] = valores
+    return combinado
+
+def comparar_resultados(anterior, actual):
+    """
+    Filas cuyo cálculo cambió entre dos cargas. Las filas se emparejan por
+    cédula, FECHA, TURNO y número de aparición. Retorna un DataFrame con el
+    ESTADO (Modificado, Nuevo o Eliminado) y los valores antes y ahora.
+    """
+    def preparar(resultado):
+        df = resultado.df
+        tabla = pd.DataFrame({
+            "CÉDULA": df[resultado.columna_cedula].astype(str).to_numpy(),
+            "NOMBRE": df["NOMBRE"].to_numpy(dtype=object),
+            "FECHA": df["FECHA"].to_numpy(),
+            "TURNO": (df["TURNO"].astype(str).str.upper().str.strip().to_numpy()
+                      if "TURNO" in df.columns else "TURNO 1"),
+            "HRA INGRESO": segundos_a_time(df["SEG_INGRESO"].to_numpy()),
+            "HORA SALIDA": segundos_a_time(df["SEG_SALIDA"].to_numpy()),
+            "TOTAL HORAS EXTRA": columna_derivada(df, "TOTAL HORAS EXTRA_DISPLAY").to_numpy(),
+            "VALOR TOTAL EXTRAS": df["VALOR TOTAL EXTRAS"].to_numpy(),
+            "_HUELLA": resultado.huellas_filas,
+        })
+        tabla["_OCURRENCIA"] = tabla.groupby(["CÉDULA", "FECHA", "TURNO"]).cumcount()
+        return tabla
+
+    claves = ["CÉDULA", "FECHA", "TURNO", "_OCURRENCIA"]
+    unido = preparar(anterior).merge(preparar(actual), on=claves, how="outer",
+                                     suffixes=(" ANTES", " AHORA"), indicator=True)
+    unido = unido[(unido["_merge"] != "both") | (unido["_HUELLA ANTES"] != unido["_HUELLA AHORA"])]
+    unido["ESTADO"] = unido["_merge"].map({"both": "Modificado", "right_only": "Nuevo", "left_only": "Eliminado"})
+    unido["NOMBRE"] = unido["NOMBRE AHORA"].fillna(unido["NOMBRE ANTES"])
+    unido["DIFERENCIA VALOR"] = unido["VALOR TOTAL EXTRAS AHORA"].fillna(0) - unido["VALOR TOTAL EXTRAS ANTES"].fillna(0)
+    columnas = ["ESTADO", "CÉDULA", "NOMBRE", "FECHA", "TURNO",
+                "HRA INGRESO ANTES", "HRA INGRESO AHORA", "HORA SALIDA ANTES", "HORA SALIDA AHORA",
+                "TOTAL HORAS EXTRA ANTES", "TOTAL HORAS EXTRA AHORA",
+                "VALOR TOTAL EXTRAS ANTES", "VALOR TOTAL EXTRAS AHORA", "DIFERENCIA VALOR"]
+    return unido[columnas].sort_values(["FECHA", "CÉDULA", "TURNO"]).reset_index(drop=True)
+
+# ============================================================================
+# HORAS EXTRA Y VALORACIÓN POR BLOQUES — en serie o en varios procesos
+# ============================================================================
+# Por debajo de este número de filas repartir el trabajo cuesta más (arranque
+# de procesos y envío de los bloques) que calcularlo en un solo proceso.
+MIN_FILAS_PARALELO = 200_000
+# Bloques por proceso: varios, para que un bloque lento no deje procesos ociosos
+BLOQUES_POR_PROCESO = 4
+
+def calcular_etapas_filas(etapa, factor_map):
+    """
+    Horas extra y valoración de un bloque de filas. `etapa` trae SEG_INGRESO,
+    SEG_SALIDA, SEG_ENTRADA_TURNO, SEG_SALIDA_TURNO, IMPORTE HORA, DIA_NUM y
+    ES_FESTIVO; retorna un DataFrame con COLUMNAS_ETAPA_HORAS y
+    COLUMNAS_ETAPA_VALORACION en el mismo orden de filas. Todo el cálculo es
+    fila a fila, así que partir las filas en bloques no cambia ningún valor.
+    """
+    horas = calcular_horas_extras_y_recargo(
+        etapa["SEG_INGRESO"].to_numpy(), etapa["SEG_SALIDA"].to_numpy(),
+        etapa["SEG_ENTRADA_TURNO"].to_numpy(), etapa["SEG_SALIDA_TURNO"].to_numpy()
+    )
+    calculado = pd.DataFrame(dict(zip(COLUMNAS_ETAPA_HORAS, horas)), index=etapa.index)
+    calculado = calculado.assign(**{columna: etapa[columna] for columna in ("IMPORTE HORA", "DIA_NUM", "ES_FESTIVO")})
+    valorar_horas(calculado, factor_map)
+    return calculado[COLUMNAS_ETAPA_HORAS + COLUMNAS_ETAPA_VALORACION]
+
+def bloques_por_cedula(cedulas, n_bloques):
+    """
+    Reparte las posiciones de las filas en hasta n_bloques bloques de tamaño
+    parecido sin partir ninguna cédula (todas sus filas quedan en el mismo
+    bloque). Retorna una lista de arreglos de posiciones, cada uno ordenado.
+    """
+    codigos, unicos = pd.factorize(cedulas)
+    filas_por_cedula = np.bincount(codigos, minlength=len(unicos))
+    filas_antes = np.cumsum(filas_por_cedula) - filas_por_cedula
+    bloque_cedula = filas_antes * n_bloques // max(len(codigos), 1)
+    bloque_fila = bloque_cedula[codigos]
+    return [posiciones for posiciones in (np.flatnonzero(bloque_fila == b) for b in range(n_bloques))
+            if len(posiciones)]
+
+# Configuración de solo lectura de cada proceso, recibida una vez al iniciarlo
+_factor_map_proceso = None
+
+def _iniciar_proceso(factor_map):
+    global _factor_map_proceso
+    _factor_map_proceso = factor_map
+
+def _calcular_bloque(etapa):
+    return calcular_etapas_filas(etapa, _factor_map_proceso)
+
+def calcular_etapas_en_paralelo(etapa, cedulas, factor_map, procesos):
+    """
+    Igual que calcular_etapas_filas, repartiendo las filas por cédula entre
+    `procesos` procesos. factor_map se envía una sola vez a cada proceso; los
+    bloques se vuelven a unir en el orden original de las filas.
+    """
+    bloques = bloques_por_cedula(cedulas, procesos * BLOQUES_POR_PROCESO)
+    # "spawn": un fork desde el servidor de Streamlit (que tiene hilos) puede bloquearse
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_iniciar_proceso, initargs=(factor_map,)) as pool:
+        partes = list(pool.map(_calcular_bloque, (etapa.iloc[posiciones] for posiciones in bloques)))
+    return pd.concat(partes).loc[etapa.index]
+
+# ============================================================================
+# CUBO DE AGREGADOS — área × mes × empleado
+# ============================================================================
+# Filtros, métricas y gráficos leen rebanadas de este cubo en lugar de copiar
+# y reagrupar el detalle: su tamaño depende de áreas, meses y empleados, no
+# del número de registros de asistencia.
+MEDIDAS_CUBO = [
+    "HORAS EXTRA DIURNA_DISPLAY", "HORAS EXTRA NOCTURNA_DISPLAY", "RECARGO NOCTURNO_DISPLAY",
+    "VALOR TOTAL EXTRAS", "COMISIÓN O BONIFICACIÓN",
+]
+
+def construir_cubo(df, columna_cedula):
+    """
+    Retorna (cubo, filas_area_mes):
+    - cubo: sumas de MEDIDAS_CUBO por AREA, MES_CLAVE, MES_NOMBRE, cédula y NOMBRE
+    - filas_area_mes: (AREA, MES_NOMBRE) → posiciones (ordenadas) de las filas de df
+    """
+    dimensiones = ["AREA", "MES_CLAVE", "MES_NOMBRE", columna_cedula, "NOMBRE"]
+    medidas = df[dimensiones].assign(**{col: columna_derivada(df, col) for col in MEDIDAS_CUBO})
+    cubo = (medidas.groupby(dimensiones, sort=True, dropna=False, observed=True)[MEDIDAS_CUBO]
+                   .sum()
+                   .reset_index())
+    filas_area_mes = df.groupby(["AREA", "MES_NOMBRE"], sort=False, dropna=False, observed=True).indices
+    return cubo, filas_area_mes
+
+def rebanada_cubo(cubo, area=None, mes=None):
+    """Filas del cubo para un área y/o mes (None = todos)."""
+    mascara = np.ones(len(cubo), dtype=bool)
+    if area is not None:
+        mascara &= (cubo["AREA"] == area).to_numpy()
+    if mes is not None:
+        mascara &= (cubo["MES_NOMBRE"] == mes).to_numpy()
+    return cubo[mascara]
+
+def posiciones_filas(filas_area_mes, area=None, mes=None):
+    """Posiciones (en orden original) de las filas del detalle para un área y/o mes; None = todas."""
+    if area is None and mes is None:
+        return None
+    partes = [posiciones for (area_fila, mes_fila), posiciones in filas_area_mes.items()
+              if (area is None or area_fila == area) and (mes is None or mes_fila == mes)]
+    if not partes:
+        return np.empty(0, dtype=np.intp)
+    return np.sort(np.concatenate(partes))
+
+# ============================================================================
+# TOPES LEGALES DE HORAS EXTRA
+# ============================================================================
+# La ley limita el trabajo suplementario a 2 horas diarias y 12 semanales. Las
+# horas extra (diurnas + nocturnas) se suman por cédula y día, y sobre esos
+# totales diarios, por semana ISO (lunes a domingo) y en ventanas móviles de
+# 7 días, todo en una pasada sobre los registros ordenados por (cédula, FECHA).
+TOPE_DIARIO_HORAS_EXTRA = 2.0
+TOPE_SEMANAL_HORAS_EXTRA = 12.0
+DIAS_VENTANA_MOVIL = 7
+# Margen para comparar sumas de horas en punto flotante contra el tope
+_MARGEN_TOPE = 1e-6
+
+TIPOS_TOPE = ["Diario", "Semanal", "7 días móviles"]
+COLUMNAS_INCUMPLIMIENTOS = ["CÉDULA", "NOMBRE", "AREA", "TOPE", "PERIODO", "DESDE", "HASTA",
+                            "HORAS EXTRA", "LÍMITE", "EXCESO"]
+
+@dataclass
+class AnalisisTopes:
+    """
+    Cumplimiento de los topes de horas extra.
+    diario: horas extra por cédula y día, con su semana ISO y el acumulado de
+    los últimos 7 días; semanal: horas extra por cédula y semana ISO;
+    incumplimientos: una fila por tope excedido (COLUMNAS_INCUMPLIMIENTOS).
+    """
+    diario: pd.DataFrame
+    semanal: pd.DataFrame
+    incumplimientos: pd.DataFrame
+
+def _inicios_de_grupo(*claves):
+    """Posiciones donde empieza cada grupo de filas consecutivas con las mismas claves."""
+    cambio = np.zeros(len(claves[0]), dtype=bool)
+    if len(cambio):
+        cambio[0] = True
+    for clave in claves:
+        cambio[1:] |= clave[1:] != clave[:-1]
+    return np.flatnonzero(cambio)
+
+def _semana_iso(dias):
+    """Etiqueta "AAAA-Wss" de la semana ISO de cada día (días desde 1970-01-01)."""
+    if not len(dias):
+        return np.empty(0, dtype=object)
+    calendario = pd.DatetimeIndex(dias.astype("datetime64[D]")).isocalendar()
+    return (calendario["year"].astype(str) + "-W" + calendario["week"].astype(str).str.zfill(2)).to_numpy(dtype=object)
+
+def analizar_topes(df, columna_cedula, tope_diario=TOPE_DIARIO_HORAS_EXTRA, tope_semanal=TOPE_SEMANAL_HORAS_EXTRA):
+    """
+    Suma las horas extra de df por cédula y día y las compara con los topes
+    diario, semanal (semana ISO) y de 7 días móviles. Los registros sin fecha
+    no se cuentan. Retorna un AnalisisTopes.
+    """
+    codigos_filas, cedulas = pd.factorize(df[columna_cedula], sort=True)
+    dias = df["FECHA"].to_numpy(dtype="datetime64[D]")
+    validos = (codigos_filas >= 0) & ~np.isnat(dias)
+    codigos = codigos_filas[validos]
+    dias = dias[validos].astype(np.int64)
+    extra = (df["HORAS EXTRA DIURNA"].to_numpy(dtype=float)
+             + df["HORAS EXTRA NOCTURNA"].to_numpy(dtype=float))[validos]
+
+    # Orden por (cédula, día): cada total es una suma de filas consecutivas
+    orden = np.lexsort((dias, codigos))
+    codigos, dias, extra = codigos[orden], dias[orden], extra[orden]
+
+    # Totales por cédula y día
+    inicios = _inicios_de_grupo(codigos, dias)
+    codigo_dia, dia = codigos[inicios], dias[inicios]
+    horas_dia = np.add.reduceat(extra, inicios) if len(inicios) else np.empty(0)
+
+    # Ventana móvil: suma de los días en (dia - 7, dia] de la misma cédula, con
+    # sumas acumuladas y una búsqueda binaria sobre una clave (cédula, día)
+    # creciente en la que las ventanas no alcanzan a la cédula anterior.
+    if len(dia):
+        desplazamiento = dia - dia.min() + DIAS_VENTANA_MOVIL
+        clave = codigo_dia.astype(np.int64) * int(desplazamiento.max() + DIAS_VENTANA_MOVIL) + desplazamiento
+        inicio_ventana = np.searchsorted(clave, clave - (DIAS_VENTANA_MOVIL - 1), side="left")
+        acumulado = np.concatenate([[0.0], np.cumsum(horas_dia)])
+        horas_ventana = acumulado[1:] - acumulado[inicio_ventana]
+    else:
+        horas_ventana = np.empty(0)
+
+    # Totales por cédula y semana ISO (el lunes identifica la semana;
+    # 1970-01-01 fue jueves)
+    lunes = dia - (dia + 3) % 7
+    inicios_semana = _inicios_de_grupo(codigo_dia, lunes)
+    codigo_semana, lunes_semana = codigo_dia[inicios_semana], lunes[inicios_semana]
+    horas_semana = np.add.reduceat(horas_dia, inicios_semana) if len(inicios_semana) else np.empty(0)
+    dias_semana = np.diff(np.append(inicios_semana, len(dia)))
+    etiqueta_semana = _semana_iso(lunes_semana)
+
+    diario = pd.DataFrame({
+        columna_cedula: cedulas.take(codigo_dia),
+        "FECHA": dia.astype("datetime64[D]").astype("datetime64[ns]"),
+        "SEMANA ISO": np.repeat(etiqueta_semana, dias_semana),
+        "HORAS EXTRA": horas_dia.round(2),
+        "HORAS EXTRA 7 DÍAS": horas_ventana.round(2),
+    })
+    semanal = pd.DataFrame({
+        columna_cedula: cedulas.take(codigo_semana),
+        "SEMANA ISO": etiqueta_semana,
+        "DESDE": lunes_semana.astype("datetime64[D]").astype("datetime64[ns]"),
+        "DÍAS": dias_semana,
+        "HORAS EXTRA": horas_semana.round(2),
+    })
+
+    # Nombre y área de cada cédula, de su primer registro (al asignar con
+    # índices repetidos queda el último, por eso se recorre al revés)
+    primeras = np.flatnonzero(codigos_filas >= 0)[::-1]
+    primera = np.zeros(len(cedulas), dtype=np.intp)
+    primera[codigos_filas[primeras]] = primeras
+    nombre_cedula = df["NOMBRE"].astype(object).to_numpy()[primera]
+    area_cedula = df["AREA"].astype(object).to_numpy()[primera]
+
+    partes = []
+    excede = horas_dia > tope_diario + _MARGEN_TOPE
+    fechas_excede = dia[excede].astype("datetime64[D]")
+    partes.append(pd.DataFrame({
+        "CODIGO": codigo_dia[excede], "TOPE": "Diario",
+        "PERIODO": np.datetime_as_string(fechas_excede).astype(object),
+        "DESDE": fechas_excede, "HASTA": fechas_excede,
+        "HORAS EXTRA": horas_dia[excede], "LÍMITE": tope_diario,
+    }))
+
+    excede = horas_semana > tope_semanal + _MARGEN_TOPE
+    partes.append(pd.DataFrame({
+        "CODIGO": codigo_semana[excede], "TOPE": "Semanal", "PERIODO": etiqueta_semana[excede],
+        "DESDE": lunes_semana[excede].astype("datetime64[D]"),
+        "HASTA": (lunes_semana[excede] + 6).astype("datetime64[D]"),
+        "HORAS EXTRA": horas_semana[excede], "LÍMITE": tope_semanal,
+    }))
+
+    # Días seguidos de la misma cédula con la ventana excedida forman un solo
+    # episodio: desde el inicio de la primera ventana hasta el último día
+    excede = horas_ventana > tope_semanal + _MARGEN_TOPE
+    filas = np.flatnonzero(excede)
+    continua = np.zeros(len(filas), dtype=bool)
+    continua[1:] = (filas[1:] == filas[:-1] + 1) & (codigo_dia[filas[1:]] == codigo_dia[filas[:-1]])
+    inicios_episodio = np.flatnonzero(~continua)
+    finales_episodio = np.append(inicios_episodio[1:], len(filas))[:len(inicios_episodio)] - 1
+    desde = (dia[filas[inicios_episodio]] - (DIAS_VENTANA_MOVIL - 1)).astype("datetime64[D]")
+    hasta = dia[filas[finales_episodio]].astype("datetime64[D]")
+    partes.append(pd.DataFrame({
+        "CODIGO": codigo_dia[filas[inicios_episodio]], "TOPE": "7 días móviles",
+        "PERIODO": (np.datetime_as_string(desde).astype(object) + " a "
+                    + np.datetime_as_string(hasta).astype(object)),
+        "DESDE": desde, "HASTA": hasta,
+        "HORAS EXTRA": (np.maximum.reduceat(horas_ventana[filas], inicios_episodio)
+                        if len(filas) else np.empty(0)),
+        "LÍMITE": tope_semanal,
+    }))
+
+    incumplimientos = pd.concat(partes, ignore_index=True)
+    incumplimientos["HORAS EXTRA"] = incumplimientos["HORAS EXTRA"].astype(float).round(2)
+    incumplimientos["LÍMITE"] = incumplimientos["LÍMITE"].astype(float)
+    incumplimientos["EXCESO"] = (incumplimientos["HORAS EXTRA"] - incumplimientos["LÍMITE"]).round(2)
+    incumplimientos["DESDE"] = incumplimientos["DESDE"].astype("datetime64[ns]")
+    incumplimientos["HASTA"] = incumplimientos["HASTA"].astype("datetime64[ns]")
+    incumplimientos["TOPE"] = pd.Categorical(incumplimientos["TOPE"], categories=TIPOS_TOPE)
+    incumplimientos = (incumplimientos.sort_values(["CODIGO", "DESDE", "TOPE"], kind="stable")
+                                      .reset_index(drop=True))
+    codigo = incumplimientos.pop("CODIGO").to_numpy()
+    incumplimientos.insert(0, "CÉDULA", cedulas.take(codigo))
+    incumplimientos.insert(1, "NOMBRE", nombre_cedula[codigo])
+    incumplimientos.insert(2, "AREA", area_cedula[codigo])
+    return AnalisisTopes(diario=diario, semanal=semanal, incumplimientos=incumplimientos[COLUMNAS_INCUMPLIMIENTOS])
+
+# ============================================================================
+# COLUMNAS DERIVADAS (VIRTUALES)
+# ============================================================================
+# Columnas que solo son una máscara o un redondeo de otra: no se guardan en el
+# DataFrame calculado y se evalúan para las filas que se muestran o exportan.
+# nombre → (columna de origen, operación); el origen puede ser a su vez derivado.
+#   "normal":   valor en días normales (L-S no festivo), 0 en domingo/festivo
+#   "dom_fest": valor en domingo/festivo, 0 en días normales
+#   "redondeo": valor redondeado a 2 decimales para visualización
+COLUMNAS_DERIVADAS = {}
+for _base in ("HORAS EXTRA DIURNA", "HORAS EXTRA NOCTURNA", "RECARGO NOCTURNO",
+              "VALOR EXTRA DIURNA", "VALOR EXTRA NOCTURNA", "VALOR RECARGO NOCTURNO"):
+    COLUMNAS_DERIVADAS[f"{_base} NORMAL"] = (_base, "normal")
+    COLUMNAS_DERIVADAS[f"{_base} DOM/FEST"] = (_base, "dom_fest")
+for _base in ("HORAS TRABAJADAS", "HORAS EXTRA DIURNA", "HORAS EXTRA NOCTURNA", "RECARGO NOCTURNO",
+              "TOTAL HORAS EXTRA",
+              "HORAS EXTRA DIURNA NORMAL", "HORAS EXTRA NOCTURNA NORMAL", "RECARGO NOCTURNO NORMAL",
+              "HORAS EXTRA DIURNA DOM/FEST", "HORAS EXTRA NOCTURNA DOM/FEST", "RECARGO NOCTURNO DOM/FEST"):
+    COLUMNAS_DERIVADAS[f"{_base}_DISPLAY"] = (_base, "redondeo")
+del _base
+
+def dependencias_columna(nombre):
+    """Columnas guardadas que hacen falta para evaluar `nombre` (ella misma si no es derivada)."""
+    if nombre not in COLUMNAS_DERIVADAS:
+        return [nombre]
+    origen, operacion = COLUMNAS_DERIVADAS[nombre]
+    return dependencias_columna(origen) + (["ES_DOM_FEST"] if operacion != "redondeo" else [])
+
+def columna_derivada(df, nombre):
+    """Serie `nombre` de df: la columna guardada o, si es derivada, evaluada a partir de su origen."""
+    if nombre in df.columns or nombre not in COLUMNAS_DERIVADAS:
+        return df[nombre]
+    origen, operacion = COLUMNAS_DERIVADAS[nombre]
+    serie = columna_derivada(df, origen)
+    if operacion == "normal":
+        serie = serie.where(~df["ES_DOM_FEST"], 0)
+    elif operacion == "dom_fest":
+        serie = serie.where(df["ES_DOM_FEST"], 0)
+    else:
+        serie = serie.round(2)
+    return serie.rename(nombre)
+
+# ============================================================================
+# TIPOS COMPACTOS Y DE PRESENTACIÓN
+# ============================================================================
+# El DataFrame calculado se guarda con tipos compactos (varias sesiones pueden
+# tener un año de registros en memoria): texto repetitivo como categoría y la
+# hora del día solo como segundos int32. Horas y valores siguen en float64:
+# se exportan tal cual y float32 no guarda centavos de forma exacta.
+# tipos_presentacion() vuelve a los tipos de siempre y evalúa las columnas
+# derivadas, solo para lo que se muestra o exporta.
+COLUMNAS_CATEGORIA = [
+    "AREA", "NOMBRE", "CARGO", "TURNO", "DÍA", "FESTIVO", "TIPO TARIFA", "TIPO EXTRA",
+    "MES_NOMBRE", "TURNO ENTRADA", "TURNO SALIDA",
+]
+# Hora del día en presentación → columna de segundos desde medianoche
+COLUMNAS_HORA_DEL_DIA = {"HRA INGRESO": "SEG_INGRESO", "HORA SALIDA": "SEG_SALIDA"}
+
+def compactar_tipos(df):
+    """Retorna df con tipos compactos (categorías y segundos int32)."""
+    df = df.drop(columns=[*COLUMNAS_HORA_DEL_DIA, "DT_INGRESO", "DT_SALIDA"], errors="ignore")
+    compacto = {col: df[col].astype("category") for col in COLUMNAS_CATEGORIA if col in df.columns}
+    compacto.update({col: df[col].astype(np.int32) for col in COLUMNAS_HORA_DEL_DIA.values()})
+    return df.assign(**compacto)
+
+def _origenes_presentacion(df, col):
+    """Columnas guardadas de df de las que sale `col` en tipos de presentación."""
+    if col in COLUMNAS_HORA_DEL_DIA and col not in df.columns:
+        return [COLUMNAS_HORA_DEL_DIA[col]]
+    return dependencias_columna(col)
+
+def columnas_disponibles(df, columnas):
+    """
+    Las `columnas` (en su orden) que se pueden obtener de df: guardadas,
+    derivadas o de hora del día. Las demás, por ejemplo CÉDULA cuando el
+    archivo trae CEDULA, se omiten.
+    """
+    return [col for col in columnas if all(origen in df.columns for origen in _origenes_presentacion(df, col))]
+
+def tipos_presentacion(df, columnas=None, posiciones=None):
+    """
+    Copia de las `columnas` de df (todas por defecto) en las filas `posiciones`
+    (todas si es None) con tipos de presentación: categorías como texto,
+    HRA INGRESO / HORA SALIDA como time y las columnas derivadas (NORMAL,
+    DOM/FEST, _DISPLAY) evaluadas. Las columnas que no se pueden obtener se omiten.
+    """
+    if columnas is None:
+        columnas = [*COLUMNAS_HORA_DEL_DIA, *df.columns]
+
+    columnas = columnas_disponibles(df, columnas)
+    origen = list(dict.fromkeys(o for col in columnas for o in _origenes_presentacion(df, col)))
+    df = df[origen] if posiciones is None else df[origen].take(posiciones)
+
+    datos = {}
+    for col in columnas:
+        if col in COLUMNAS_HORA_DEL_DIA and col not in df.columns:
+            datos[col] = segundos_a_time(df[COLUMNAS_HORA_DEL_DIA[col]].to_numpy())
+        elif col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+            datos[col] = df[col].astype(df[col].cat.categories.dtype)
+        else:
+            datos[col] = columna_derivada(df, col)
+    return pd.DataFrame(datos, index=df.index)
+
+# ============================================================================
+# TABLA DE RESULTADOS: BÚSQUEDA, ORDEN Y PÁGINAS
+# ============================================================================
+# La tabla de la app no recibe el detalle completo: la búsqueda y el orden se
+# resuelven sobre los tipos compactos y solo las filas de la página visible
+# pasan por tipos_presentacion().
+COLUMNAS_BUSQUEDA = ["NOMBRE", "CÉDULA", "CARGO", "AREA", "TURNO", "ACTIVIDAD DESARROLLADA"]
+
+def coincidencias_texto(serie, texto):
+    """
+    Máscara de las filas de `serie` que contienen `texto` sin distinguir
+    mayúsculas. En columnas categóricas se busca una vez por categoría.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        por_categoria = serie.cat.categories.astype(str).str.contains(texto, case=False, regex=False)
+        # El código -1 (vacío) toma el False agregado al final
+        return np.append(np.asarray(por_categoria, dtype=bool), False)[serie.cat.codes.to_numpy()]
+    return serie.astype(str).str.contains(texto, case=False, regex=False).fillna(False).to_numpy(dtype=bool)
+
+def posiciones_tabla(df, posiciones=None, busqueda="", orden=None, descendente=False,
+                     columnas_busqueda=COLUMNAS_BUSQUEDA):
+    """
+    Posiciones de las filas de df para la tabla paginada: las de `posiciones`
+    (todas si es None) que contienen `busqueda` en alguna de
+    `columnas_busqueda`, ordenadas por la columna `orden` (guardada, derivada
+    o de hora del día; los vacíos van al final). El orden es estable, así que
+    las filas empatadas conservan el orden original. Un `orden` que no se
+    puede obtener de df se ignora.
+    """
+    posiciones = np.arange(len(df)) if posiciones is None else np.asarray(posiciones)
+
+    busqueda = busqueda.strip()
+    if busqueda:
+        mascara = np.zeros(len(posiciones), dtype=bool)
+        for col in columnas_busqueda:
+            if col in df.columns:
+                mascara |= coincidencias_texto(df[col].iloc[posiciones], busqueda)
+        posiciones = posiciones[mascara]
+
+    if orden is not None and columnas_disponibles(df, [orden]):
+        if orden in COLUMNAS_HORA_DEL_DIA and orden not in df.columns:
+            clave = df[COLUMNAS_HORA_DEL_DIA[orden]]
+        else:
+            clave = columna_derivada(df, orden)
+        valores = clave.iloc[posiciones].reset_index(drop=True)
+        ordenados = valores.sort_values(ascending=not descendente, kind="stable", na_position="last")
+        posiciones = posiciones[ordenados.index.to_numpy()]
+    return posiciones
+
+# ============================================================================
+# PIPELINE COMPLETO
+# ============================================================================
+def calcular_horas_extras(df_input, df_empleados, df_porcentaje, df_turnos, previo=None, perfilador=None,
+                          procesos=1):
+    """
+    Ejecuta el cálculo completo a partir de los cuatro archivos ya leídos.
+
+    No modifica los DataFrames recibidos. Retorna un ResultadoCalculo con el
+    DataFrame calculado y la lista de avisos. Lanza ErrorCalculo si algún
+    archivo no tiene la estructura o el formato esperado.
+
+    df_empleados puede ser el DataFrame de la base de empleados o un
+    IndiceEmpleados ya construido (construir_indice_empleados), que se reusa
+    entre cálculos mientras la base no cambie.
+
+    previo: ResultadoCalculo de una carga anterior (opcional). Las filas cuya
+    huella ya estaba en él no pasan de nuevo por las etapas de horas extra y
+    valoración; el resultado es idéntico al de un cálculo completo.
+
+    perfilador: Perfilador (opcional) donde se registra el tiempo y la memoria
+    de cada etapa del cálculo.
+
+    procesos: con más de uno, las horas extra y la valoración de archivos
+    grandes (MIN_FILAS_PARALELO filas o más) se calculan en varios procesos,
+    repartiendo las filas por cédula. El resultado es idéntico al serial.
+    """
+    perfilador = perfilador if perfilador is not None else Perfilador(activo=False)
+    perfilador.siguiente("cruce_empleados", filas=len(df_input))
+    avisos = []
+
+    # Normalizar columnas
+    df_input = _normalizar_columnas(df_input)
+    df_porcentaje = _normalizar_columnas(df_porcentaje)
+    df_turnos = _normalizar_columnas(df_turnos)
+
+    # Normalizar nombres de columnas de cédula
+    if "CÉDULA" in df_input.columns:
+        cedula_input = "CÉDULA"
+    elif "CEDULA" in df_input.columns:
+        cedula_input = "CEDULA"
+    else:
+        raise ErrorCalculo("Error: No se encontró columna de cédula en archivo de datos",
+                           "La columna debe llamarse 'CÉDULA' o 'CEDULA'")
+
+    indice = (df_empleados if isinstance(df_empleados, IndiceEmpleados)
+              else construir_indice_empleados(df_empleados))
+
+    # Cruce con empleados: posición de cada cédula en el índice (-1 = sin coincidencia)
+    df_input[cedula_input] = normalizar_cedulas(df_input[cedula_input])
+    posiciones = indice.buscar(df_input[cedula_input])
+    df = df_input.reset_index(drop=True).assign(**{
+        col: take(valores, posiciones, allow_fill=True)
+        for col, valores in indice.columnas.items() if col != cedula_input
+    })
+
+    if indice.cedulas_duplicadas:
+        avisos.append(Aviso(
+            "cedulas_duplicadas", "warning",
+            f"Advertencia: {len(indice.cedulas_duplicadas)} cédulas aparecen más de una vez en la base de "
+            f"empleados: {indice.cedulas_duplicadas[:5]}. Se usa la primera fila de cada una",
+            {"cedulas": indice.cedulas_duplicadas}
+        ))
+
+    # Verificar si existe CARGO (opcional pero recomendado)
+    if "CARGO" not in df.columns:
+        avisos.append(Aviso("cargo_faltante", "warning",
+                            "Advertencia: No se encontró columna 'CARGO' en el archivo de empleados. Se dejará vacía."))
+        df["CARGO"] = ""
+
+    # COMISIÓN O BONIFICACIÓN debe venir del archivo input_datos
+    if "COMISIÓN O BONIFICACIÓN" not in df.columns:
+        if "COMISION O BONIFICACION" not in df.columns:
+            avisos.append(Aviso("comision_faltante", "warning",
+                                "Advertencia: No se encontró columna 'COMISIÓN O BONIFICACIÓN' en el archivo de datos "
+                                "de entrada. Se asumirá valor $0 para todos."))
+            df["COMISIÓN O BONIFICACIÓN"] = 0
+        else:
+            df["COMISIÓN O BONIFICACIÓN"] = df["COMISION O BONIFICACION"]
+
+    # Agregar columna OBSERVACIONES si no existe en el input
+    if "OBSERVACIONES" not in df.columns and "OBSERVACION" not in df.columns:
+        df["OBSERVACIONES"] = ""
+    elif "OBSERVACION" in df.columns:
+        df["OBSERVACIONES"] = df["OBSERVACION"]
+
+    # Verificar que se hayan encontrado coincidencias
+    sin_coincidencia = posiciones < 0
+    if sin_coincidencia.any():
+        cedulas_sin_coincidencia = pd.unique(df[cedula_input].to_numpy()[sin_coincidencia]).tolist()
+        avisos.append(Aviso(
+            "cedulas_sin_coincidencia", "warning",
+            f"Advertencia: {int(sin_coincidencia.sum())} registros no tienen información de empleado. "
+            f"Cédulas sin coincidencia: {cedulas_sin_coincidencia[:5]}. "
+            "Verifica que las cédulas en ambos archivos coincidan exactamente",
+            {"registros": int(sin_coincidencia.sum()), "cedulas": cedulas_sin_coincidencia}
+        ))
+
+    # Procesamiento de fechas y horas
+    perfilador.siguiente("fechas_y_horas", filas=len(df))
+    try:
+        df["FECHA"] = pd.to_datetime(df["FECHA"], errors='coerce')
+    except Exception as e:
+        raise ErrorCalculo(f"Error al procesar fechas: {str(e)}",
+                           "Verifica que la columna FECHA tenga fechas válidas")
+
+    if df["FECHA"].isna().any():
+        fechas_problema = df[df["FECHA"].isna()].index.tolist()
+        raise ErrorCalculo(f"Error: Algunas fechas no tienen el formato correcto en las filas: {fechas_problema[:5]}",
+                           "Las fechas deben estar en formato: YYYY-MM-DD (ej: 2025-02-04) o DD/MM/YYYY")
+
+    # Día de la semana, festivos, semana ISO y mes desde el calendario precalculado
+    unir_calendario(df)
+
+    # Horas reales: segundos desde medianoche y fecha-hora = FECHA + segundos
+    filas_invalidas = {}
+    for columna_hora, columna_seg in (("HRA INGRESO", "SEG_INGRESO"), ("HORA SALIDA", "SEG_SALIDA")):
+        try:
+            segundos, invalidos = parsear_hora_del_dia(df[columna_hora])
+        except Exception as e:
+            raise ErrorCalculo(f"Error al procesar horas: {str(e)}",
+                               "Verifica el formato de las columnas HRA INGRESO y HORA SALIDA")
+        if invalidos.any():
+            filas_invalidas[columna_hora] = df.index[invalidos].tolist()
+        df[columna_seg] = segundos
+
+    if filas_invalidas:
+        detalle = "; ".join(f"{columna} en las filas {filas[:10]}" + (f" y {len(filas) - 10} más" if len(filas) > 10 else "")
+                            for columna, filas in filas_invalidas.items())
+        raise ErrorCalculo(f"Error: Algunas horas de entrada o salida no tienen el formato correcto: {detalle}",
+                           "Las horas pueden estar en formato Excel (tiempo) o texto HH:MM (ej: 08:00, 14:00, 18:30)",
+                           {"filas": filas_invalidas})
+
+    df["HRA INGRESO"] = segundos_a_time(df["SEG_INGRESO"].to_numpy())
+    df["HORA SALIDA"] = segundos_a_time(df["SEG_SALIDA"].to_numpy())
+
+    medianoche = df["FECHA"].dt.normalize()
+    df["DT_INGRESO"] = medianoche + pd.to_timedelta(df["SEG_INGRESO"], unit="s")
+    df["DT_SALIDA"] = medianoche + pd.to_timedelta(df["SEG_SALIDA"], unit="s")
+
+    # Crear diccionario de configuración de turnos
+    perfilador.siguiente("turnos", filas=len(df))
+    turnos_config = construir_turnos_config(df_turnos, avisos)
+    tabla_turnos = compilar_turnos(turnos_config)
+
+    # Cruce de las filas con la tabla de turnos: cada nombre distinto se
+    # normaliza una vez y las filas toman su posición por código
+    if "TURNO" in df.columns:
+        codigos_turno, turnos_unicos = factorizar_turnos(df["TURNO"])
+    else:
+        codigos_turno, turnos_unicos = np.zeros(len(df), dtype=np.intp), pd.Index(["TURNO 1"], dtype=object)
+    posicion_turno = tabla_turnos.posiciones(turnos_unicos)[codigos_turno]
+    turno_fila = pd.Series(turnos_unicos.to_numpy(dtype=object)[codigos_turno], index=df.index)
+    avisos_turnos(tabla_turnos, turnos_unicos,
+                  np.bincount(codigos_turno, minlength=len(turnos_unicos)), avisos)
+
+    df["TURNO ENTRADA"] = tabla_turnos.texto_para_mostrar(tabla_turnos.entrada_texto, posicion_turno)
+    df["TURNO SALIDA"] = tabla_turnos.texto_para_mostrar(tabla_turnos.salida_texto, posicion_turno)
+
+    total_horas = (df["SEG_SALIDA"] - df["SEG_INGRESO"]) / 3600
+
+    hora_ingreso = df["SEG_INGRESO"] // 3600
+    hora_salida_val = df["SEG_SALIDA"] // 3600
+    es_franja_madrugada = (hora_ingreso < 6) & (hora_salida_val <= 6)
+
+    df["HORAS TRABAJADAS"] = np.where(
+        (df["DIA_NUM"] < 5) & (~es_franja_madrugada),
+        total_horas - 1,
+        total_horas
+    )
+
+    # Horario del turno de cada fila en segundos desde medianoche
+    entrada_turno_seg = tabla_turnos.entrada_seg[posicion_turno]
+    salida_turno_seg = tabla_turnos.salida_seg[posicion_turno]
+
+    # ============================================================================
+    # MAPEO DE FACTORES - incluye dominicales
+    # ============================================================================
+    perfilador.siguiente("deteccion_cambios", filas=len(df))
+    factor_map = construir_factor_map(df_porcentaje, avisos)
+
+    # Filas ya calculadas en la carga anterior (misma huella): no se recalculan
+    huellas = huella_filas(df, cedula_input, turno_fila, entrada_turno_seg, salida_turno_seg)
+    huella_config = huella_configuracion(factor_map)
+    previas = posiciones_previas(previo, huellas, huella_config)
+    recalcular = previas < 0
+    memoria_previa = previo.df if previo is not None and not recalcular.all() else pd.DataFrame()
+
+    # ============================================================================
+    # CALCULAR TOTAL BASE LIQUIDACION E IMPORTE HORA
+    # ============================================================================
+    df["TOTAL BASE LIQUIDACION"] = df["SALARIO BASICO"] + df["COMISIÓN O BONIFICACIÓN"]
+    df["IMPORTE HORA"] = df["TOTAL BASE LIQUIDACION"] / 220
+
+    # ============================================================================
+    # HORAS EXTRA Y VALORES MONETARIOS CON FACTOR CORRECTO POR DÍA
+    # ============================================================================
+    # Solo las filas nuevas o modificadas; con procesos > 1 y suficientes filas
+    # se reparten por cédula entre varios procesos (mismo resultado).
+    perfilador.siguiente("horas_y_valoracion", filas=int(recalcular.sum()))
+    etapa = pd.DataFrame({
+        "SEG_INGRESO": df["SEG_INGRESO"].to_numpy()[recalcular],
+        "SEG_SALIDA": df["SEG_SALIDA"].to_numpy()[recalcular],
+        "SEG_ENTRADA_TURNO": entrada_turno_seg[recalcular],
+        "SEG_SALIDA_TURNO": salida_turno_seg[recalcular],
+        "IMPORTE HORA": df["IMPORTE HORA"].to_numpy()[recalcular],
+        "DIA_NUM": df["DIA_NUM"].to_numpy()[recalcular],
+        "ES_FESTIVO": df["ES_FESTIVO"].to_numpy()[recalcular],
+    })
+    if procesos > 1 and len(etapa) >= MIN_FILAS_PARALELO:
+        calculado = calcular_etapas_en_paralelo(etapa, df[cedula_input].to_numpy()[recalcular],
+                                                factor_map, procesos)
+    else:
+        calculado = calcular_etapas_filas(etapa, factor_map)
+    df = df.assign(**combinar_etapa(calculado, memoria_previa, previas,
+                                    COLUMNAS_ETAPA_HORAS + COLUMNAS_ETAPA_VALORACION))
+
+    df["TOTAL HORAS EXTRA"] = df["HORAS EXTRA DIURNA"] + df["HORAS EXTRA NOCTURNA"]
+
+    # Las columnas NORMAL, DOM/FEST y _DISPLAY no se guardan: se derivan al
+    # mostrar o exportar (COLUMNAS_DERIVADAS). Los valores por tipo de hora
+    # quedan con precisión completa; el total sí se redondea.
+    df["IMPORTE HORA"] = df["IMPORTE HORA"].round(2)
+    df["VALOR TOTAL EXTRAS"] = df["VALOR TOTAL EXTRAS"].round(2)
+    df["TOTAL BASE LIQUIDACION"] = df["TOTAL BASE LIQUIDACION"].round(2)
+
+    perfilador.siguiente("agregacion", filas=len(df))
+    cubo, filas_area_mes = construir_cubo(df, cedula_input)
+    perfilador.siguiente("topes_legales", filas=len(df))
+    topes = analizar_topes(df, cedula_input)
+    perfilador.siguiente("tipos_y_huella", filas=len(df))
+    df = compactar_tipos(df)
+
+    resultado = ResultadoCalculo(
+        df=df,
+        avisos=avisos,
+        turnos_config=turnos_config,
+        tabla_turnos=tabla_turnos,
+        factor_map=factor_map,
+        columna_cedula=cedula_input,
+        huella=huella_resultados(df, factor_map),
+        cubo=cubo,
+        filas_area_mes=filas_area_mes,
+        topes=topes,
+        huellas_filas=huellas,
+        huella_config=huella_config,
+        filas_recalculadas=int(recalcular.sum()),
+    )
+    perfilador.terminar()
+    return resultado
@@ -0,0 +1,482 @@
+"""
+Notificaciones por correo de la calculadora, sin dependencia de Streamlit.
+
+Los correos no se envían desde la página: se encolan en una bandeja de salida
+persistente (SQLite) y un hilo de fondo los entrega con reintentos. La cola
+deduplica por `clave`, así el mismo cálculo abierto en otra sesión no genera
+un segundo aviso:
+
+    from notificaciones import ConfigSMTP, encolar_notificacion, iniciar_worker
+    worker = iniciar_worker(ConfigSMTP(servidor="localhost", puerto=1025,
+                                       usuario="app@fertrac.com", starttls=False))
+    encolar_notificacion(huella, "data_science@fertrac.com", asunto, cuerpo_html)
+    worker.despertar()
+
+Con `ventana_digest` > 0 el worker agrupa las notificaciones de un mismo
+destinatario durante esa ventana y las envía como un solo resumen; todos los
+envíos de una vuelta usan una misma conexión SMTP, que se reutiliza entre
+vueltas mientras haya actividad.
+"""
+import gzip
+import json
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from email import encoders
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+# Archivo de la bandeja de salida (configurable con la variable de entorno FERTRAC_OUTBOX)
+RUTA_BANDEJA = os.environ.get(
+    "FERTRAC_OUTBOX", os.path.join(os.path.dirname(os.path.abspath(__file__)), "bandeja_notificaciones.sqlite3")
+)
+
+# Reintentos: espera de 30 s que se duplica en cada fallo (máx. 1 hora), hasta 8 intentos
+MAX_INTENTOS = 8
+ESPERA_BASE_SEG = 30
+ESPERA_MAX_SEG = 3600
+# Tiempo durante el cual un envío en curso queda reservado para un solo worker
+RESERVA_SEG = 300
+# Cada cuánto revisa el worker la bandeja cuando nadie lo despierta
+INTERVALO_WORKER_SEG = 15
+# Segundos sin envíos tras los cuales se cierra la conexión SMTP reutilizada
+INACTIVIDAD_SMTP_SEG = 60
+# Tamaño máximo (bytes) de los adjuntos de un correo, ya comprimidos
+TAMANO_MAX_ADJUNTOS = 1_000_000
+
+# Servidores que se consideran locales (se aceptan sin contraseña)
+SERVIDORES_LOCALES = ("localhost", "127.0.0.1", "::1")
+
+@dataclass(frozen=True)
+class ConfigSMTP:
+    """
+    Servidor de salida. Sin `password` no se hace login y con starttls=False
+    la conexión es en claro (útil contra un servidor SMTP local de pruebas).
+    sin_login=True declara un servidor que acepta correo sin autenticación.
+    """
+    servidor: str = "smtp.gmail.com"
+    puerto: int = 587
+    usuario: str = ""
+    password: str = ""
+    starttls: bool = True
+    timeout: float = 10
+    sin_login: bool = False
+
+    @property
+    def configurado(self):
+        """
+        Hay servidor, remitente y contraseña. Sin contraseña solo cuenta como
+        configurado un servidor local o uno declarado sin_login: de lo
+        contrario cada envío fallaría y el aviso terminaría como 'fallido'.
+        """
+        if not (self.servidor and self.usuario):
+            return False
+        return bool(self.password) or self.sin_login or self.servidor.lower() in SERVIDORES_LOCALES
+
+# ============================================================================
+# CONTENIDO Y ENVÍO DEL CORREO
+# ============================================================================
+def construir_cuerpo_email(num_registros, num_empleados, areas, fecha_ejecucion, total_valor_extras):
+    """Construye el cuerpo HTML del correo de notificación con el resumen del cálculo."""
+    return f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; color: #333;">
+        <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+            <div style="background-color: #f37021; padding: 15px; border-radius: 8px 8px 0 0;">
+                <h2 style="color: white; margin: 0;">🕒 Notificación - Calculadora Horas Extras Fertrac</h2>
+            </div>
+            <div style="border: 1px solid #ddd; border-top: none; padding: 20px; border-radius: 0 0 8px 8px;">
+                <p>Se ha realizado un nuevo cálculo de horas extras con los siguientes detalles:</p>
+
+                <table style="width: 100%; border-collapse: collapse; margin: 15px 0;">
+                    <tr style="background-color: #f8f8f8;">
+                        <td style="padding: 10px; border: 1px solid #ddd; font-weight: bold;">Fecha y hora de ejecución</td>
+                        <td style="padding: 10px; border: 1px solid #ddd;">{fecha_ejecucion}</td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 10px; border: 1px solid #ddd; font-weight: bold;">Registros procesados</td>
+                        <td style="padding: 10px; border: 1px solid #ddd;">{num_registros}</td>
+                    </tr>
+                    <tr style="background-color: #f8f8f8;">
+                        <td style="padding: 10px; border: 1px solid #ddd; font-weight: bold;">Empleados únicos</td>
+                        <td style="padding: 10px; border: 1px solid #ddd;">{num_empleados}</td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 10px; border: 1px solid #ddd; font-weight: bold;">Áreas involucradas</td>
+                        <td style="padding: 10px; border: 1px solid #ddd;">{areas}</td>
+                    </tr>
+                    <tr style="background-color: #f8f8f8;">
+                        <td style="padding: 10px; border: 1px solid #ddd; font-weight: bold;">Valor total extras</td>
+                        <td style="padding: 10px; border: 1px solid #ddd; color: #f37021; font-weight: bold;">${total_valor_extras:,.2f}</td>
+                    </tr>
+                </table>
+
+                <p style="color: #888; font-size: 12px; margin-top: 20px;">
+                    Este es un correo automático generado por la Calculadora de Horas Extras de Fertrac.
+                </p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+
+def construir_cuerpo_digest(notificaciones):
+    """
+    Cuerpo HTML de un correo que agrupa varias notificaciones: una fila por
+    cálculo a partir de su `resumen` (o solo el asunto si no lo tiene).
+    """
+    filas = []
+    for i, notificacion in enumerate(notificaciones):
+        fondo = ' style="background-color: #f8f8f8;"' if i % 2 == 0 else ""
+        resumen = notificacion["resumen"]
+        if resumen:
+            celdas = [resumen["fecha_ejecucion"], resumen["num_registros"], resumen["num_empleados"],
+                      resumen["areas"], f"${resumen['total_valor_extras']:,.2f}"]
+        else:
+            celdas = [notificacion["asunto"], "", "", "", ""]
+        filas.append(f"<tr{fondo}>" + "".join(
+            f'<td style="padding: 8px; border: 1px solid #ddd;">{celda}</td>' for celda in celdas
+        ) + "</tr>")
+    encabezados = ["Fecha y hora de ejecución", "Registros", "Empleados", "Áreas", "Valor total extras"]
+    return f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; color: #333;">
+        <div style="max-width: 800px; margin: 0 auto; padding: 20px;">
+            <div style="background-color: #f37021; padding: 15px; border-radius: 8px 8px 0 0;">
+                <h2 style="color: white; margin: 0;">🕒 Resumen de cálculos - Calculadora Horas Extras Fertrac</h2>
+            </div>
+            <div style="border: 1px solid #ddd; border-top: none; padding: 20px; border-radius: 0 0 8px 8px;">
+                <p>Se realizaron {len(notificaciones)} cálculos de horas extras:</p>
+
+                <table style="width: 100%; border-collapse: collapse; margin: 15px 0;">
+                    <tr>{"".join(f'<th style="padding: 8px; border: 1px solid #ddd;">{e}</th>' for e in encabezados)}</tr>
+                    {"".join(filas)}
+                </table>
+
+                <p style="color: #888; font-size: 12px; margin-top: 20px;">
+                    Este es un correo automático generado por la Calculadora de Horas Extras de Fertrac.
+                </p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+
+def construir_adjunto_resumen(cubo, nombre_base, tamano_max=TAMANO_MAX_ADJUNTOS):
+    """
+    Comprime (CSV + gzip) los agregados de un cálculo para adjuntarlos al correo.
+    Retorna (contenido, nombre_archivo), o None si comprimido supera tamano_max.
+    """
+    contenido = gzip.compress(cubo.to_csv(index=False).encode("utf-8"))
+    if len(contenido) > tamano_max:
+        return None
+    return contenido, f"{nombre_base}.csv.gz"
+
+def construir_mensaje(remitente, destinatario, asunto, cuerpo_html, archivo_adjunto=None, nombre_archivo=None,
+                      adjuntos=()):
+    """Arma el mensaje MIME: HTML y adjuntos opcionales (archivo_adjunto o lista de (contenido, nombre))."""
+    msg = MIMEMultipart("alternative")
+    msg["From"] = remitente
+    msg["To"] = destinatario
+    msg["Subject"] = asunto
+    msg.attach(MIMEText(cuerpo_html, "html"))
+
+    if archivo_adjunto and nombre_archivo:
+        adjuntos = [(archivo_adjunto, nombre_archivo), *adjuntos]
+    for contenido, nombre in adjuntos:
+        part = MIMEBase("application", "octet-stream")
+        part.set_payload(contenido)
+        encoders.encode_base64(part)
+        part.add_header("Content-Disposition", f"attachment; filename={nombre}")
+        msg.attach(part)
+    return msg
+
+class ConexionSMTP:
+    """
+    Conexión SMTP reutilizable entre envíos: se abre en el primer envío (connect,
+    STARTTLS y login una sola vez) y se reabre si el servidor la cerró.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self._smtp = None
+        self.ultimo_uso = 0.0
+        self.aperturas = 0
+
+    def _abrir(self):
+        smtp = smtplib.SMTP(self.config.servidor, self.config.puerto, timeout=self.config.timeout)
+        try:
+            if self.config.starttls:
+                smtp.starttls()
+            if self.config.password:
+                smtp.login(self.config.usuario, self.config.password)
+        except Exception:
+            smtp.close()
+            raise
+        self._smtp = smtp
+        self.aperturas += 1
+
+    def enviar(self, msg):
+        """Envía un mensaje MIME (From/To ya definidos). Las fallas se propagan como excepción."""
+        if self._smtp is None:
+            self._abrir()
+        try:
+            self._smtp.sendmail(self.config.usuario, msg["To"], msg.as_string())
+        except smtplib.SMTPServerDisconnected:
+            self._smtp = None
+            self._abrir()
+            self._smtp.sendmail(self.config.usuario, msg["To"], msg.as_string())
+        self.ultimo_uso = time.monotonic()
+
+    def cerrar(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                self._smtp.close()
+            self._smtp = None
+
+    def cerrar_si_inactiva(self, segundos=INACTIVIDAD_SMTP_SEG):
+        if self._smtp is not None and time.monotonic() - self.ultimo_uso >= segundos:
+            self.cerrar()
+
+def enviar_correo(config, destinatario, asunto, cuerpo_html, archivo_adjunto=None, nombre_archivo=None):
+    """Envía un correo con una conexión SMTP propia. Las fallas se propagan como excepción."""
+    msg = construir_mensaje(config.usuario, destinatario, asunto, cuerpo_html, archivo_adjunto, nombre_archivo)
+    conexion = ConexionSMTP(config)
+    try:
+        conexion.enviar(msg)
+    finally:
+        conexion.cerrar()
+
+def describir_error(error):
+    """Texto corto para registrar el motivo de un envío fallido."""
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return "Error de autenticación SMTP. Verifica usuario y contraseña."
+    if isinstance(error, TimeoutError):
+        return "Tiempo de espera agotado al conectar con el servidor SMTP."
+    return f"Error al enviar correo: {error}"
+
+# ============================================================================
+# BANDEJA DE SALIDA (SQLite)
+# ============================================================================
+# Columnas agregadas después de la primera versión de la bandeja
+_COLUMNAS_OPCIONALES = {"resumen": "TEXT", "adjunto": "BLOB", "nombre_adjunto": "TEXT"}
+
+def _conectar(ruta):
+    conexion = sqlite3.connect(ruta, timeout=30, isolation_level=None)
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.execute("""
+        CREATE TABLE IF NOT EXISTS notificaciones (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            clave TEXT NOT NULL UNIQUE,
+            destinatario TEXT NOT NULL,
+            asunto TEXT NOT NULL,
+            cuerpo_html TEXT NOT NULL,
+            estado TEXT NOT NULL DEFAULT 'pendiente',
+            intentos INTEGER NOT NULL DEFAULT 0,
+            proximo_intento REAL NOT NULL,
+            ultimo_error TEXT,
+            creado REAL NOT NULL,
+            enviado REAL,
+            resumen TEXT,
+            adjunto BLOB,
+            nombre_adjunto TEXT
+        )
+    """)
+    existentes = {fila[1] for fila in conexion.execute("PRAGMA table_info(notificaciones)")}
+    for columna, tipo in _COLUMNAS_OPCIONALES.items():
+        if columna not in existentes:
+            conexion.execute(f"ALTER TABLE notificaciones ADD COLUMN {columna} {tipo}")
+    return conexion
+
+def encolar_notificacion(clave, destinatario, asunto, cuerpo_html, resumen=None, adjunto=None,
+                         ruta=RUTA_BANDEJA):
+    """
+    Agrega una notificación a la bandeja. Retorna False si ya existía una con
+    la misma clave (enviada o pendiente), en cuyo caso no se encola de nuevo.
+    resumen: dict con fecha_ejecucion, num_registros, num_empleados, areas y
+    total_valor_extras (se usa en los correos de resumen agrupado).
+    adjunto: (contenido, nombre_archivo) opcional, p. ej. de construir_adjunto_resumen.
+    """
+    ahora = time.time()
+    contenido_adjunto, nombre_adjunto = adjunto if adjunto else (None, None)
+    conexion = _conectar(ruta)
+    try:
+        cursor = conexion.execute(
+            "INSERT OR IGNORE INTO notificaciones "
+            "(clave, destinatario, asunto, cuerpo_html, proximo_intento, creado, resumen, adjunto, nombre_adjunto) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (clave, destinatario, asunto, cuerpo_html, ahora, ahora,
+             json.dumps(resumen) if resumen else None, contenido_adjunto, nombre_adjunto),
+        )
+        return cursor.rowcount == 1
+    finally:
+        conexion.close()
+
+def estado_notificacion(clave, ruta=RUTA_BANDEJA):
+    """Retorna (estado, intentos, ultimo_error) de una notificación, o None si no existe."""
+    conexion = _conectar(ruta)
+    try:
+        return conexion.execute(
+            "SELECT estado, intentos, ultimo_error FROM notificaciones WHERE clave = ?", (clave,)
+        ).fetchone()
+    finally:
+        conexion.close()
+
+def _espera_reintento(intentos):
+    return min(ESPERA_BASE_SEG * 2 ** (intentos - 1), ESPERA_MAX_SEG)
+
+def _reservar_pendientes(conexion, ahora, ventana_digest=0):
+    """
+    Toma las notificaciones vencidas y las reserva por RESERVA_SEG, para que
+    otro proceso con su propio worker no las envíe al mismo tiempo. Si el
+    proceso muere a mitad del envío, vuelven a quedar disponibles al vencer la reserva.
+    Con ventana_digest > 0 solo se toman los destinatarios cuya notificación
+    pendiente más antigua ya cumplió la ventana.
+    Retorna {destinatario: [notificación (dict), ...]} en orden de llegada.
+    """
+    conexion.row_factory = sqlite3.Row
+    pendientes = conexion.execute(
+        "SELECT id, destinatario, asunto, cuerpo_html, intentos, creado, resumen, adjunto, nombre_adjunto "
+        "FROM notificaciones WHERE estado = 'pendiente' AND proximo_intento <= ? ORDER BY id",
+        (ahora,),
+    ).fetchall()
+    grupos = {}
+    for fila in pendientes:
+        grupos.setdefault(fila["destinatario"], []).append(fila)
+
+    reservadas = {}
+    for destinatario, filas in grupos.items():
+        if ventana_digest > 0 and min(fila["creado"] for fila in filas) > ahora - ventana_digest:
+            continue
+        for fila in filas:
+            cursor = conexion.execute(
+                "UPDATE notificaciones SET proximo_intento = ? "
+                "WHERE id = ? AND estado = 'pendiente' AND proximo_intento <= ?",
+                (ahora + RESERVA_SEG, fila["id"], ahora),
+            )
+            if cursor.rowcount == 1:
+                notificacion = dict(fila)
+                notificacion["resumen"] = json.loads(fila["resumen"]) if fila["resumen"] else None
+                reservadas.setdefault(destinatario, []).append(notificacion)
+    return reservadas
+
+def construir_mensaje_grupo(remitente, destinatario, notificaciones, tamano_max_adjuntos=TAMANO_MAX_ADJUNTOS):
+    """
+    Mensaje para un grupo de notificaciones del mismo destinatario: la
+    notificación tal cual si es una sola, o un resumen agrupado si son varias.
+    Los adjuntos se incluyen en orden mientras no superen tamano_max_adjuntos.
+    """
+    adjuntos = []
+    tamano = 0
+    for i, notificacion in enumerate(notificaciones, start=1):
+        if notificacion["adjunto"] and tamano + len(notificacion["adjunto"]) <= tamano_max_adjuntos:
+            # En un resumen agrupado se numeran los adjuntos para que no choquen los nombres
+            nombre = notificacion["nombre_adjunto"] if len(notificaciones) == 1 else f"{i}_{notificacion['nombre_adjunto']}"
+            adjuntos.append((notificacion["adjunto"], nombre))
+            tamano += len(notificacion["adjunto"])
+
+    if len(notificaciones) == 1:
+        asunto = notificaciones[0]["asunto"]
+        cuerpo_html = notificaciones[0]["cuerpo_html"]
+    else:
+        asunto = f"📊 Resumen de {len(notificaciones)} cálculos de horas extras"
+        cuerpo_html = construir_cuerpo_digest(notificaciones)
+    return construir_mensaje(remitente, destinatario, asunto, cuerpo_html, adjuntos=adjuntos)
+
+def procesar_pendientes(config, ruta=RUTA_BANDEJA, conexion_smtp=None, ventana_digest=0):
+    """
+    Envía las notificaciones vencidas de la bandeja, un correo por destinatario
+    (resumen agrupado si hay varias) y todos por la misma conexión SMTP.
+    Cada fallo programa un reintento con espera exponencial; tras MAX_INTENTOS
+    queda como 'fallido'. Retorna (enviadas, fallidas) en número de notificaciones.
+    """
+    propia = conexion_smtp is None
+    if propia:
+        conexion_smtp = ConexionSMTP(config)
+    conexion = _conectar(ruta)
+    enviadas = fallidas = 0
+    try:
+        for destinatario, notificaciones in _reservar_pendientes(conexion, time.time(), ventana_digest).items():
+            try:
+                conexion_smtp.enviar(construir_mensaje_grupo(config.usuario, destinatario, notificaciones))
+            except Exception as e:
+                conexion_smtp.cerrar()
+                for notificacion in notificaciones:
+                    intentos = notificacion["intentos"] + 1
+                    estado = "fallido" if intentos >= MAX_INTENTOS else "pendiente"
+                    conexion.execute(
+                        "UPDATE notificaciones SET estado = ?, intentos = ?, proximo_intento = ?, ultimo_error = ? "
+                        "WHERE id = ?",
+                        (estado, intentos, time.time() + _espera_reintento(intentos), describir_error(e),
+                         notificacion["id"]),
+                    )
+                fallidas += len(notificaciones)
+            else:
+                for notificacion in notificaciones:
+                    conexion.execute(
+                        "UPDATE notificaciones SET estado = 'enviado', intentos = ?, enviado = ?, "
+                        "ultimo_error = NULL WHERE id = ?",
+                        (notificacion["intentos"] + 1, time.time(), notificacion["id"]),
+                    )
+                enviadas += len(notificaciones)
+    finally:
+        conexion.close()
+        if propia:
+            conexion_smtp.cerrar()
+    return enviadas, fallidas
+
+# ============================================================================
+# WORKER DE FONDO
+# ============================================================================
+class WorkerNotificaciones(threading.Thread):
+    """
+    Hilo daemon que vacía la bandeja cada `intervalo` segundos o cuando se le
+    despierta. Mantiene una conexión SMTP abierta mientras haya envíos y la
+    cierra tras INACTIVIDAD_SMTP_SEG sin actividad.
+    """
+
+    def __init__(self, config, ruta=RUTA_BANDEJA, intervalo=INTERVALO_WORKER_SEG, ventana_digest=0):
+        super().__init__(name="worker-notificaciones", daemon=True)
+        self.config = config
+        self.ruta = ruta
+        self.intervalo = intervalo
+        self.ventana_digest = ventana_digest
+        self.conexion_smtp = ConexionSMTP(config)
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+
+    def despertar(self):
+        """Pide revisar la bandeja ya, sin esperar el intervalo."""
+        self._despertar.set()
+
+    def detener(self):
+        self._detener.set()
+        self._despertar.set()
+
+    def run(self):
+        while not self._detener.is_set():
+            try:
+                procesar_pendientes(self.config, self.ruta, self.conexion_smtp, self.ventana_digest)
+            except sqlite3.Error:
+                pass  # bandeja bloqueada o ilegible: se reintenta en la próxima vuelta
+            self.conexion_smtp.cerrar_si_inactiva()
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+        self.conexion_smtp.cerrar()
+
+def iniciar_worker(config, ruta=RUTA_BANDEJA, intervalo=INTERVALO_WORKER_SEG, ventana_digest=0):
+    """
+    Crea la bandeja si no existe y arranca el worker de envío.
+    ventana_digest: segundos durante los que se agrupan las notificaciones de un
+    mismo destinatario en un solo correo (0 = enviar cada una apenas llega).
+    """
+    _conectar(ruta).close()
+    worker = WorkerNotificaciones(config, ruta, intervalo, ventana_digest)
+    worker.start()
+    return worker
@@ -0,0 +1,242 @@
+"""
+Perfil de rendimiento por etapas (tiempo, filas y memoria), sin dependencia
+de Streamlit.
+
+Un Perfilador registra, para cada etapa con nombre, el tiempo de reloj, las
+filas procesadas y la memoria del proceso. Medir una etapa cuesta unos
+microsegundos (un reloj y una lectura de /proc), así que puede quedar activo
+en producción. Con detalle_memoria=True se usa además tracemalloc para el pico
+de memoria asignada dentro de cada etapa, que sí tiene un costo apreciable:
+
+    from perfilador import Perfilador
+    perfilador = Perfilador()
+    with perfilador.etapa("lectura", filas=len(df)):
+        ...
+    resultado = calcular_horas_extras(..., perfilador=perfilador)   # etapas del motor
+    perfilador.a_json()
+
+Las etapas se anidan: las que se abren dentro de otra quedan un nivel más
+abajo. Sin interfaz, `python perfilador.py input empleados porcentaje turnos`
+perfila lectura, cálculo, exportación y gráficos de unos archivos reales.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Etapas que guarda un perfil como máximo (se descartan las más antiguas)
+MAX_ETAPAS = 500
+MB = 1024 * 1024
+
+# ============================================================================
+# MEMORIA DEL PROCESO
+# ============================================================================
+def memoria_proceso():
+    """
+    (rss_mb, rss_pico_mb): memoria residente actual y máxima del proceso.
+    None donde el sistema no la informa (la actual solo se lee en Linux).
+    """
+    try:
+        with open("/proc/self/status", encoding="ascii") as estado:
+            valores = dict(linea.split(":", 1) for linea in estado if linea.startswith(("VmRSS", "VmHWM")))
+        return (round(int(valores["VmRSS"].split()[0]) / 1024, 1),
+                round(int(valores["VmHWM"].split()[0]) / 1024, 1))
+    except (OSError, KeyError, ValueError):
+        pass
+    if resource is None:
+        return None, None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss viene en bytes en macOS y en KB en Linux/BSD
+    return None, round(pico / (MB if sys.platform == "darwin" else 1024), 1)
+
+# ============================================================================
+# PERFILADOR
+# ============================================================================
+@dataclass
+class EtapaPerfil:
+    """
+    Una etapa medida. inicio: segundos desde que se creó el perfil; nivel:
+    profundidad de anidamiento (0 = etapa de primer nivel). rss_mb y
+    rss_pico_mb son la memoria residente del proceso al terminar la etapa;
+    pico_mb es lo asignado por encima del inicio de la etapa (solo con
+    detalle_memoria).
+    """
+    nombre: str
+    nivel: int
+    inicio: float
+    segundos: float = None
+    filas: int = None
+    rss_mb: float = None
+    rss_pico_mb: float = None
+    pico_mb: float = None
+
+class Perfilador:
+    """
+    Registro de etapas de una ejecución. Es seguro usarlo desde varios hilos
+    (cada hilo lleva su propia pila de etapas abiertas). Con activo=False no
+    registra nada y cada etapa cuesta una llamada vacía.
+    """
+    def __init__(self, activo=True, detalle_memoria=False, max_etapas=MAX_ETAPAS):
+        self.activo = activo
+        self.detalle_memoria = detalle_memoria and activo
+        self.max_etapas = max_etapas
+        self.creado = datetime.now().isoformat(timespec="seconds")
+        self.etapas = []
+        self._origen = time.perf_counter()
+        self._lock = threading.Lock()
+        self._hilo = threading.local()
+        if self.detalle_memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _pila(self):
+        if not hasattr(self._hilo, "pila"):
+            self._hilo.pila = []
+        return self._hilo.pila
+
+    def _actualizar_picos(self, pila):
+        """Lleva el pico de tracemalloc desde el último evento a todas las etapas abiertas."""
+        _, pico = tracemalloc.get_traced_memory()
+        for _, registro, base in pila:
+            registro.pico_mb = max(registro.pico_mb or 0.0, round((pico - base) / MB, 1))
+        tracemalloc.reset_peak()
+
+    def _abrir(self, nombre, filas, secuencial):
+        pila = self._pila()
+        registro = EtapaPerfil(nombre=nombre, nivel=len(pila),
+                               inicio=round(time.perf_counter() - self._origen, 4), filas=filas)
+        base = 0
+        if self.detalle_memoria:
+            self._actualizar_picos(pila)
+            base = tracemalloc.get_traced_memory()[0]
+        pila.append((secuencial, registro, base))
+        with self._lock:
+            self.etapas.append(registro)
+            if len(self.etapas) > self.max_etapas:
+                del self.etapas[:len(self.etapas) - self.max_etapas]
+        return registro
+
+    def _cerrar(self, registro):
+        pila = self._pila()
+        if not any(abierta is registro for _, abierta, _ in pila):
+            return
+        if self.detalle_memoria:
+            self._actualizar_picos(pila)
+        # Las etapas secuenciales abiertas dentro de esta terminan con ella
+        while pila:
+            _, abierta, _ = pila.pop()
+            abierta.segundos = round(time.perf_counter() - self._origen - abierta.inicio, 4)
+            abierta.rss_mb, abierta.rss_pico_mb = memoria_proceso()
+            if abierta is registro:
+                break
+
+    @contextmanager
+    def etapa(self, nombre, filas=None):
+        """
+        Mide el bloque `with` como la etapa `nombre`. Retorna el registro, para
+        anotar las filas cuando se conocen al final (registro.filas = n).
+        """
+        if not self.activo:
+            yield EtapaPerfil(nombre=nombre, nivel=0, inicio=0.0, filas=filas)
+            return
+        registro = self._abrir(nombre, filas, secuencial=False)
+        try:
+            yield registro
+        finally:
+            self._cerrar(registro)
+
+    def siguiente(self, nombre, filas=None):
+        """
+        Cierra la etapa secuencial en curso (si la hay) y abre `nombre`. Sirve
+        para marcar las secciones de una función larga sin anidar bloques;
+        la última se cierra con terminar() o al cerrar la etapa que la contiene.
+        """
+        if not self.activo:
+            return
+        self.terminar()
+        self._abrir(nombre, filas, secuencial=True)
+
+    def terminar(self):
+        """Cierra la etapa secuencial en curso, si la hay."""
+        if not self.activo:
+            return
+        pila = self._pila()
+        if pila and pila[-1][0]:
+            self._cerrar(pila[-1][1])
+
+    def a_dict(self):
+        with self._lock:
+            etapas = [asdict(registro) for registro in self.etapas]
+        return {"creado": self.creado, "detalle_memoria": self.detalle_memoria, "etapas": etapas}
+
+    def a_json(self):
+        return json.dumps(self.a_dict(), indent=2, ensure_ascii=False)
+
+# ============================================================================
+# PERFIL SIN INTERFAZ
+# ============================================================================
+def perfilar_archivos(rutas, exportar=True, graficos=True, detalle_memoria=False):
+    """
+    Perfila el mismo recorrido de la app con archivos en disco: lectura de los
+    cuatro archivos (rutas en el orden de TIPOS_ARCHIVO), cálculo,
+    exportación a Excel y los cuatro gráficos a la resolución de descarga.
+    Retorna el Perfilador.
+    """
+    from carga_archivos import TIPOS_ARCHIVO, leer_archivo
+    from exportacion import generar_excel_resultados
+    from graficos import DPI_DESCARGA, GRAFICOS, grafico_png
+    from motor_calculo import calcular_horas_extras
+
+    perfilador = Perfilador(detalle_memoria=detalle_memoria)
+    leidos = []
+    for tipo, ruta in zip(TIPOS_ARCHIVO, rutas):
+        with perfilador.etapa(f"lectura_{tipo}") as registro:
+            with open(ruta, "rb") as archivo:
+                leidos.append(leer_archivo(archivo.read(), os.path.basename(ruta), tipo, directorio_cache=None))
+            registro.filas = len(leidos[-1])
+    with perfilador.etapa("calculo", filas=len(leidos[0])):
+        resultado = calcular_horas_extras(*leidos, perfilador=perfilador)
+    if exportar:
+        with perfilador.etapa("exportacion_excel", filas=len(resultado.df)):
+            generar_excel_resultados(resultado.df, resultado.topes.incumplimientos)
+    if graficos:
+        for tipo in GRAFICOS:
+            with perfilador.etapa(f"grafico_{tipo}_{DPI_DESCARGA}dpi", filas=len(resultado.cubo)):
+                grafico_png(tipo, resultado.cubo, dpi=DPI_DESCARGA)
+    return perfilador
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfila el cálculo completo con archivos de entrada reales.")
+    parser.add_argument("input")
+    parser.add_argument("empleados")
+    parser.add_argument("porcentaje")
+    parser.add_argument("turnos")
+    parser.add_argument("--salida", help="archivo JSON del perfil (por defecto se imprime)")
+    parser.add_argument("--memoria", action="store_true", help="pico de memoria por etapa con tracemalloc")
+    parser.add_argument("--sin-exportar", action="store_true")
+    parser.add_argument("--sin-graficos", action="store_true")
+    args = parser.parse_args()
+
+    perfilador = perfilar_archivos([args.input, args.empleados, args.porcentaje, args.turnos],
+                                   exportar=not args.sin_exportar, graficos=not args.sin_graficos,
+                                   detalle_memoria=args.memoria)
+    for registro in perfilador.etapas:
+        print(f"{'  ' * registro.nivel + registro.nombre:<34} {registro.segundos:>9.3f} s "
+              f"{registro.filas if registro.filas is not None else '':>10} filas  "
+              f"{registro.rss_mb if registro.rss_mb is not None else '':>8} MB")
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(perfilador.a_json())
+
+if __name__ == "__main__":
+    main()
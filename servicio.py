@@ -0,0 +1,487 @@
+"""
+Servicio HTTP local del cálculo, sin interfaz y sin dependencia de Streamlit.
+
+Recibe los cuatro archivos de entrada en un POST multipart/form-data (campos
+input, empleados, porcentaje y turnos, los mismos de la app) y ejecuta el mismo
+cálculo que app.py: lectura con leer_archivo, índice de empleados compartido y
+calcular_horas_extras. Responde un resumen en JSON y deja el libro de
+resultados en /resultados/<huella>.xlsx; con ?formato=xlsx responde el libro
+directamente:
+
+    python servicio.py --puerto 8502 --trabajadores 2 --cola 8
+    curl -F input=@input_datos.xlsx -F empleados=@base_empleados.xlsx \\
+         -F porcentaje=@factores_horas_extras.xlsx -F turnos=@configuracion_turnos.xlsx \\
+         http://127.0.0.1:8502/calcular
+
+Los cálculos corren en un pool acotado de trabajadores con una cola de espera
+limitada; con la cola llena la respuesta es 503 con Retry-After. Cada
+respuesta trae sus tiempos (recepción, cola, lectura, cálculo, exportación y
+total) en Server-Timing y en las cabeceras X-Tiempo-*-ms. GET /salud informa
+la carga del pool.
+"""
+import argparse
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as TiempoAgotado
+from dataclasses import asdict, dataclass
+from email.parser import BytesParser
+from email.policy import HTTP
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from carga_archivos import FormatoNoSoportado, TIPOS_ARCHIVO, formato_archivo, leer_archivo
+from exportacion import generar_excel_resultados
+from motor_calculo import (
+    MEDIDAS_CUBO, VERSION_MOTOR, ErrorCalculo, calcular_horas_extras, construir_indice_empleados,
+    huella_archivos,
+)
+from perfilador import Perfilador
+
+# Resultados e índices de empleados que se conservan en memoria (como las
+# cachés de la app: 8 cálculos y 4 bases de empleados)
+MAX_RESULTADOS = 8
+MAX_INDICES_EMPLEADOS = 4
+# Segundos que se sugiere esperar (Retry-After) cuando la cola está llena
+ESPERA_COLA_LLENA_SEG = 5
+MB = 1024 * 1024
+TIPO_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+# Nombre público de cada medida del cubo en el JSON de respuesta: las columnas
+# internas (HORAS EXTRA DIURNA_DISPLAY...) pueden cambiar con el motor, las
+# claves del JSON no
+CLAVES_MEDIDAS = {medida: medida.removesuffix("_DISPLAY") for medida in MEDIDAS_CUBO}
+
+@dataclass(frozen=True)
+class ConfigServicio:
+    """
+    trabajadores: cálculos a la vez; cola: solicitudes que pueden esperar
+    turno (las demás reciben 503); procesos: procesos por cálculo (ver
+    calcular_horas_extras); timeout_seg: espera máxima de una solicitud.
+    """
+    host: str = "127.0.0.1"
+    puerto: int = 8502
+    trabajadores: int = 2
+    cola: int = 8
+    procesos: int = 1
+    timeout_seg: float = 600
+    tamano_max_mb: int = 200
+
+class ErrorSolicitud(Exception):
+    """Solicitud que no se puede atender: estado HTTP y detalle para el JSON de error."""
+    def __init__(self, estado, mensaje, ayuda="", datos=None, cabeceras=None):
+        super().__init__(mensaje)
+        self.estado = estado
+        self.mensaje = mensaje
+        self.ayuda = ayuda
+        self.datos = datos or {}
+        self.cabeceras = cabeceras or {}
+
+# ============================================================================
+# POOL DE TRABAJADORES
+# ============================================================================
+class PoolCalculo:
+    """
+    Pool acotado: `trabajadores` tareas a la vez y hasta `cola` esperando
+    turno. Una tarea sin cupo se rechaza de inmediato (ErrorSolicitud 503) en
+    lugar de acumular solicitudes sin límite.
+    """
+    def __init__(self, trabajadores, cola):
+        self.trabajadores = trabajadores
+        self.cola = cola
+        self._executor = ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix="calculo")
+        self._cupos = threading.BoundedSemaphore(trabajadores + cola)
+        self._lock = threading.Lock()
+        self.en_cola = 0
+        self.en_curso = 0
+        self.atendidas = 0
+        self.rechazadas = 0
+
+    def _liberar(self, en_cola):
+        with self._lock:
+            if en_cola:
+                self.en_cola -= 1
+            else:
+                self.en_curso -= 1
+                self.atendidas += 1
+        self._cupos.release()
+
+    def ejecutar(self, funcion, *args, timeout=None):
+        """
+        Ejecuta funcion(*args) en el pool y retorna (resultado, segundos_en_cola).
+        Si no hay cupo o se agota `timeout` lanza ErrorSolicitud (503 / 504); una
+        tarea que ya empezó termina en segundo plano y libera su cupo al final.
+        """
+        if not self._cupos.acquire(blocking=False):
+            with self._lock:
+                self.rechazadas += 1
+            raise ErrorSolicitud(HTTPStatus.SERVICE_UNAVAILABLE,
+                                 f"Servicio ocupado: {self.trabajadores} cálculos en curso y {self.cola} en cola",
+                                 "Reintente en unos segundos",
+                                 cabeceras={"Retry-After": str(ESPERA_COLA_LLENA_SEG)})
+        encolada = time.perf_counter()
+        inicio = []
+
+        def tarea():
+            with self._lock:
+                self.en_cola -= 1
+                self.en_curso += 1
+            inicio.append(time.perf_counter())
+            try:
+                return funcion(*args)
+            finally:
+                self._liberar(en_cola=False)
+
+        with self._lock:
+            self.en_cola += 1
+        futuro = self._executor.submit(tarea)
+        try:
+            resultado = futuro.result(timeout=timeout)
+        except TiempoAgotado:
+            if futuro.cancel():
+                self._liberar(en_cola=True)
+            raise ErrorSolicitud(HTTPStatus.GATEWAY_TIMEOUT,
+                                 f"El cálculo no terminó en {timeout:g} segundos") from None
+        return resultado, inicio[0] - encolada
+
+    def estado(self):
+        with self._lock:
+            return {"trabajadores": self.trabajadores, "cola": self.cola, "en_curso": self.en_curso,
+                    "en_cola": self.en_cola, "atendidas": self.atendidas, "rechazadas": self.rechazadas}
+
+    def cerrar(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+# ============================================================================
+# CÁLCULO
+# ============================================================================
+class _Memoria:
+    """Diccionario LRU seguro entre hilos con un máximo de entradas."""
+    def __init__(self, max_entradas):
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            if clave not in self._datos:
+                return None
+            self._datos.move_to_end(clave)
+            return self._datos[clave]
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+@dataclass
+class CalculoServicio:
+    """Un resultado calculado por el servicio; el libro se genera la primera vez que se pide."""
+    resultado: object
+    excel: bytes = None
+
+def _leer_entrada(contenido, nombre, tipo):
+    """
+    leer_archivo con los errores de lectura (archivo dañado o que no es del
+    formato de su extensión) convertidos en ErrorSolicitud 422.
+    """
+    try:
+        return leer_archivo(contenido, nombre, tipo)
+    except (ErrorCalculo, FormatoNoSoportado):
+        raise
+    except Exception as e:
+        formato = formato_archivo(nombre)
+        raise ErrorSolicitud(HTTPStatus.UNPROCESSABLE_ENTITY,
+                             f"No se pudo leer el archivo de {tipo} '{nombre}' como {formato}",
+                             f"Verifique que el campo {tipo} sea un archivo {formato} válido",
+                             {"archivo": tipo, "nombre": nombre, "formato": formato,
+                              "detalle": f"{type(e).__name__}: {e}"}) from None
+
+class ServicioCalculo:
+    """Estado compartido del servicio: configuración, pool y resultados recientes."""
+    def __init__(self, config):
+        self.config = config
+        self.pool = PoolCalculo(config.trabajadores, config.cola)
+        self.resultados = _Memoria(MAX_RESULTADOS)
+        self.por_entrada = _Memoria(MAX_RESULTADOS)
+        self.indices_empleados = _Memoria(MAX_INDICES_EMPLEADOS)
+        self._lock_excel = threading.Lock()
+
+    def calcular(self, archivos, perfilador):
+        """
+        Mismo recorrido que calcular_resultados de app.py: lee los cuatro
+        archivos ({tipo: (nombre, bytes)}), reutiliza el índice de empleados por
+        huella y ejecuta el cálculo. Retorna (CalculoServicio, en_cache).
+        """
+        huella_entrada = huella_archivos(*[archivos[tipo][1] for tipo in TIPOS_ARCHIVO]) + VERSION_MOTOR
+        calculo = self.por_entrada.obtener(huella_entrada)
+        if calculo is not None:
+            return calculo, True
+
+        leidos = []
+        for tipo in TIPOS_ARCHIVO:
+            nombre, contenido = archivos[tipo]
+            with perfilador.etapa(f"lectura_{tipo}") as registro:
+                if tipo == "empleados":
+                    huella = huella_archivos(contenido)
+                    indice = self.indices_empleados.obtener(huella)
+                    if indice is None:
+                        indice = construir_indice_empleados(_leer_entrada(contenido, nombre, tipo), huella)
+                        self.indices_empleados.guardar(huella, indice)
+                    leidos.append(indice)
+                    registro.filas = len(indice.cedulas)
+                else:
+                    leidos.append(_leer_entrada(contenido, nombre, tipo))
+                    registro.filas = len(leidos[-1])
+        with perfilador.etapa("calculo", filas=len(leidos[0])):
+            resultado = calcular_horas_extras(*leidos, perfilador=perfilador, procesos=self.config.procesos)
+
+        calculo = CalculoServicio(resultado)
+        self.resultados.guardar(resultado.huella, calculo)
+        self.por_entrada.guardar(huella_entrada, calculo)
+        return calculo, False
+
+    def excel(self, calculo, perfilador):
+        """Bytes del .xlsx del cálculo (se genera una sola vez)."""
+        with self._lock_excel:
+            if calculo.excel is None:
+                resultado = calculo.resultado
+                with perfilador.etapa("exportacion_excel", filas=len(resultado.df)):
+                    calculo.excel = generar_excel_resultados(resultado.df, resultado.topes.incumplimientos)
+            return calculo.excel
+
+def _redondear(valor):
+    return round(float(valor), 2)
+
+def _medidas(fila):
+    """Medidas del cubo de una fila (o de los totales) con sus claves públicas."""
+    return {clave: _redondear(fila[medida]) for medida, clave in CLAVES_MEDIDAS.items()}
+
+def resumen_resultado(resultado):
+    """Resumen en JSON de un ResultadoCalculo: totales, por área y mes, topes legales y avisos."""
+    cubo = resultado.cubo
+    por_area = cubo.groupby("AREA", observed=True, dropna=False)[MEDIDAS_CUBO].sum()
+    por_mes = cubo.groupby(["MES_CLAVE", "MES_NOMBRE"], observed=True)[MEDIDAS_CUBO].sum()
+    incumplimientos = resultado.topes.incumplimientos
+    return {
+        "huella": resultado.huella,
+        "version_motor": VERSION_MOTOR,
+        "registros": len(resultado.df),
+        "empleados": int(resultado.df[resultado.columna_cedula].nunique()),
+        "totales": _medidas(cubo[MEDIDAS_CUBO].sum()),
+        "por_area": [{"AREA": str(area), **_medidas(fila)} for area, fila in por_area.iterrows()],
+        "por_mes": [{"MES": str(nombre), **_medidas(fila)} for (_, nombre), fila in por_mes.iterrows()],
+        "topes_legales": {
+            "incumplimientos": len(incumplimientos),
+            "empleados": int(incumplimientos["CÉDULA"].nunique()),
+            "por_tope": {str(tope): int(n) for tope, n in incumplimientos["TOPE"].value_counts(sort=False).items()},
+        },
+        "avisos": [asdict(aviso) for aviso in resultado.avisos],
+        "excel": f"/resultados/{resultado.huella}.xlsx",
+    }
+
+# ============================================================================
+# HTTP
+# ============================================================================
+def leer_multipart(tipo_contenido, cuerpo):
+    """Archivos de un cuerpo multipart/form-data: {campo: (nombre_archivo, bytes)}."""
+    mensaje = BytesParser(policy=HTTP).parsebytes(
+        b"Content-Type: " + tipo_contenido.encode("latin-1") + b"\r\n\r\n" + cuerpo
+    )
+    if not mensaje.is_multipart():
+        raise ErrorSolicitud(HTTPStatus.BAD_REQUEST, "El cuerpo debe ser multipart/form-data")
+    archivos = {}
+    for parte in mensaje.iter_parts():
+        campo = parte.get_param("name", header="content-disposition")
+        if campo:
+            archivos[campo] = (parte.get_filename() or campo, parte.get_payload(decode=True) or b"")
+    return archivos
+
+def _cabecera_tiempos(tiempos):
+    """Server-Timing a partir de {nombre: segundos}."""
+    return ", ".join(f"{nombre};dur={segundos * 1000:.1f}" for nombre, segundos in tiempos.items())
+
+class ManejadorCalculo(BaseHTTPRequestHandler):
+    """Rutas: GET /salud, POST /calcular[?formato=json|xlsx], GET /resultados/<huella>.xlsx."""
+    server_version = "FertracCalculo/1.0"
+
+    @property
+    def servicio(self):
+        return self.server.servicio
+
+    def _responder(self, estado, cuerpo, tipo, cabeceras=None):
+        self.send_response(estado)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        for nombre, valor in (cabeceras or {}).items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _responder_json(self, estado, datos, cabeceras=None):
+        cuerpo = json.dumps(datos, ensure_ascii=False, default=str).encode("utf-8")
+        self._responder(estado, cuerpo, "application/json; charset=utf-8", cabeceras)
+
+    def _responder_error(self, error, cabeceras=None):
+        datos = {"error": error.mensaje}
+        if error.ayuda:
+            datos["ayuda"] = error.ayuda
+        if error.datos:
+            datos["datos"] = error.datos
+        self._responder_json(error.estado, datos, {**error.cabeceras, **(cabeceras or {})})
+
+    def _atender(self, atender):
+        inicio = time.perf_counter()
+        tiempos = {}
+        try:
+            estado, cuerpo, tipo, cabeceras = atender(tiempos)
+        except ErrorSolicitud as e:
+            tiempos["total"] = time.perf_counter() - inicio
+            self._responder_error(e, self._cabeceras_tiempos(tiempos))
+            return
+        except Exception as e:
+            # Cualquier otro error se informa en la respuesta en lugar de cortar la conexión
+            tiempos["total"] = time.perf_counter() - inicio
+            self._responder_error(ErrorSolicitud(HTTPStatus.INTERNAL_SERVER_ERROR, f"Error interno: {e}"),
+                                  self._cabeceras_tiempos(tiempos))
+            return
+        tiempos["total"] = time.perf_counter() - inicio
+        self._responder(estado, cuerpo, tipo, {**cabeceras, **self._cabeceras_tiempos(tiempos)})
+
+    @staticmethod
+    def _cabeceras_tiempos(tiempos):
+        cabeceras = {"Server-Timing": _cabecera_tiempos(tiempos)}
+        for nombre, segundos in tiempos.items():
+            cabeceras[f"X-Tiempo-{nombre.capitalize()}-ms"] = f"{segundos * 1000:.1f}"
+        return cabeceras
+
+    def do_GET(self):
+        ruta = urlsplit(self.path).path
+        if ruta == "/salud":
+            self._responder_json(HTTPStatus.OK, {"estado": "ok", "version_motor": VERSION_MOTOR,
+                                                 **self.servicio.pool.estado()})
+        elif ruta.startswith("/resultados/") and ruta.endswith(".xlsx"):
+            self._atender(lambda tiempos: self._descargar_excel(ruta[len("/resultados/"):-len(".xlsx")], tiempos))
+        else:
+            self._responder_error(ErrorSolicitud(HTTPStatus.NOT_FOUND, f"Ruta no encontrada: {ruta}"))
+
+    def do_POST(self):
+        partes = urlsplit(self.path)
+        if partes.path != "/calcular":
+            self._responder_error(ErrorSolicitud(HTTPStatus.NOT_FOUND, f"Ruta no encontrada: {partes.path}"))
+            return
+        formato = parse_qs(partes.query).get("formato", ["json"])[0]
+        self._atender(lambda tiempos: self._calcular(formato, tiempos))
+
+    def _leer_archivos(self):
+        config = self.servicio.config
+        longitud = int(self.headers.get("Content-Length") or 0)
+        if longitud > config.tamano_max_mb * MB:
+            raise ErrorSolicitud(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                 f"La solicitud supera {config.tamano_max_mb} MB")
+        tipo_contenido = self.headers.get("Content-Type", "")
+        if not tipo_contenido.startswith("multipart/form-data"):
+            raise ErrorSolicitud(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, "El cuerpo debe ser multipart/form-data",
+                                 f"Envíe los campos {', '.join(TIPOS_ARCHIVO)} como archivos")
+        archivos = leer_multipart(tipo_contenido, self.rfile.read(longitud))
+        faltantes = [tipo for tipo in TIPOS_ARCHIVO if tipo not in archivos]
+        if faltantes:
+            raise ErrorSolicitud(HTTPStatus.BAD_REQUEST, f"Faltan archivos: {', '.join(faltantes)}",
+                                 f"Envíe los campos {', '.join(TIPOS_ARCHIVO)} como archivos",
+                                 {"faltantes": faltantes})
+        return archivos
+
+    def _calcular(self, formato, tiempos):
+        if formato not in ("json", "xlsx"):
+            raise ErrorSolicitud(HTTPStatus.BAD_REQUEST, f"Formato no soportado: '{formato}'. Use json o xlsx")
+        inicio = time.perf_counter()
+        archivos = self._leer_archivos()
+        tiempos["recepcion"] = time.perf_counter() - inicio
+        servicio = self.servicio
+        perfilador = Perfilador()
+
+        def tarea():
+            try:
+                calculo, en_cache = servicio.calcular(archivos, perfilador)
+                excel = servicio.excel(calculo, perfilador) if formato == "xlsx" else None
+            except ErrorCalculo as e:
+                raise ErrorSolicitud(HTTPStatus.UNPROCESSABLE_ENTITY, e.mensaje, e.ayuda, e.datos) from None
+            except FormatoNoSoportado as e:
+                raise ErrorSolicitud(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, str(e)) from None
+            return calculo, en_cache, excel
+
+        (calculo, en_cache, excel), tiempos["cola"] = servicio.pool.ejecutar(
+            tarea, timeout=servicio.config.timeout_seg
+        )
+        tiempos.update(_tiempos_perfil(perfilador))
+        cabeceras = {"X-Huella-Resultado": calculo.resultado.huella, "X-Resultado-En-Cache": str(int(en_cache))}
+        if formato == "xlsx":
+            cabeceras["Content-Disposition"] = f'attachment; filename="resultado_{calculo.resultado.huella}.xlsx"'
+            return HTTPStatus.OK, excel, TIPO_XLSX, cabeceras
+        resumen = resumen_resultado(calculo.resultado)
+        resumen["perfil"] = perfilador.a_dict()["etapas"]
+        cuerpo = json.dumps(resumen, ensure_ascii=False, default=str).encode("utf-8")
+        return HTTPStatus.OK, cuerpo, "application/json; charset=utf-8", cabeceras
+
+    def _descargar_excel(self, huella, tiempos):
+        servicio = self.servicio
+        calculo = servicio.resultados.obtener(huella)
+        if calculo is None:
+            raise ErrorSolicitud(HTTPStatus.NOT_FOUND, f"No hay un resultado reciente con huella {huella}",
+                                 f"El servicio conserva los últimos {MAX_RESULTADOS} cálculos")
+        perfilador = Perfilador()
+        excel, tiempos["cola"] = servicio.pool.ejecutar(servicio.excel, calculo, perfilador,
+                                                        timeout=servicio.config.timeout_seg)
+        tiempos.update(_tiempos_perfil(perfilador))
+        return HTTPStatus.OK, excel, TIPO_XLSX, {
+            "Content-Disposition": f'attachment; filename="resultado_{huella}.xlsx"',
+        }
+
+def _tiempos_perfil(perfilador):
+    """Segundos por etapa de primer nivel, con las lecturas sumadas en "lectura"."""
+    tiempos = {}
+    for registro in perfilador.etapas:
+        if registro.nivel == 0 and registro.segundos is not None:
+            nombre = "lectura" if registro.nombre.startswith("lectura_") else registro.nombre.split("_")[0]
+            tiempos[nombre] = tiempos.get(nombre, 0.0) + registro.segundos
+    return tiempos
+
+def crear_servidor(config):
+    """Servidor HTTP (sin arrancar) con su ServicioCalculo en `servidor.servicio`."""
+    servidor = ThreadingHTTPServer((config.host, config.puerto), ManejadorCalculo)
+    servidor.daemon_threads = True
+    servidor.servicio = ServicioCalculo(config)
+    return servidor
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio HTTP local del cálculo de horas extras.")
+    parser.add_argument("--host", default=ConfigServicio.host)
+    parser.add_argument("--puerto", type=int, default=ConfigServicio.puerto)
+    parser.add_argument("--trabajadores", type=int, default=ConfigServicio.trabajadores,
+                        help="cálculos simultáneos")
+    parser.add_argument("--cola", type=int, default=ConfigServicio.cola,
+                        help="solicitudes en espera antes de responder 503")
+    parser.add_argument("--procesos", type=int, default=ConfigServicio.procesos, help="procesos por cálculo")
+    parser.add_argument("--timeout", type=float, default=ConfigServicio.timeout_seg,
+                        help="segundos máximos por solicitud")
+    parser.add_argument("--tamano-max-mb", type=int, default=ConfigServicio.tamano_max_mb)
+    args = parser.parse_args()
+
+    config = ConfigServicio(host=args.host, puerto=args.puerto, trabajadores=args.trabajadores, cola=args.cola,
+                            procesos=args.procesos, timeout_seg=args.timeout, tamano_max_mb=args.tamano_max_mb)
+    servidor = crear_servidor(config)
+    print(f"Servicio de cálculo en http://{config.host}:{config.puerto} "
+          f"({config.trabajadores} trabajadores, cola de {config.cola})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        servidor.servicio.pool.cerrar()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Los tres formatos de entrada (xlsx, csv y parquet) deben llegar al motor con
+el mismo esquema y dar el mismo cálculo. Se ejecuta con `python -m pytest`
+desde la raíz del proyecto.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from carga_archivos import TIPOS_ARCHIVO, leer_archivo
+from datos_sinteticos import NOMBRES_ARCHIVO, archivo_bytes, generar_datos
+from motor_calculo import calcular_horas_extras
+
+FORMATOS = ["xlsx", "csv", "parquet"]
+
+@pytest.fixture(scope="module")
+def archivos():
+    """
+    Datos sintéticos con los casos que separan a los formatos: una cédula
+    vacía en la base de empleados (la columna queda float en Parquet y con
+    ".0" en CSV), asistencias de una cédula que no está en la base y
+    observaciones vacías.
+    """
+    archivos = generar_datos(n_empleados=12, n_dias=40)
+    sin_cedula = pd.DataFrame({"CEDULA": [np.nan], "NOMBRE": ["SIN CÉDULA"], "AREA": ["Bodega"],
+                               "CARGO": ["OPERARIO"], "SALARIO BASICO": [2_000_000]})
+    archivos["empleados"] = pd.concat([archivos["empleados"], sin_cedula], ignore_index=True)
+    archivos["input"].loc[archivos["input"].index[:12], "CÉDULA"] = 99
+    return archivos
+
+@pytest.fixture(scope="module")
+def leidos(archivos):
+    """{formato: {tipo: DataFrame leído}} sin caché de Parquet."""
+    return {
+        formato: {
+            tipo: leer_archivo(archivo_bytes(archivos[tipo], formato), f"{NOMBRES_ARCHIVO[tipo]}.{formato}",
+                               tipo, directorio_cache=None)
+            for tipo in TIPOS_ARCHIVO
+        }
+        for formato in FORMATOS
+    }
+
+@pytest.mark.parametrize("formato", ["csv", "parquet"])
+@pytest.mark.parametrize("tipo", TIPOS_ARCHIVO)
+def test_mismo_esquema_que_excel(leidos, formato, tipo):
+    excel, otro = leidos["xlsx"][tipo], leidos[formato][tipo]
+    pd.testing.assert_series_equal(otro.dtypes, excel.dtypes)
+    pd.testing.assert_frame_equal(otro, excel)
+
+@pytest.mark.parametrize("formato", ["csv", "parquet"])
+def test_mismo_calculo_que_excel(leidos, formato):
+    excel = calcular_horas_extras(*(leidos["xlsx"][tipo] for tipo in TIPOS_ARCHIVO))
+    otro = calcular_horas_extras(*(leidos[formato][tipo] for tipo in TIPOS_ARCHIVO))
+    # Solo las 12 filas de la cédula que no está en la base quedan sin empleado
+    assert otro.df["NOMBRE"].isna().sum() == excel.df["NOMBRE"].isna().sum() == 12
+    pd.testing.assert_frame_equal(otro.df, excel.df)
+    assert otro.huella == excel.huella
+
+def test_cache_parquet_de_excel(archivos, leidos, tmp_path):
+    """El Excel leído desde su Parquet en caché da el mismo DataFrame que sin caché."""
+    contenido = archivo_bytes(archivos["empleados"], "xlsx")
+    for _ in range(2):  # la segunda lectura sale de la caché
+        df = leer_archivo(contenido, "base_empleados.xlsx", "empleados", directorio_cache=str(tmp_path))
+        pd.testing.assert_frame_equal(df, leidos["xlsx"]["empleados"])
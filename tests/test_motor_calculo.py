@@ -0,0 +1,35 @@
+"""
+Lectura de horas del día en el motor: los números enteros no son horas y
+deben aparecer en el reporte de celdas inválidas. Se ejecuta con
+`python -m pytest` desde la raíz del proyecto.
+"""
+from datetime import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from datos_sinteticos import generar_datos
+from motor_calculo import ErrorCalculo, calcular_horas_extras, parsear_hora_del_dia
+
+def test_fracciones_de_dia_y_seriales():
+    serie = pd.Series([0.5, 0, 0.75, 45_000.25, time(8, 30), "14:00"], dtype=object)
+    segundos, invalidos = parsear_hora_del_dia(serie)
+    assert segundos.tolist() == [12 * 3600, 0, 18 * 3600, 6 * 3600, 8 * 3600 + 30 * 60, 14 * 3600]
+    assert not invalidos.any()
+
+@pytest.mark.parametrize("numero", [8, 14.0, 1, 45_000.0, -0.25])
+def test_enteros_no_son_horas(numero):
+    segundos, invalidos = parsear_hora_del_dia(pd.Series([numero, 0.5], dtype=object))
+    assert invalidos.tolist() == [True, False]
+    assert segundos.tolist() == [0, 12 * 3600]
+
+def test_enteros_en_el_reporte_de_horas_invalidas():
+    archivos = generar_datos(n_empleados=3, n_dias=5)
+    df_input = archivos["input"].astype({"HRA INGRESO": object, "HORA SALIDA": object})
+    df_input.loc[[2, 7], "HRA INGRESO"] = [8, 14.0]
+    df_input.loc[4, "HORA SALIDA"] = np.int64(18)
+
+    with pytest.raises(ErrorCalculo) as error:
+        calcular_horas_extras(df_input, archivos["empleados"], archivos["porcentaje"], archivos["turnos"])
+    assert error.value.datos["filas"] == {"HRA INGRESO": [2, 7], "HORA SALIDA": [4]}
@@ -0,0 +1,147 @@
+"""
+Bandeja de salida de notificaciones contra un servidor SMTP local de prueba:
+envío, deduplicación por clave, reintentos con espera exponencial y
+arranque del worker con pendientes. Se ejecuta con `python -m pytest` desde
+la raíz del proyecto.
+"""
+import socketserver
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import notificaciones
+from notificaciones import (ConfigSMTP, MAX_INTENTOS, encolar_notificacion, estado_notificacion, iniciar_worker,
+                            procesar_pendientes)
+
+# ============================================================================
+# SERVIDOR SMTP LOCAL DE PRUEBA
+# ============================================================================
+class _ManejadorSMTP(socketserver.StreamRequestHandler):
+    """Lo justo del protocolo SMTP para smtplib: guarda los mensajes o rechaza el remitente."""
+
+    def _responder(self, linea):
+        self.wfile.write(f"{linea}\r\n".encode())
+
+    def handle(self):
+        self._responder("220 localhost SMTP de prueba")
+        for linea in self.rfile:
+            comando = linea.decode().strip().upper()
+            if comando.startswith("EHLO"):
+                self._responder("250-localhost")
+                self._responder("250 OK")
+            elif comando.startswith("MAIL FROM") and self.server.rechazar:
+                self._responder("451 Servicio no disponible")
+            elif comando == "DATA":
+                self._responder("354 Fin con <CRLF>.<CRLF>")
+                datos = []
+                for linea_datos in self.rfile:
+                    if linea_datos in (b".\r\n", b".\n"):
+                        break
+                    datos.append(linea_datos)
+                self.server.recibidos.append(b"".join(datos).decode())
+                self._responder("250 OK")
+            elif comando == "QUIT":
+                self._responder("221 Adiós")
+                return
+            else:  # HELO, MAIL, RCPT, RSET, NOOP
+                self._responder("250 OK")
+
+class ServidorSMTPLocal(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _ManejadorSMTP)
+        self.recibidos = []
+        self.rechazar = False
+
+@pytest.fixture
+def servidor():
+    servidor = ServidorSMTPLocal()
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+@pytest.fixture
+def config(servidor):
+    return ConfigSMTP(servidor="127.0.0.1", puerto=servidor.server_address[1], usuario="app@fertrac.com",
+                      starttls=False, timeout=5)
+
+@pytest.fixture
+def ruta(tmp_path):
+    return str(tmp_path / "bandeja.sqlite3")
+
+def _proximo_intento(ruta, clave):
+    with sqlite3.connect(ruta) as conexion:
+        return conexion.execute("SELECT proximo_intento FROM notificaciones WHERE clave = ?", (clave,)).fetchone()[0]
+
+def _vencer(ruta, intentos=None):
+    """Deja todas las notificaciones listas para el próximo envío (y con `intentos`, si se da)."""
+    with sqlite3.connect(ruta) as conexion:
+        conexion.execute("UPDATE notificaciones SET proximo_intento = 0")
+        if intentos is not None:
+            conexion.execute("UPDATE notificaciones SET intentos = ?", (intentos,))
+
+# ============================================================================
+# PRUEBAS
+# ============================================================================
+def test_configurado_pide_contrasena_salvo_servidor_local():
+    assert not ConfigSMTP(usuario="app@fertrac.com").configurado
+    assert ConfigSMTP(usuario="app@fertrac.com", password="clave").configurado
+    assert ConfigSMTP(servidor="localhost", usuario="app@fertrac.com").configurado
+    assert ConfigSMTP(servidor="smtp.interno", usuario="app@fertrac.com", sin_login=True).configurado
+    assert not ConfigSMTP(servidor="127.0.0.1").configurado
+
+def test_envio_y_deduplicacion(servidor, config, ruta):
+    assert encolar_notificacion("calculo_1", "ds@fertrac.com", "Asunto 1", "<b>uno</b>", ruta=ruta)
+    assert not encolar_notificacion("calculo_1", "ds@fertrac.com", "Asunto 1", "<b>uno</b>", ruta=ruta)
+
+    assert procesar_pendientes(config, ruta) == (1, 0)
+    assert estado_notificacion("calculo_1", ruta) == ("enviado", 1, None)
+    assert len(servidor.recibidos) == 1 and "Asunto 1" in servidor.recibidos[0]
+
+    # Ya enviada: la misma clave no se encola ni se reenvía
+    assert not encolar_notificacion("calculo_1", "ds@fertrac.com", "Asunto 1", "<b>uno</b>", ruta=ruta)
+    assert procesar_pendientes(config, ruta) == (0, 0)
+    assert len(servidor.recibidos) == 1
+
+def test_reintentos_con_espera_hasta_fallido(servidor, config, ruta):
+    servidor.rechazar = True
+    encolar_notificacion("calculo_2", "ds@fertrac.com", "Asunto 2", "<b>dos</b>", ruta=ruta)
+
+    antes = time.time()
+    assert procesar_pendientes(config, ruta) == (0, 1)
+    estado, intentos, error = estado_notificacion("calculo_2", ruta)
+    assert (estado, intentos) == ("pendiente", 1) and error
+    assert _proximo_intento(ruta, "calculo_2") >= antes + notificaciones.ESPERA_BASE_SEG
+    # Antes de que venza la espera no se vuelve a intentar
+    assert procesar_pendientes(config, ruta) == (0, 0)
+
+    _vencer(ruta)
+    procesar_pendientes(config, ruta)
+    assert _proximo_intento(ruta, "calculo_2") >= time.time() + 2 * notificaciones.ESPERA_BASE_SEG - 1
+
+    _vencer(ruta, intentos=MAX_INTENTOS - 1)
+    procesar_pendientes(config, ruta)
+    assert estado_notificacion("calculo_2", ruta)[:2] == ("fallido", MAX_INTENTOS)
+    assert servidor.recibidos == []
+
+def test_worker_entrega_pendientes_al_arrancar(servidor, config, ruta):
+    # Avisos que quedaron en la bandeja antes de un reinicio, uno de ellos en reintento
+    encolar_notificacion("calculo_3", "ds@fertrac.com", "Asunto 3", "<b>tres</b>", ruta=ruta)
+    encolar_notificacion("calculo_4", "otro@fertrac.com", "Asunto 4", "<b>cuatro</b>", ruta=ruta)
+    _vencer(ruta, intentos=2)
+
+    worker = iniciar_worker(config, ruta, intervalo=0.1)
+    try:
+        limite = time.time() + 5
+        while len(servidor.recibidos) < 2 and time.time() < limite:
+            time.sleep(0.05)
+    finally:
+        worker.detener()
+        worker.join(5)
+    assert len(servidor.recibidos) == 2
+    assert estado_notificacion("calculo_3", ruta)[0] == estado_notificacion("calculo_4", ruta)[0] == "enviado"
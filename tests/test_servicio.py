@@ -0,0 +1,66 @@
+"""
+Servicio HTTP del cálculo: claves públicas del resumen JSON y respuestas de
+error de los archivos de entrada. Se ejecuta con `python -m pytest` desde
+la raíz del proyecto.
+"""
+import json
+import threading
+import uuid
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+from carga_archivos import TIPOS_ARCHIVO
+from datos_sinteticos import NOMBRES_ARCHIVO, archivo_bytes, generar_datos
+from servicio import ConfigServicio, crear_servidor
+
+@pytest.fixture(scope="module")
+def url():
+    servidor = crear_servidor(ConfigServicio(puerto=0, trabajadores=1, cola=2, timeout_seg=60))
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{servidor.server_address[1]}"
+    servidor.shutdown()
+    servidor.server_close()
+    servidor.servicio.pool.cerrar()
+
+@pytest.fixture(scope="module")
+def archivos():
+    """{tipo: (nombre, bytes)} de datos sintéticos en xlsx."""
+    datos = generar_datos(n_empleados=5, n_dias=10)
+    return {tipo: (f"{NOMBRES_ARCHIVO[tipo]}.xlsx", archivo_bytes(datos[tipo], "xlsx")) for tipo in TIPOS_ARCHIVO}
+
+def _calcular(url, archivos):
+    """POST multipart a /calcular; retorna (estado, JSON)."""
+    limite = uuid.uuid4().hex
+    partes = []
+    for tipo, (nombre, contenido) in archivos.items():
+        partes.append(f'--{limite}\r\nContent-Disposition: form-data; name="{tipo}"; filename="{nombre}"\r\n'
+                      f"Content-Type: application/octet-stream\r\n\r\n".encode() + contenido + b"\r\n")
+    cuerpo = b"".join(partes) + f"--{limite}--\r\n".encode()
+    solicitud = Request(f"{url}/calcular", data=cuerpo,
+                        headers={"Content-Type": f"multipart/form-data; boundary={limite}"})
+    try:
+        with urlopen(solicitud, timeout=60) as respuesta:
+            return respuesta.status, json.loads(respuesta.read())
+    except HTTPError as e:
+        return e.code, json.loads(e.read())
+
+def test_resumen_con_claves_publicas(url, archivos):
+    estado, respuesta = _calcular(url, archivos)
+    assert estado == 200
+    medidas = ["HORAS EXTRA DIURNA", "HORAS EXTRA NOCTURNA", "RECARGO NOCTURNO", "VALOR TOTAL EXTRAS",
+               "COMISIÓN O BONIFICACIÓN"]
+    assert list(respuesta["totales"]) == medidas
+    assert all(list(fila) == ["AREA", *medidas] for fila in respuesta["por_area"])
+    assert all(list(fila) == ["MES", *medidas] for fila in respuesta["por_mes"])
+    assert sum(fila["VALOR TOTAL EXTRAS"] for fila in respuesta["por_area"]) == pytest.approx(
+        respuesta["totales"]["VALOR TOTAL EXTRAS"], abs=0.05)
+
+@pytest.mark.parametrize("contenido", [b"esto no es un libro de Excel", b"PK\x03\x04 zip cortado"])
+def test_archivo_danado_responde_422(url, archivos, contenido):
+    estado, respuesta = _calcular(url, {**archivos, "porcentaje": ("factores_horas_extras.xlsx", contenido)})
+    assert estado == 422
+    assert "porcentaje" in respuesta["error"] and "xlsx" in respuesta["error"]
+    assert respuesta["datos"]["archivo"] == "porcentaje"
+    assert respuesta["datos"]["formato"] == "xlsx"